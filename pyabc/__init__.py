@@ -28,6 +28,7 @@ from .distance import (
     AdaptivePNormDistance,
     ZScoreDistance,
     PCADistance,
+    AdaptivePCADistance,
     MinMaxDistance,
     PercentileDistance,
     RangeEstimatorDistance,
@@ -44,12 +45,16 @@ from .acceptor import (
     Acceptor,
     SimpleFunctionAcceptor,
     accept_use_current_time,
-    accept_use_complete_history)
+    accept_use_complete_history,
+    CompleteHistoryAcceptor)
 from .model import (
     Model,
     SimpleModel,
     ModelResult,
-    IntegratedModel)
+    IntegratedModel,
+    IncrementalModel,
+    BatchModel,
+    MemoizedModel)
 from .transition import (
     MultivariateNormalTransition,
     LocalTransition,
@@ -77,6 +82,7 @@ __all__ = [
     "AdaptivePNormDistance",
     "ZScoreDistance",
     "PCADistance",
+    "AdaptivePCADistance",
     "MinMaxDistance",
     "PercentileDistance",
     "RangeEstimatorDistance",
@@ -112,11 +118,15 @@ __all__ = [
     "SimpleFunctionAcceptor",
     "accept_use_current_time",
     "accept_use_complete_history",
+    "CompleteHistoryAcceptor",
     # model
     "ModelResult",
     "Model",
     "SimpleModel",
     "IntegratedModel",
+    "IncrementalModel",
+    "BatchModel",
+    "MemoizedModel",
     # history
     "History",
     # visualization
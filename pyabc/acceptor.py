@@ -14,6 +14,10 @@ when the distance measure and epsilon criteria develop over
 time.
 """
 
+import numpy as np
+
+from .distance import PNormDistance
+
 
 class Acceptor:
     """
@@ -78,6 +82,38 @@ class Acceptor:
         """
         raise NotImplementedError()
 
+    def accept_batch(self, t, distance_function, eps, xs, x_0, pars):
+        """
+        Compute the distances of several summary statistics at once, and
+        evaluate whether to accept or reject each of them.
+
+        The default is to call the acceptor once per entry. Subclasses can
+        override this with a vectorized implementation.
+
+        Parameters
+        ----------
+
+        t, distance_function, eps, x_0:
+            As in :meth:`__call__`.
+
+        xs: List[dict]
+            The summary statistics to evaluate.
+
+        pars: List[pyabc.Parameter]
+            The model parameters used to simulate the entries of xs.
+
+        Returns
+        -------
+
+        (distances, accepted): (np.ndarray, np.ndarray)
+            The distances and boolean acceptance flags, one per entry.
+        """
+        results = [self(t, distance_function, eps, x, x_0, par)
+                   for x, par in zip(xs, pars)]
+        distances = np.array([d for d, _ in results], dtype=float)
+        accepted = np.array([accept for _, accept in results], dtype=bool)
+        return distances, accepted
+
 
 class SimpleFunctionAcceptor(Acceptor):
     """
@@ -100,6 +136,15 @@ class SimpleFunctionAcceptor(Acceptor):
     def __call__(self, t, distance_function, eps, x, x_0, par):
         return self.fun(t, distance_function, eps, x, x_0, par)
 
+    def accept_batch(self, t, distance_function, eps, xs, x_0, pars):
+        if self.fun is not accept_use_current_time:
+            return super().accept_batch(
+                t, distance_function, eps, xs, x_0, pars)
+        # the distances at once, e.g. vectorized
+        distances = np.asarray(
+            distance_function.distances(xs, x_0, t, pars), dtype=float)
+        return distances, distances <= eps(t)
+
     @staticmethod
     def assert_acceptor(maybe_acceptor):
         """
@@ -155,14 +200,79 @@ def accept_use_complete_history(t, distance_function, eps, x, x_0, par):
 
     if accept:
         # also check against all previous distances and acceptance criteria
-        for t_prev in range(0, t):
-            try:
-                d_prev = distance_function(x, x_0, t_prev, par)
-                accept = d_prev <= eps(t_prev)
-                if not accept:
-                    break
-            except Exception:
-                # ignore as of now
-                accept = True
+        accept = _accept_previous(t, distance_function, eps, x, x_0, par)
 
     return d, accept
+
+
+def _accept_previous(t, distance_function, eps, x, x_0, par):
+    """
+    Check the acceptance criteria of the time points 0,...,t-1 one by one.
+    """
+    for t_prev in range(0, t):
+        try:
+            d_prev = distance_function(x, x_0, t_prev, par)
+            accept = d_prev <= eps(t_prev)
+            if not accept:
+                return False
+        except Exception:
+            # ignore as of now
+            pass
+    return True
+
+
+class CompleteHistoryAcceptor(Acceptor):
+    """
+    Use the acceptance criteria from the complete history, as
+    :func:`accept_use_complete_history`, but check the criteria of all
+    previous time points at once.
+
+    For a :class:`pyabc.distance.PNormDistance` evaluated on its compiled
+    layout, the criteria of all previous time points are stacked once per
+    generation, see :meth:`pyabc.distance.PNormDistance.previous_criteria`,
+    such that the cost per accepted particle is nearly independent of the
+    number of generations. As before, the current criterion, which is most
+    likely to fail, is checked first, and only particles passing it are
+    checked against the history. Time points for which the distance or
+    epsilon are not available are not used.
+    For other distances, or summary statistics not fitting the layout, the
+    criteria are checked one by one, as in
+    :func:`accept_use_complete_history`.
+    """
+
+    def __init__(self):
+        super().__init__()
+        # (t, distance function, check) of the time points before t,
+        # built on first use per generation
+        self._criteria = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # rebuilt where used
+        state["_criteria"] = None
+        return state
+
+    def __call__(self, t, distance_function, eps, x, x_0, par):
+        # first test current criterion, which is most likely to fail
+        d = distance_function(x, x_0, t, par)
+        if not d <= eps(t):
+            return d, False
+
+        check = self._get_check(t, distance_function, eps)
+        accept = check(x, x_0) if check is not None else None
+        if accept is None:
+            accept = _accept_previous(t, distance_function, eps, x, x_0, par)
+        return d, accept
+
+    def _get_check(self, t, distance_function, eps):
+        """
+        The check of the criteria of the time points before `t` at once,
+        or None if the distance does not support it.
+        """
+        if not isinstance(distance_function, PNormDistance):
+            return None
+        if self._criteria is None or self._criteria[0] != t \
+                or self._criteria[1] is not distance_function:
+            self._criteria = (t, distance_function,
+                              distance_function.previous_criteria(t, eps))
+        return self._criteria[2]
@@ -0,0 +1,236 @@
+"""
+Caches
+======
+
+Caches of summary statistics, for the memoization of deterministic models
+via :class:`pyabc.model.MemoizedModel`.
+"""
+
+import hashlib
+import numbers
+import os
+import pickle
+import sqlite3
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+def parameter_key(model_id: str, pars: dict) -> str:
+    """
+    A canonical hash of the parameter `pars` of the model `model_id`.
+    It does not depend on the order of the parameters, nor on the type of
+    numeric values, i.e. Python and NumPy integers and floats of the same
+    value give the same key.
+    """
+    items = sorted((str(key), _canonical(value))
+                   for key, value in pars.items())
+    return hashlib.sha1(repr((model_id, items)).encode()).hexdigest()
+
+
+def _canonical(value):
+    if isinstance(value, numbers.Number):
+        return float(value)
+    if isinstance(value, np.ndarray):
+        return tuple(_canonical(entry) for entry in value.tolist())
+    if isinstance(value, (list, tuple)):
+        return tuple(_canonical(entry) for entry in value)
+    return value
+
+
+class Cache:
+    """
+    A cache of values by string keys, counting the hits and misses.
+    """
+
+    def get(self, key: str):
+        """
+        The value of `key`, or None if not cached.
+        """
+        raise NotImplementedError()
+
+    def put(self, key: str, value):
+        """
+        Cache `value` under `key`.
+        """
+        raise NotImplementedError()
+
+    @property
+    def hits(self) -> int:
+        """
+        Number of successful lookups.
+        """
+        raise NotImplementedError()
+
+    @property
+    def misses(self) -> int:
+        """
+        Number of unsuccessful lookups.
+        """
+        raise NotImplementedError()
+
+    @property
+    def hit_rate(self):
+        """
+        The fraction of successful lookups, or None if there were none.
+        """
+        n_lookups = self.hits + self.misses
+        if n_lookups == 0:
+            return None
+        return self.hits / n_lookups
+
+
+class LRUCache(Cache):
+    """
+    An in-memory cache, evicting the least recently used entries.
+
+    The cache and its counters are local to the process. Thus, for the
+    multicore samplers, which fork new worker processes per generation, it
+    only helps within the generation of a worker, and the counters of the
+    main process remain 0. The hits and misses in the workers are sent
+    back with the samples, see :class:`pyabc.sampler.Sample`. Use a
+    :class:`SQLiteCache` to share the entries between processes.
+
+    Parameters
+    ----------
+
+    max_size: int, optional (default = 10000)
+        The maximum number of entries.
+    """
+
+    def __init__(self, max_size: int = 10000):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, key: str):
+        value = self._entries.get(key)
+        if value is None:
+            self._misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self._hits += 1
+        return value
+
+    def put(self, key: str, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    @property
+    def hits(self) -> int:
+        return self._hits
+
+    @property
+    def misses(self) -> int:
+        return self._misses
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteCache(Cache):
+    """
+    A cache in an SQLite database file, shared by all processes accessing
+    the file, which also persists across runs. The values are pickled.
+    The least recently used entries are evicted, and the counters of hits
+    and misses are shared as well.
+
+    As for the :class:`pyabc.sge.db.SQLiteJobDB`, all processes need to
+    access the file from the same host, i.e. not via a network file
+    system.
+
+    Parameters
+    ----------
+
+    file: str
+        The database file, created if it does not exist.
+
+    max_size: int, optional (default = None)
+        The maximum number of entries. If None, the size is unbounded.
+    """
+    SQLITE_DB_TIMEOUT = 2000
+
+    def __init__(self, file: str, max_size: int = None):
+        self.file = file
+        self.max_size = max_size
+        self._connection = None
+        self._pid = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # reconnected where used
+        state["_connection"] = None
+        state["_pid"] = None
+        return state
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        # a connection must not be shared with forked processes
+        if self._connection is None or self._pid != os.getpid():
+            self._connection = sqlite3.connect(
+                self.file, timeout=self.SQLITE_DB_TIMEOUT)
+            self._pid = os.getpid()
+            with self._connection:
+                self._connection.execute(
+                    "CREATE TABLE IF NOT EXISTS "
+                    "cache(key TEXT PRIMARY KEY, value BLOB, "
+                    "accessed REAL)")
+                self._connection.execute(
+                    "CREATE INDEX IF NOT EXISTS cache_accessed "
+                    "ON cache(accessed)")
+                self._connection.execute(
+                    "CREATE TABLE IF NOT EXISTS "
+                    "stats(name TEXT PRIMARY KEY, count INTEGER)")
+                self._connection.executemany(
+                    "INSERT OR IGNORE INTO stats VALUES(?, 0)",
+                    (("hits",), ("misses",)))
+        return self._connection
+
+    def get(self, key: str):
+        connection = self.connection
+        with connection:
+            row = connection.execute(
+                "SELECT value FROM cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                connection.execute(
+                    "UPDATE stats SET count = count + 1 "
+                    "WHERE name = 'misses'")
+                return None
+            connection.execute(
+                "UPDATE cache SET accessed = ? WHERE key = ?",
+                (time.time(), key))
+            connection.execute(
+                "UPDATE stats SET count = count + 1 WHERE name = 'hits'")
+        return pickle.loads(row[0])
+
+    def put(self, key: str, value):
+        connection = self.connection
+        with connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO cache VALUES(?, ?, ?)",
+                (key, pickle.dumps(value), time.time()))
+            if self.max_size is not None:
+                connection.execute(
+                    "DELETE FROM cache WHERE key IN (SELECT key FROM cache "
+                    "ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                    (self.max_size,))
+
+    def _count(self, name: str) -> int:
+        return self.connection.execute(
+            "SELECT count FROM stats WHERE name = ?", (name,)).fetchone()[0]
+
+    @property
+    def hits(self) -> int:
+        return self._count("hits")
+
+    @property
+    def misses(self) -> int:
+        return self._count("misses")
+
+    def __len__(self):
+        return self.connection.execute(
+            "SELECT COUNT(*) FROM cache").fetchone()[0]
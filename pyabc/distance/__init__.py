@@ -22,6 +22,7 @@ from .distance import (
     AdaptivePNormDistance,
     ZScoreDistance,
     PCADistance,
+    AdaptivePCADistance,
     MinMaxDistance,
     PercentileDistance,
     RangeEstimatorDistance,
@@ -52,6 +53,7 @@ __all__ = [
     "AdaptivePNormDistance",
     "ZScoreDistance",
     "PCADistance",
+    "AdaptivePCADistance",
     "MinMaxDistance",
     "PercentileDistance",
     "RangeEstimatorDistance",
@@ -1,6 +1,7 @@
 from abc import ABC, abstractmethod
-from typing import List, Callable
+from typing import List, Callable, Union
 import json
+import numpy as np
 
 from ..sampler import Sampler
 
@@ -131,6 +132,72 @@ class Distance(ABC):
             observed data.
         """
 
+    def distances(
+            self,
+            xs: List[dict],
+            x_0: dict,
+            t: int = None,
+            pars: List[dict] = None) -> np.ndarray:
+        """
+        Evaluate the distances of several summary statistics at once.
+
+        The default is to call the distance once per entry. Subclasses can
+        override this with a vectorized implementation.
+
+        Parameters
+        ----------
+
+        xs: List[dict]
+            Summary statistics of the simulated data.
+        x_0, t:
+            As in :meth:`__call__`.
+        pars: List[dict], optional
+            The parameters used to create the summary statistics `xs`.
+
+        Returns
+        -------
+
+        distances: np.ndarray
+            The distances, one per entry of `xs`.
+        """
+        if pars is None:
+            pars = [None] * len(xs)
+        return np.array([self(x, x_0, t, par) for x, par in zip(xs, pars)],
+                        dtype=float)
+
+    def lower_bound(
+            self,
+            x: dict,
+            x_0: dict,
+            t: int = None,
+            previous: float = 0.) -> Union[float, None]:
+        """
+        A lower bound of the distance of any summary statistics which
+        contain the partial summary statistics `x`, given the lower bound
+        `previous` obtained for earlier, disjoint, partial summary
+        statistics. This allows to reject simulations early, see
+        :class:`pyabc.model.IncrementalModel`.
+
+        The default is that no bound is available.
+
+        Parameters
+        ----------
+
+        x: dict
+            A chunk of the summary statistics of the simulated data.
+        x_0, t:
+            As in :meth:`__call__`.
+        previous: float, optional (default = 0)
+            The lower bound of the previous chunks.
+
+        Returns
+        -------
+
+        lower_bound: Union[float, None]
+            The lower bound, or None if not available.
+        """
+        return None
+
     def get_config(self) -> dict:
         """
         Return configuration of the distance.
@@ -1,17 +1,48 @@
+import math
 import scipy as sp
 import numpy as np
 from scipy import linalg as la
-from typing import List, Callable
+from typing import List, Callable, Union
 import logging
 
 from ..sampler import Sampler
 from .scales import standard_deviation
+from .streaming import SumStatsAccumulator, STREAMING_SCALES, streaming_scale
 from .base import Distance
+from .layout import create_layout
 
 
 logger = logging.getLogger("Distance")
 
 
+def _to_value(weight: np.ndarray):
+    """
+    A weight as float, or as array for array-valued summary statistics.
+    """
+    weight = np.asarray(weight, dtype=float)
+    if weight.ndim == 0:
+        return weight.item()
+    return weight
+
+
+def _flatten(w: dict) -> np.ndarray:
+    """
+    All weights, of all entries of all summary statistics, as one vector.
+    """
+    if not w:
+        return np.empty(0)
+    return np.concatenate([np.ravel(value) for value in w.values()])
+
+
+def _call_overridden(distance: Distance, cls: type) -> bool:
+    """
+    Whether a subclass of `cls` overrides ``__call__`` of `distance`, such
+    that the compiled evaluation of `cls` does not match the distance.
+    """
+    mro = type(distance).__mro__
+    return any("__call__" in vars(sub) for sub in mro[:mro.index(cls)])
+
+
 class PNormDistance(Distance):
     """
     Use weighted p-norm
@@ -36,8 +67,24 @@ class PNormDistance(Distance):
         If None is passed, a weight of 1 is considered for every summary
         statistic. If no entry is available in w for a given time point,
         the maximum available time point is selected.
+        For array-valued summary statistics, a weight is either a number,
+        applied to all entries, or an array of the statistic's shape, with
+        one weight per entry.
+
+    Once initialized, the distance is evaluated on vectors: The order of the
+    summary statistics is fixed from the observed data, scalar and
+    array-valued statistics are flattened into one vector, see
+    :class:`pyabc.distance.layout.SumStatLayout`, and the weights are
+    expanded to a vector per time point. Summary statistics which do not fit
+    this layout, e.g. because a statistic is missing, are evaluated entry by
+    entry as before. Use :meth:`distances` to evaluate many summary
+    statistics at once.
     """
 
+    # up to this number of scalar summary statistics, single distances are
+    # evaluated in a loop, as numpy's overhead dominates
+    MAX_LOOP_SIZE = 20
+
     def __init__(self,
                  p: float = 2,
                  w: dict = None):
@@ -49,6 +96,30 @@ class PNormDistance(Distance):
 
         self.w = w
 
+        # compiled layout, and the observed data and weights as vectors
+        self._layout = None
+        self._loop = False
+        self._x_0 = None
+        self._x_0_vec = None
+        self._w_vecs = {}
+        self._w_terms = {}
+
+    def initialize(self,
+                   t: int,
+                   get_sum_stats: Callable[[], List[dict]],
+                   x_0: dict = None):
+        """
+        Compile the layout of the summary statistics from `x_0`.
+        """
+        self._layout = create_layout(x_0)
+        if self._layout is not None:
+            self._x_0 = x_0
+            self._x_0_vec = self._layout.to_vector(x_0)
+            self._loop = self._layout.is_scalar \
+                and self._layout.size <= self.MAX_LOOP_SIZE
+        self._w_vecs = {}
+        self._w_terms = {}
+
     def __call__(self,
                  x: dict,
                  x_0: dict,
@@ -62,23 +133,206 @@ class PNormDistance(Distance):
         if t not in self.w:
             t = max(self.w)
 
+        if self._layout is not None:
+            try:
+                return self._compiled_distance(x, x_0, t)
+            except (KeyError, ValueError, TypeError):
+                # does not fit the layout
+                pass
+
         # extract weights for time point
         w = self.w[t]
 
-        # compute distance
+        # compute distance, over all entries of array-valued statistics
         if self.p == np.inf:
-            d = max(abs(w[key] * (x[key] - x_0[key]))
+            d = max(np.max(abs(w[key] * (x[key] - x_0[key])))
                     if key in x and key in x_0 else 0
                     for key in w)
         else:
             d = pow(
-                sum(pow(abs(w[key] * (x[key] - x_0[key])), self.p)
+                sum(np.sum(pow(abs(w[key] * (x[key] - x_0[key])), self.p))
                     if key in x and key in x_0 else 0
                     for key in w),
                 1 / self.p)
 
         return d
 
+    def distances(self,
+                  xs: List[dict],
+                  x_0: dict,
+                  t: int = None,
+                  pars: List[dict] = None) -> np.ndarray:
+        if self._layout is None or len(xs) == 0 \
+                or _call_overridden(self, PNormDistance):
+            return super().distances(xs, x_0, t, pars)
+        if self.w is None:
+            self._set_default_weights(t, xs[0].keys())
+        if t not in self.w:
+            t = max(self.w)
+        try:
+            xs_mat = self._layout.to_matrix(xs)
+            x_0_vec = self._x_0_vector(x_0)
+        except (KeyError, ValueError, TypeError):
+            return super().distances(xs, x_0, t, pars)
+        return self._norm(self._weight_vector(t) * (xs_mat - x_0_vec),
+                          axis=-1)
+
+    def lower_bound(self,
+                    x: dict,
+                    x_0: dict,
+                    t: int = None,
+                    previous: float = 0.) -> Union[float, None]:
+        """
+        As all terms of the p-norm are non-negative, the distance over the
+        chunk `x` of the summary statistics combined with the `previous`
+        bound is a lower bound, which equals the distance once all chunks
+        are passed. No bound is available if a subclass overrides the
+        evaluation.
+        """
+        if self.w is None or _call_overridden(self, PNormDistance):
+            return None
+        if t not in self.w:
+            t = max(self.w)
+        w = self.w[t]
+
+        terms = [np.abs(w[key] * (np.asarray(x[key], dtype=float)
+                                  - x_0[key]))
+                 for key in x if key in w and key in x_0]
+        if self.p == np.inf:
+            return max([previous] + [float(np.max(term, initial=0))
+                                     for term in terms])
+        return pow(pow(previous, self.p)
+                   + sum(float(np.sum(pow(term, self.p))) for term in terms),
+                   1 / self.p)
+
+    def previous_criteria(self, t: int, eps: Callable[[int], float]) \
+            -> Union[Callable[[dict, dict], Union[bool, None]], None]:
+        """
+        Stack the acceptance criteria ``d(x, x_0, t_prev) <= eps(t_prev)``
+        of all time points ``t_prev < t``, such that they are checked at
+        once, via a product of the stacked weights and the residual vector,
+        see :class:`pyabc.acceptor.CompleteHistoryAcceptor`. Time points
+        for which the weights or epsilon are not available are not used.
+        As in the distance, terms with zero weight are dropped.
+
+        Parameters
+        ----------
+
+        t: int
+            The current time point.
+
+        eps: Callable[[int], float]
+            The acceptance threshold by time point.
+
+        Returns
+        -------
+
+        check: Callable[[dict, dict], bool or None]
+            Function of `x` and `x_0` returning whether all criteria are
+            met, or None if `x` does not fit the layout. None if the
+            distance is not compiled, or a subclass overrides its
+            evaluation.
+        """
+        if self._layout is None or self.w is None \
+                or _call_overridden(self, PNormDistance):
+            return None
+
+        weights, epsilons = [], []
+        for t_prev in range(0, t):
+            try:
+                eps_prev = float(eps(t_prev))
+                t_w = t_prev if t_prev in self.w else max(self.w)
+                weights.append(self._weight_vector(t_w))
+            except Exception:
+                # ignore as of now
+                continue
+            epsilons.append(eps_prev)
+        weights = np.abs(np.asarray(weights, dtype=float)).reshape(
+            len(epsilons), self._layout.size)
+        epsilons = np.asarray(epsilons, dtype=float)
+        if self.p != np.inf:
+            # compare the distances to the power of p
+            weights = weights ** self.p
+            epsilons = epsilons ** self.p
+        zero = weights == 0
+
+        def check(x: dict, x_0: dict) -> Union[bool, None]:
+            try:
+                residual = np.abs(self._layout.to_vector(x)
+                                  - self._x_0_vector(x_0))
+            except (KeyError, ValueError, TypeError):
+                return None
+            if self.p != np.inf:
+                residual = residual ** self.p
+            # zero weights times infinite residuals
+            with np.errstate(invalid="ignore"):
+                terms = weights * residual
+            terms[zero] = 0
+            if self.p == np.inf:
+                d_prev = terms.max(axis=1, initial=0)
+            else:
+                d_prev = terms.sum(axis=1)
+            return bool((d_prev <= epsilons).all())
+
+        return check
+
+    def _compiled_distance(self, x: dict, x_0: dict, t: int) -> float:
+        if self._loop and x_0 is self._x_0:
+            # for few scalars, a loop is faster than numpy
+            terms = self._terms(t)
+            if self.p == 2:
+                return math.sqrt(sum((w * (x[key] - x_0_val)) ** 2
+                                     for key, w, x_0_val in terms))
+            diffs = [abs(w * (x[key] - x_0_val))
+                     for key, w, x_0_val in terms]
+            if self.p == np.inf:
+                return max(diffs, default=0)
+            return pow(sum(pow(diff, self.p) for diff in diffs), 1 / self.p)
+        x_vec = self._layout.to_vector(x)
+        return float(self._norm(
+            self._weight_vector(t) * (x_vec - self._x_0_vector(x_0))))
+
+    def _terms(self, t: int) -> List[tuple]:
+        """
+        The key, weight and observed value of each summary statistic with
+        non-zero weight at time `t`, cached.
+        """
+        if t not in self._w_terms:
+            self._w_terms[t] = [
+                (key, float(w), float(x_0_val)) for key, w, x_0_val in zip(
+                    self._layout.keys, self._weight_vector(t),
+                    self._x_0_vec)
+                if w != 0]
+        return self._w_terms[t]
+
+    def _x_0_vector(self, x_0: dict) -> np.ndarray:
+        """
+        The observed data as vector, cached for the data passed to
+        :meth:`initialize`.
+        """
+        if x_0 is self._x_0:
+            return self._x_0_vec
+        return self._layout.to_vector(x_0)
+
+    def _weight_vector(self, t: int) -> np.ndarray:
+        """
+        The weights at time `t` as vector, cached.
+        """
+        if t not in self._w_vecs:
+            self._w_vecs[t] = self._layout.expand(self.w[t])
+            self._w_terms.pop(t, None)
+        return self._w_vecs[t]
+
+    def _norm(self, weighted_diff: np.ndarray, axis: int = None):
+        weighted_diff = np.abs(weighted_diff)
+        if self.p == np.inf:
+            return weighted_diff.max(axis=axis, initial=0)
+        if self.p == 1:
+            return weighted_diff.sum(axis=axis)
+        if self.p == 2:
+            return np.sqrt((weighted_diff ** 2).sum(axis=axis))
+        return (weighted_diff ** self.p).sum(axis=axis) ** (1 / self.p)
+
     def _set_default_weights(self,
                              t: int,
                              sum_stat_keys):
@@ -88,9 +342,15 @@ class PNormDistance(Distance):
         self.w = {t: {k: 1 for k in sum_stat_keys}}
 
     def get_config(self) -> dict:
+        w = self.w
+        if w is not None:
+            # per entry weights of array-valued summary statistics
+            w = {t: {key: np.asarray(value).tolist()
+                     for key, value in w_t.items()}
+                 for t, w_t in w.items()}
         return {"name": self.__class__.__name__,
                 "p": self.p,
-                "w": self.w}
+                "w": w}
 
 
 class AdaptivePNormDistance(PNormDistance):
@@ -116,6 +376,9 @@ class AdaptivePNormDistance(PNormDistance):
         summary statistic. Implemented are absolute_median_deviation,
         standard_deviation (default), centered_absolute_median_deviation,
         centered_standard_deviation.
+        For array-valued summary statistics, the scale can be an array of
+        the statistic's shape, giving one weight per entry, as all scales
+        in :mod:`pyabc.distance.scales` are.
 
     normalize_weights: bool, optional (default = True)
         Whether to normalize the weights to have mean 1. This just possibly
@@ -127,6 +390,22 @@ class AdaptivePNormDistance(PNormDistance):
         smallest non-zero absolute weight. In practice usually not necessary,
         it is theoretically required to ensure convergence.
 
+    max_nr_recorded: int, optional (default = None)
+        If not None, the scales are estimated from a uniform random
+        subsample of at most this many simulated summary statistics per
+        generation, instead of from all, which bounds the memory required
+        on the master for low acceptance rates. See
+        :class:`pyabc.sampler.Sample`.
+
+    streaming: bool, optional (default = False)
+        If True, the summary statistics are not recorded, but accumulated
+        on the fly by the workers, see :mod:`pyabc.distance.streaming`, such
+        that the memory required is independent of the number of
+        simulations. Standard deviation, bias and root mean square
+        deviation are computed exactly, the median and absolute deviations
+        approximately. This requires one of the scale functions of
+        :mod:`pyabc.distance.scales`.
+
 
     .. [#prangle] Prangle, Dennis. "Adapting the ABC Distance Function".
                 Bayesian Analysis, 2017. doi:10.1214/16-BA1002.
@@ -137,7 +416,9 @@ class AdaptivePNormDistance(PNormDistance):
                  adaptive: bool = True,
                  scale_function=None,
                  normalize_weights: bool = True,
-                 max_weight_ratio: float = None):
+                 max_weight_ratio: float = None,
+                 max_nr_recorded: int = None,
+                 streaming: bool = False):
         # call p-norm constructor
         super().__init__(p=p, w=None)
 
@@ -146,9 +427,15 @@ class AdaptivePNormDistance(PNormDistance):
         if scale_function is None:
             scale_function = standard_deviation
         self.scale_function = scale_function
+        if streaming and scale_function not in STREAMING_SCALES:
+            raise ValueError(
+                f"The scale function {scale_function.__name__} has no "
+                f"streaming equivalent.")
+        self.streaming = streaming
 
         self.normalize_weights = normalize_weights
         self.max_weight_ratio = max_weight_ratio
+        self.max_nr_recorded = max_nr_recorded
 
         self.x_0 = None
 
@@ -165,8 +452,13 @@ class AdaptivePNormDistance(PNormDistance):
         sampler: Sampler
             The sampler employed.
         """
-        if self.adaptive:
+        if not self.adaptive:
+            return
+        if self.streaming:
+            sampler.sample_factory.accumulate_sum_stats = True
+        else:
             sampler.sample_factory.record_rejected = True
+            sampler.sample_factory.max_nr_recorded = self.max_nr_recorded
 
     def initialize(self,
                    t: int,
@@ -175,6 +467,7 @@ class AdaptivePNormDistance(PNormDistance):
         """
         Initialize weights.
         """
+        super().initialize(t, get_sum_stats, x_0)
         self.x_0 = x_0
 
         # execute function
@@ -185,9 +478,10 @@ class AdaptivePNormDistance(PNormDistance):
 
     def update(self,
                t: int,
-               sum_stats: List[dict]):
+               sum_stats: Union[List[dict], SumStatsAccumulator]):
         """
-        Update weights based on all simulations.
+        Update weights based on all simulations, either recorded or
+        accumulated.
         """
 
         if not self.adaptive:
@@ -199,7 +493,7 @@ class AdaptivePNormDistance(PNormDistance):
 
     def _update(self,
                 t: int,
-                sum_stats: List[dict]):
+                sum_stats: Union[List[dict], SumStatsAccumulator]):
         """
         Here the real update of weights happens.
         """
@@ -207,9 +501,6 @@ class AdaptivePNormDistance(PNormDistance):
         # retrieve keys
         keys = self.x_0.keys()
 
-        # number of samples
-        n_samples = len(sum_stats)
-
         # make sure w_list is initialized
         if self.w is None:
             self.w = {}
@@ -218,23 +509,26 @@ class AdaptivePNormDistance(PNormDistance):
         w = {}
 
         for key in keys:
-            # prepare list for key
-            current_list = []
-            for j in range(n_samples):
-                if key in sum_stats[j]:
-                    current_list.append(sum_stats[j][key])
-
             # compute scaling
-            scale = self.scale_function(data=current_list, x_0=self.x_0[key])
-
-            # compute weight (inverted scale)
-            if np.isclose(scale, 0):
-                # This means that either the summary statistic is not in the
-                # samples, or that all simulations were identical. In either
-                # case, it should be safe to ignore this summary statistic.
-                w[key] = 0
+            if isinstance(sum_stats, SumStatsAccumulator):
+                scale = streaming_scale(
+                    self.scale_function, sum_stats[key], self.x_0[key])
             else:
-                w[key] = 1 / scale
+                current_list = [sum_stat[key] for sum_stat in sum_stats
+                                if key in sum_stat]
+                scale = self.scale_function(
+                    data=current_list, x_0=self.x_0[key])
+
+            # compute weight (inverted scale), per entry for array-valued
+            # summary statistics
+            # A scale of 0 means that either the summary statistic is not in
+            # the samples, or that all simulations were identical. In either
+            # case, it should be safe to ignore this summary statistic.
+            scale = np.asarray(scale, dtype=float)
+            zero = np.isclose(scale, 0)
+            weight = np.divide(1, scale, out=np.zeros_like(scale),
+                               where=~zero)
+            w[key] = _to_value(weight)
 
         # normalize weights to have mean 1
         w = self._normalize_weights(w)
@@ -244,6 +538,8 @@ class AdaptivePNormDistance(PNormDistance):
 
         # add to w attribute, at time t
         self.w[t] = w
+        self._w_vecs.pop(t, None)
+        self._w_terms.pop(t, None)
 
         # logging
         logger.debug("update distance weights = {}".format(self.w[t]))
@@ -258,9 +554,9 @@ class AdaptivePNormDistance(PNormDistance):
         if not self.normalize_weights:
             return w
 
-        mean_weight = np.mean(list(w.values()))
+        mean_weight = np.mean(_flatten(w))
         for key in w:
-            w[key] /= mean_weight
+            w[key] = _to_value(w[key] / mean_weight)
 
         return w
 
@@ -277,15 +573,14 @@ class AdaptivePNormDistance(PNormDistance):
             return w
 
         # find minimum weight != 0
-        w_arr = np.array(list(w.values()))
+        w_arr = _flatten(w)
         min_abs_weight = np.min(np.abs(w_arr[w_arr != 0]))
         # can be assumed to be != 0
 
         for key, value in w.items():
             # bound too large weights
-            if abs(value) / min_abs_weight > self.max_weight_ratio:
-                w[key] = np.sign(value) * self.max_weight_ratio \
-                    * min_abs_weight
+            w[key] = _to_value(np.sign(value) * np.minimum(
+                np.abs(value), self.max_weight_ratio * min_abs_weight))
 
         return w
 
@@ -295,7 +590,9 @@ class AdaptivePNormDistance(PNormDistance):
                 "adaptive": self.adaptive,
                 "scale_function": self.scale_function.__name__,
                 "normalize_weights": self.normalize_weights,
-                "max_weight_ratio": self.max_weight_ratio}
+                "max_weight_ratio": self.max_weight_ratio,
+                "max_nr_recorded": self.max_nr_recorded,
+                "streaming": self.streaming}
 
 
 class DistanceWithMeasureList(Distance):
@@ -317,13 +614,47 @@ class DistanceWithMeasureList(Distance):
         super().__init__()
         # the measures (summary statistics) to use for distance calculation
         self.measures_to_use = measures_to_use
+        # compiled layout of the measures, see PNormDistance
+        self._layout = None
 
     def initialize(self,
                    t: int,
                    get_sum_stats: Callable[[], List[dict]],
                    x_0: dict = None):
         if self.measures_to_use == 'all':
-            self.measures_to_use = x_0.keys()
+            self.measures_to_use = list(x_0.keys())
+        self._layout = create_layout(x_0, self.measures_to_use)
+
+    def distances(self,
+                  xs: List[dict],
+                  x_0: dict,
+                  t: int = None,
+                  pars: List[dict] = None) -> np.ndarray:
+        # the class whose evaluation is vectorized
+        cls = next(cls for cls in type(self).__mro__
+                   if "_vectorized_distances" in vars(cls))
+        if self._layout is None or len(xs) == 0 \
+                or _call_overridden(self, cls):
+            return super().distances(xs, x_0, t, pars)
+        try:
+            xs_mat = self._layout.to_matrix(xs)
+            x_0_vec = self._layout.to_vector(x_0)
+        except (KeyError, ValueError, TypeError):
+            return super().distances(xs, x_0, t, pars)
+        distances = self._vectorized_distances(xs_mat, x_0_vec)
+        if distances is None:
+            return super().distances(xs, x_0, t, pars)
+        return distances
+
+    def _vectorized_distances(self, xs_mat: np.ndarray,
+                              x_0_vec: np.ndarray) -> np.ndarray:
+        """
+        Evaluate the distances of the rows of `xs_mat` to `x_0_vec`, in the
+        layout of the measures. Returns None if not implemented, then the
+        distances are evaluated one by one. This is also the case if a
+        subclass overrides ``__call__`` of the implementing class.
+        """
+        return None
 
     def get_config(self):
         config = super().get_config()
@@ -353,6 +684,13 @@ class ZScoreDistance(DistanceWithMeasureList):
                    (0 if x[key] == 0 else np.inf)
                    for key in self.measures_to_use) / len(self.measures_to_use)
 
+    def _vectorized_distances(self, xs_mat, x_0_vec):
+        diff = xs_mat - x_0_vec
+        with np.errstate(divide='ignore', invalid='ignore'):
+            z_scores = np.where(x_0_vec != 0, np.abs(diff / x_0_vec),
+                                np.where(diff == 0, 0, np.inf))
+        return z_scores.sum(axis=-1) / len(self.measures_to_use)
+
 
 class PCADistance(DistanceWithMeasureList):
     """
@@ -365,31 +703,57 @@ class PCADistance(DistanceWithMeasureList):
     .. math::
 
         d(x,y) = \\| Wx - Wy \\|
+
+    Once initialized, the whitened observed data :math:`Wy` is cached, such
+    that a distance is a single matrix-vector product on the summary
+    statistics' vector.
     """
 
     def __init__(self, measures_to_use='all'):
         super().__init__(measures_to_use)
         self._whitening_transformation_matrix = None
+        # observed data, and its whitened vector
+        self._x_0 = None
+        self._whitened_x_0 = None
 
     def _dict_to_vect(self, x):
+        if self._layout is not None:
+            return self._layout.to_vector(x)
         return sp.asarray([x[key] for key in self.measures_to_use])
 
     def _calculate_whitening_transformation_matrix(self, sum_stats):
-        samples_vec = sp.asarray([self._dict_to_vect(x)
-                                  for x in sum_stats])
+        if self._layout is not None:
+            samples_vec = self._layout.to_matrix(sum_stats)
+        else:
+            samples_vec = sp.asarray([self._dict_to_vect(x)
+                                      for x in sum_stats])
         # samples_vec is an array of shape nr_samples x nr_features
         means = samples_vec.mean(axis=0)
         centered = samples_vec - means
         covariance = centered.T.dot(centered)
+        self._set_whitening_transformation_matrix(
+            self._whitening(covariance))
+
+    @staticmethod
+    def _whitening(covariance: np.ndarray) -> np.ndarray:
+        """
+        The symmetric whitening matrix of the `covariance`.
+        """
         w, v = la.eigh(covariance)
-        self._whitening_transformation_matrix = (
-            v.dot(sp.diag(1. / sp.sqrt(w))).dot(v.T))
+        return v.dot(sp.diag(1. / sp.sqrt(w))).dot(v.T)
+
+    def _set_whitening_transformation_matrix(self, matrix: np.ndarray):
+        self._whitening_transformation_matrix = matrix
+        self._whitened_x_0 = None
+        if self._x_0 is not None:
+            self._whitened_x_0 = matrix.dot(self._dict_to_vect(self._x_0))
 
     def initialize(self,
                    t: int,
                    get_sum_stats: Callable[[], List[dict]],
                    x_0: dict = None):
         super().initialize(t, get_sum_stats, x_0)
+        self._x_0 = x_0 if self._layout is not None else None
 
         # execute function
         sum_stats = get_sum_stats()
@@ -401,11 +765,134 @@ class PCADistance(DistanceWithMeasureList):
                  x_0: dict,
                  t: int = None,
                  par: dict = None) -> float:
+        if x_0 is self._x_0 and self._whitened_x_0 is not None:
+            try:
+                diff = self._whitening_transformation_matrix.dot(
+                    self._layout.to_vector(x)) - self._whitened_x_0
+                return float(np.sqrt(diff.dot(diff)))
+            except (KeyError, ValueError, TypeError):
+                pass
         x_vec, x_0_vec = self._dict_to_vect(x), self._dict_to_vect(x_0)
         distance = la.norm(
             self._whitening_transformation_matrix.dot(x_vec - x_0_vec), 2)
         return distance
 
+    def _vectorized_distances(self, xs_mat, x_0_vec):
+        whitened = (xs_mat - x_0_vec).dot(
+            self._whitening_transformation_matrix.T)
+        return np.sqrt((whitened ** 2).sum(axis=-1))
+
+
+class AdaptivePCADistance(PCADistance):
+    """
+    In the whitened distance of the :class:`PCADistance`, adapt the
+    whitening for each generation, based on the covariance of the previous
+    simulations, analogous to the :class:`AdaptivePNormDistance`.
+
+    The covariance is normalized by the number of simulations, such that
+    the distances are comparable across generations. Directions of
+    vanishing variance, e.g. of constant summary statistics, are ignored,
+    i.e. a pseudo-inverse square root of the covariance is used.
+
+    Parameters
+    ----------
+
+    measures_to_use: Union[str, List[str]], optional (default = 'all')
+        The summary statistics to use.
+
+    adaptive: bool, optional (default = True)
+        True: Adapt the whitening after each iteration.
+        False: Compute the whitening only once at the beginning in
+        initialize().
+
+    streaming: bool, optional (default = False)
+        If True, the summary statistics are not recorded, but their
+        covariance is accumulated on the fly by the workers, see
+        :class:`pyabc.distance.streaming.CovarianceStatistics`, such that
+        the memory on the master is independent of the number of
+        simulations, and quadratic in the number of summary statistics.
+
+    rtol: float, optional (default = 1e-10)
+        Eigenvalues of the covariance below `rtol` times the largest one
+        are considered vanishing.
+    """
+
+    def __init__(self,
+                 measures_to_use='all',
+                 adaptive: bool = True,
+                 streaming: bool = False,
+                 rtol: float = 1e-10):
+        super().__init__(measures_to_use)
+        self.adaptive = adaptive
+        self.streaming = streaming
+        self.rtol = rtol
+
+    def configure_sampler(self,
+                          sampler: Sampler):
+        """
+        Make the sampler record, or accumulate, the summary statistics of
+        all simulations, accepted and rejected.
+        """
+        if not self.adaptive:
+            return
+        if self.streaming:
+            sampler.sample_factory.accumulate_sum_stats = True
+            sampler.sample_factory.accumulate_covariance = True
+        else:
+            sampler.sample_factory.record_rejected = True
+
+    def _calculate_whitening_transformation_matrix(self, sum_stats):
+        # ignore incomplete summary statistics, e.g. of truncated
+        # simulations
+        sum_stats = [x for x in sum_stats
+                     if all(key in x for key in self.measures_to_use)]
+        if self._layout is not None:
+            samples_vec = self._layout.to_matrix(sum_stats)
+        else:
+            samples_vec = sp.asarray([self._dict_to_vect(x)
+                                      for x in sum_stats])
+        centered = samples_vec - samples_vec.mean(axis=0)
+        covariance = centered.T.dot(centered) / len(samples_vec)
+        self._set_whitening_transformation_matrix(
+            self._whitening(covariance))
+
+    def _whitening(self, covariance: np.ndarray) -> np.ndarray:
+        w, v = la.eigh(covariance)
+        nonzero = w > self.rtol * max(w.max(initial=0), 0)
+        inv_sqrt = np.zeros_like(w)
+        inv_sqrt[nonzero] = 1. / np.sqrt(w[nonzero])
+        return (v * inv_sqrt).dot(v.T)
+
+    def update(self,
+               t: int,
+               sum_stats: Union[List[dict], SumStatsAccumulator]):
+        """
+        Update the whitening based on all simulations, either recorded or
+        accumulated.
+        """
+        if not self.adaptive:
+            return False
+
+        if isinstance(sum_stats, SumStatsAccumulator):
+            if sum_stats.covariance is None:
+                raise ValueError(
+                    "The covariance of the summary statistics was not "
+                    "accumulated.")
+            covariance = sum_stats.covariance.covariance(self._layout)
+            self._set_whitening_transformation_matrix(
+                self._whitening(covariance))
+        else:
+            self._calculate_whitening_transformation_matrix(sum_stats)
+
+        return True
+
+    def get_config(self):
+        config = super().get_config()
+        config.update({"adaptive": self.adaptive,
+                       "streaming": self.streaming,
+                       "rtol": self.rtol})
+        return config
+
 
 class RangeEstimatorDistance(DistanceWithMeasureList):
     """
@@ -499,6 +986,10 @@ class RangeEstimatorDistance(DistanceWithMeasureList):
                        for key in self.measures_to_use)
         return distance
 
+    def _vectorized_distances(self, xs_mat, x_0_vec):
+        normalization = self._layout.expand(self.normalization)
+        return np.abs((xs_mat - x_0_vec) / normalization).sum(axis=-1)
+
 
 class MinMaxDistance(RangeEstimatorDistance):
     """
@@ -0,0 +1,117 @@
+"""
+Fixed layout of summary statistics, to evaluate distances on vectors.
+"""
+
+from typing import List
+
+import numpy as np
+
+
+class SumStatLayout:
+    """
+    A fixed order of summary statistics, taken from a reference, e.g. the
+    observed data, by which summary statistics dictionaries are flattened
+    into one contiguous float vector. Scalar and array-valued statistics
+    are supported, arrays are raveled.
+
+    Parameters
+    ----------
+
+    x_0: dict
+        The reference summary statistics, defining the shapes.
+
+    keys: List, optional
+        The keys to use, in this order. Defaults to all keys of `x_0`.
+
+    Raises
+    ------
+
+    TypeError, ValueError
+        If a value of `x_0` is not numeric.
+    """
+
+    def __init__(self, x_0: dict, keys: List = None):
+        if keys is None:
+            keys = x_0.keys()
+        self.keys = list(keys)
+        self.shapes = []
+        for key in self.keys:
+            value = np.asarray(x_0[key])
+            if value.dtype.kind not in "biuf":
+                raise TypeError(f"Summary statistic {key} is not numeric.")
+            self.shapes.append(value.shape)
+        self.sizes = [int(np.prod(shape)) for shape in self.shapes]
+        self.size = sum(self.sizes)
+        self.is_scalar = all(shape == () for shape in self.shapes)
+
+    def to_vector(self, x: dict) -> np.ndarray:
+        """
+        Flatten the summary statistics `x`.
+
+        Raises
+        ------
+
+        KeyError
+            If a statistic is missing in `x`.
+        ValueError
+            If a statistic has a different size than in the reference.
+        """
+        if self.is_scalar:
+            return np.array([x[key] for key in self.keys], dtype=float)
+        vector = np.concatenate(
+            [np.asarray(x[key], dtype=float).ravel() for key in self.keys])
+        if vector.size != self.size:
+            raise ValueError("The summary statistics do not match the "
+                             "layout.")
+        return vector
+
+    def to_matrix(self, xs: List[dict]) -> np.ndarray:
+        """
+        Flatten a list of summary statistics, into the rows of a matrix.
+        """
+        if self.is_scalar:
+            matrix = np.array([[x[key] for key in self.keys] for x in xs],
+                              dtype=float)
+        else:
+            matrix = np.array([self.to_vector(x) for x in xs])
+        return matrix.reshape(len(xs), self.size)
+
+    def expand(self, values: dict, default: float = 0.) -> np.ndarray:
+        """
+        Expand one value per key, e.g. a weight, to a vector. Scalar values
+        are repeated for all entries of array-valued statistics, arrays of
+        the statistic's size are taken per entry.
+        Missing keys get the `default`.
+
+        Raises
+        ------
+
+        ValueError
+            If an array value does not match the statistic's size.
+        """
+        parts = []
+        for key, size in zip(self.keys, self.sizes):
+            value = np.asarray(values.get(key, default), dtype=float)
+            if value.size == 1:
+                parts.append(np.full(size, value.item()))
+            elif value.size == size:
+                parts.append(value.ravel())
+            else:
+                raise ValueError(
+                    f"The value of {key} does not match the layout.")
+        if not parts:
+            return np.empty(0)
+        return np.concatenate(parts)
+
+
+def create_layout(x_0: dict, keys: List = None):
+    """
+    Create the layout of `x_0`, or None if there is no `x_0` or the
+    statistics are not all numeric.
+    """
+    if x_0 is None:
+        return None
+    try:
+        return SumStatLayout(x_0, keys)
+    except (TypeError, ValueError, KeyError):
+        return None
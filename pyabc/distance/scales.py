@@ -19,6 +19,10 @@ in addition the following:
 
 Here, "only distance to observation" means that the in-sample variation
 is not taken into account.
+
+For array-valued summary statistics, data has the shape
+(n_samples,) + shape, and all scales are computed per entry, along the
+first axis, returning an array of the statistic's shape.
 """
 
 
@@ -33,7 +37,7 @@ def median_absolute_deviation(**kwargs):
     median(abs(data - median(data)).
     """
     data = np.asarray(kwargs['data'])
-    mad = np.median(np.abs(data - np.median(data)))
+    mad = np.median(np.abs(data - np.median(data, axis=0)), axis=0)
     return mad
 
 
@@ -42,7 +46,7 @@ def mean_absolute_deviation(**kwargs):
     Calculate the mean absolute deviation from the mean.
     """
     data = np.asarray(kwargs['data'])
-    mad = np.mean(np.abs(data - np.mean(data)))
+    mad = np.mean(np.abs(data - np.mean(data, axis=0)), axis=0)
     return mad
 
 
@@ -52,7 +56,7 @@ def standard_deviation(**kwargs):
     <https://en.wikipedia.org/wiki/Standard_deviation/>`_.
     """
     data = np.asarray(kwargs['data'])
-    std = np.std(data)
+    std = np.std(data, axis=0)
     return std
 
 
@@ -62,7 +66,7 @@ def bias(**kwargs):
     """
     data = np.asarray(kwargs['data'])
     x_0 = kwargs['x_0']
-    bias = np.abs(np.mean(data) - x_0)
+    bias = np.abs(np.mean(data, axis=0) - x_0)
     return bias
 
 
@@ -84,7 +88,7 @@ def median_absolute_deviation_to_observation(**kwargs):
     """
     data = np.asarray(kwargs['data'])
     x_0 = kwargs['x_0']
-    mado = np.median(np.abs(data - x_0))
+    mado = np.median(np.abs(data - x_0), axis=0)
     return mado
 
 
@@ -94,7 +98,7 @@ def mean_absolute_deviation_to_observation(**kwargs):
     """
     data = np.asarray(kwargs['data'])
     x_0 = kwargs['x_0']
-    mado = np.mean(np.abs(data - x_0))
+    mado = np.mean(np.abs(data - x_0), axis=0)
     return mado
 
 
@@ -127,5 +131,5 @@ def standard_deviation_to_observation(**kwargs):
     """
     data = np.asarray(kwargs['data'])
     x_0 = kwargs['x_0']
-    stdo = np.std(np.abs(data - x_0))
+    stdo = np.std(np.abs(data - x_0), axis=0)
     return stdo
@@ -0,0 +1,486 @@
+"""
+Streaming estimation of the scales of summary statistics, for the
+:class:`pyabc.distance.AdaptivePNormDistance` with ``streaming=True``.
+
+Instead of recording all simulated summary statistics, the workers update
+a :class:`SumStatsAccumulator` per :class:`pyabc.sampler.Sample` as they
+simulate, which the samplers merge. The memory required is thus independent
+of the number of simulations.
+
+Per summary statistic, mean and variance are accumulated exactly via
+Welford's algorithm, and the distribution approximately via a
+:class:`QuantileSketch`, from which the median and absolute deviations are
+estimated. For array-valued summary statistics, mean and variance are
+accumulated per entry, so that only the moment based scales, i.e.
+standard deviation, bias and root mean square deviation, are available.
+
+Optionally, the covariance of all numeric summary statistics is accumulated
+in a :class:`CovarianceStatistics`, e.g. for the
+:class:`pyabc.distance.AdaptivePCADistance`.
+"""
+
+import numpy as np
+
+from . import scales
+from .layout import SumStatLayout
+
+
+class QuantileSketch:
+    """
+    Mergeable approximation of a distribution by at most `max_bins`
+    weighted centroids.
+
+    New values are buffered, and buffer and centroids compressed to equal
+    count bins once the buffer is full. As long as fewer than `max_bins`
+    values were added, the sketch is exact.
+
+    Parameters
+    ----------
+
+    max_bins: int, optional (default = 200)
+        Maximum number of centroids.
+    """
+
+    def __init__(self, max_bins: int = 200):
+        self.max_bins = max_bins
+        self.values = np.empty(0)
+        self.counts = np.empty(0)
+        self._buffer = []
+
+    def add(self, value: float):
+        self._buffer.append(value)
+        if len(self._buffer) >= self.max_bins:
+            self._flush()
+
+    def merge(self, other: "QuantileSketch"):
+        """
+        Add the values of `other`, in place.
+        """
+        self._flush()
+        other._flush()
+        self._compress(np.concatenate((self.values, other.values)),
+                       np.concatenate((self.counts, other.counts)))
+
+    def _flush(self):
+        if self._buffer:
+            buffer = np.asarray(self._buffer, dtype=float)
+            self._buffer = []
+            self._compress(np.concatenate((self.values, buffer)),
+                           np.concatenate((self.counts,
+                                           np.ones(len(buffer)))))
+
+    def _compress(self, values, counts):
+        order = np.argsort(values, kind="mergesort")
+        values, counts = values[order], counts[order]
+        if len(values) > self.max_bins:
+            # assign the centroids to equal count bins by the cumulative
+            # count at their center, and merge the centroids per bin
+            centers = np.cumsum(counts) - counts / 2
+            bins = np.floor(centers / counts.sum() * self.max_bins)
+            bins = np.unique(bins, return_inverse=True)[1]
+            new_counts = np.bincount(bins, weights=counts)
+            values = np.bincount(bins, weights=values * counts) / new_counts
+            counts = new_counts
+        self.values, self.counts = values, counts
+
+    def centroids(self) -> (np.ndarray, np.ndarray):
+        """
+        Returns
+        -------
+
+        values, counts: np.ndarray, np.ndarray
+            The sorted centroids and their counts.
+        """
+        self._flush()
+        return self.values, self.counts
+
+    def quantile(self, q: float) -> float:
+        return weighted_quantile(*self.centroids(), q)
+
+
+def weighted_quantile(values: np.ndarray, weights: np.ndarray,
+                      q: float) -> float:
+    """
+    Quantile of weighted values, interpolating between the centers of the
+    values' weights. For unit weights, the median equals ``np.median``.
+    """
+    if len(values) == 0:
+        return np.nan
+    order = np.argsort(values, kind="mergesort")
+    values, weights = values[order], weights[order]
+    centers = np.cumsum(weights) - weights / 2
+    return float(np.interp(q * weights.sum(), centers, values))
+
+
+class StreamingStatistics:
+    """
+    Accumulated statistics of one summary statistic.
+
+    Parameters
+    ----------
+
+    max_bins: int, optional (default = 200)
+        Maximum number of centroids of the quantile sketch.
+
+    shape: tuple, optional (default = ())
+        The shape of the summary statistic. For array-valued statistics,
+        the moments are accumulated per entry, and there is no sketch.
+
+    Attributes
+    ----------
+
+    n: int
+        Number of values.
+
+    mean, m2: Union[float, np.ndarray]
+        Mean and sum of squared deviations from the mean, via Welford's
+        algorithm.
+
+    sketch: QuantileSketch
+        Approximation of the distribution, None for array-valued
+        statistics.
+    """
+
+    def __init__(self, max_bins: int = 200, shape: tuple = ()):
+        self.n = 0
+        self.shape = shape
+        if shape == ():
+            self.mean = 0.
+            self.m2 = 0.
+            self.sketch = QuantileSketch(max_bins)
+        else:
+            self.mean = np.zeros(shape)
+            self.m2 = np.zeros(shape)
+            self.sketch = None
+
+    def add(self, value):
+        self.n += 1
+        delta = value - self.mean
+        self.mean = self.mean + delta / self.n
+        self.m2 = self.m2 + delta * (value - self.mean)
+        if self.sketch is not None:
+            self.sketch.add(value)
+
+    def merge(self, other: "StreamingStatistics"):
+        """
+        Add the values of `other`, in place.
+        """
+        n = self.n + other.n
+        if n == 0:
+            return
+        delta = other.mean - self.mean
+        self.mean = self.mean + delta * other.n / n
+        self.m2 = self.m2 + other.m2 + delta ** 2 * self.n * other.n / n
+        self.n = n
+        if self.sketch is not None:
+            self.sketch.merge(other.sketch)
+
+    @property
+    def std(self):
+        """
+        Standard deviation, as ``np.std``.
+        """
+        return np.sqrt(self.m2 / self.n) if self.n > 0 else np.nan
+
+
+class CovarianceStatistics:
+    """
+    Accumulated mean and covariance of all numeric summary statistics,
+    flattened to vectors in the :class:`pyabc.distance.layout.SumStatLayout`
+    of the first summary statistics added.
+
+    Vectors are buffered and added in batches, such that the cost per
+    vector is a rank-`batch_size` update via one matrix product, instead of
+    an outer product per vector. Summary statistics which do not match the
+    layout are ignored.
+
+    Parameters
+    ----------
+
+    batch_size: int, optional (default = 100)
+        Number of vectors to buffer.
+    """
+
+    def __init__(self, batch_size: int = 100):
+        self.batch_size = batch_size
+        self.layout = None
+        self.n = 0
+        self.mean = None
+        self.m2 = None
+        self._buffer = []
+
+    def add(self, sum_stats: dict):
+        if not sum_stats:
+            # e.g. a truncated simulation
+            return
+        if self.layout is None:
+            keys = [key for key, value in sum_stats.items()
+                    if np.asarray(value).dtype.kind in "biuf"]
+            self.layout = SumStatLayout(sum_stats, keys)
+            self.mean = np.zeros(self.layout.size)
+            self.m2 = np.zeros((self.layout.size, self.layout.size))
+        try:
+            self._buffer.append(self.layout.to_vector(sum_stats))
+        except (KeyError, ValueError, TypeError):
+            return
+        if len(self._buffer) >= self.batch_size:
+            self._flush()
+
+    def _flush(self):
+        if not self._buffer:
+            return
+        batch = np.asarray(self._buffer)
+        self._buffer = []
+        mean = batch.mean(axis=0)
+        centered = batch - mean
+        self._merge_moments(len(batch), mean, centered.T.dot(centered))
+
+    def _merge_moments(self, n: int, mean: np.ndarray, m2: np.ndarray):
+        # pairwise update of Chan et al.
+        n_total = self.n + n
+        if n_total == 0:
+            return
+        delta = mean - self.mean
+        self.mean = self.mean + delta * n / n_total
+        self.m2 = self.m2 + m2 \
+            + np.outer(delta, delta) * self.n * n / n_total
+        self.n = n_total
+
+    def merge(self, other: "CovarianceStatistics"):
+        """
+        Add the values of `other`, in place.
+
+        Raises
+        ------
+
+        ValueError
+            If the layouts are incompatible.
+        """
+        other._flush()
+        if other.layout is None:
+            return
+        if self.layout is None:
+            self.layout = other.layout
+            self.mean = np.zeros(other.layout.size)
+            self.m2 = np.zeros((other.layout.size, other.layout.size))
+        self._flush()
+        ix = _layout_indices(self.layout, other.layout)
+        self._merge_moments(other.n, other.mean[ix], other.m2[np.ix_(ix, ix)])
+
+    def covariance(self, layout: SumStatLayout = None) -> np.ndarray:
+        """
+        The covariance, as ``np.cov(..., bias=True)``, optionally in the
+        order of the statistics of another `layout`.
+
+        Raises
+        ------
+
+        ValueError
+            If `layout` requires statistics which were not accumulated.
+        """
+        self._flush()
+        if self.n == 0:
+            raise ValueError("No summary statistics were accumulated.")
+        covariance = self.m2 / self.n
+        if layout is None:
+            return covariance
+        ix = _layout_indices(layout, self.layout)
+        return covariance[np.ix_(ix, ix)]
+
+
+def _layout_indices(layout: SumStatLayout,
+                    reference: SumStatLayout) -> np.ndarray:
+    """
+    The indices of the entries of `layout` in the vectors of `reference`.
+
+    Raises
+    ------
+
+    ValueError
+        If `reference` does not contain all statistics of `layout` with the
+        same sizes.
+    """
+    offsets = dict(zip(reference.keys, np.cumsum([0] + reference.sizes)))
+    sizes = dict(zip(reference.keys, reference.sizes))
+    indices = []
+    for key, size in zip(layout.keys, layout.sizes):
+        if sizes.get(key) != size:
+            raise ValueError(
+                f"The summary statistic {key} does not match the layout.")
+        indices.append(np.arange(offsets[key], offsets[key] + size))
+    if not indices:
+        return np.empty(0, dtype=int)
+    return np.concatenate(indices)
+
+
+class SumStatsAccumulator:
+    """
+    Accumulated :class:`StreamingStatistics` of all numeric summary
+    statistics, by key. Other summary statistics, and values which do not
+    match the shape of the first value of a key, are ignored.
+
+    Parameters
+    ----------
+
+    max_bins: int, optional (default = 200)
+        Maximum number of centroids of the quantile sketches.
+
+    covariance: bool, optional (default = False)
+        Whether to accumulate also the covariance of all numeric summary
+        statistics, in the :class:`CovarianceStatistics` attribute
+        `covariance`.
+    """
+
+    def __init__(self, max_bins: int = 200, covariance: bool = False):
+        self.max_bins = max_bins
+        self.stats = {}
+        self.covariance = CovarianceStatistics() if covariance else None
+
+    def update(self, sum_stats: dict):
+        """
+        Add the values of one summary statistics dictionary.
+        """
+        if self.covariance is not None:
+            self.covariance.add(sum_stats)
+        for key, value in sum_stats.items():
+            if np.ndim(value) == 0:
+                try:
+                    value = float(value)
+                except (TypeError, ValueError):
+                    continue
+            else:
+                value = np.asarray(value)
+                if value.dtype.kind not in "biuf":
+                    continue
+                value = value.astype(float)
+            shape = np.shape(value)
+            if key not in self.stats:
+                self.stats[key] = StreamingStatistics(self.max_bins, shape)
+            elif self.stats[key].shape != shape:
+                continue
+            self.stats[key].add(value)
+
+    def merge(self, other: "SumStatsAccumulator"):
+        """
+        Add the values of `other`, in place.
+        """
+        for key, stats in other.stats.items():
+            if key not in self.stats:
+                self.stats[key] = StreamingStatistics(
+                    self.max_bins, stats.shape)
+            elif self.stats[key].shape != stats.shape:
+                continue
+            self.stats[key].merge(stats)
+        if self.covariance is not None and other.covariance is not None:
+            self.covariance.merge(other.covariance)
+
+    def __getitem__(self, key) -> StreamingStatistics:
+        if key not in self.stats:
+            return StreamingStatistics(self.max_bins)
+        return self.stats[key]
+
+
+def _deviations(stats: StreamingStatistics, center: float):
+    values, counts = stats.sketch.centroids()
+    return np.abs(values - center), counts
+
+
+def _median_absolute_deviation(stats, x_0):
+    median = stats.sketch.quantile(.5)
+    return weighted_quantile(*_deviations(stats, median), .5)
+
+
+def _mean_absolute_deviation(stats, x_0):
+    deviations, counts = _deviations(stats, stats.mean)
+    return np.average(deviations, weights=counts)
+
+
+def _bias(stats, x_0):
+    return np.abs(stats.mean - x_0)
+
+
+def _root_mean_square_deviation(stats, x_0):
+    return np.sqrt(_bias(stats, x_0) ** 2 + stats.std ** 2)
+
+
+def _median_absolute_deviation_to_observation(stats, x_0):
+    return weighted_quantile(*_deviations(stats, x_0), .5)
+
+
+def _mean_absolute_deviation_to_observation(stats, x_0):
+    deviations, counts = _deviations(stats, x_0)
+    return np.average(deviations, weights=counts)
+
+
+def _combined_median_absolute_deviation(stats, x_0):
+    return _median_absolute_deviation(stats, x_0) \
+        + _median_absolute_deviation_to_observation(stats, x_0)
+
+
+def _combined_mean_absolute_deviation(stats, x_0):
+    return _mean_absolute_deviation(stats, x_0) \
+        + _mean_absolute_deviation_to_observation(stats, x_0)
+
+
+def _standard_deviation_to_observation(stats, x_0):
+    # E[(x - x_0)^2] is exact, the centroids would flatten the tails
+    variance = _root_mean_square_deviation(stats, x_0) ** 2 \
+        - _mean_absolute_deviation_to_observation(stats, x_0) ** 2
+    return np.sqrt(max(variance, 0))
+
+
+def _standard_deviation(stats, x_0):
+    return stats.std
+
+
+# streaming equivalents of the scale functions
+STREAMING_SCALES = {
+    scales.median_absolute_deviation: _median_absolute_deviation,
+    scales.mean_absolute_deviation: _mean_absolute_deviation,
+    scales.standard_deviation: _standard_deviation,
+    scales.bias: _bias,
+    scales.root_mean_square_deviation: _root_mean_square_deviation,
+    scales.median_absolute_deviation_to_observation:
+        _median_absolute_deviation_to_observation,
+    scales.mean_absolute_deviation_to_observation:
+        _mean_absolute_deviation_to_observation,
+    scales.combined_median_absolute_deviation:
+        _combined_median_absolute_deviation,
+    scales.combined_mean_absolute_deviation:
+        _combined_mean_absolute_deviation,
+    scales.standard_deviation_to_observation:
+        _standard_deviation_to_observation,
+}
+
+# scale functions computed from the moments only, which are available also
+# for array-valued summary statistics
+MOMENT_SCALES = [
+    scales.standard_deviation,
+    scales.bias,
+    scales.root_mean_square_deviation,
+]
+
+
+def streaming_scale(scale_function, stats: StreamingStatistics, x_0):
+    """
+    Compute the scale `scale_function` would compute on the accumulated
+    values. Returns 0 if no values were accumulated.
+
+    Raises
+    ------
+
+    ValueError
+        If `scale_function` has no streaming equivalent, or is not moment
+        based for an array-valued summary statistic.
+    """
+    if scale_function not in STREAMING_SCALES:
+        raise ValueError(
+            f"The scale function {scale_function.__name__} has no "
+            f"streaming equivalent.")
+    if stats.sketch is None and scale_function not in MOMENT_SCALES:
+        raise ValueError(
+            f"The scale function {scale_function.__name__} has no "
+            f"streaming equivalent for array-valued summary statistics.")
+    if stats.n == 0:
+        return 0.
+    return STREAMING_SCALES[scale_function](stats, x_0)
@@ -0,0 +1,47 @@
+"""
+Interface to external simulators
+================================
+
+The R language is supported in-process via rpy2, see :class:`R`.
+Simulators in any language, e.g. R scripts or compiled binaries, can be run
+in long-lived external processes, see :class:`ExternalProcessModel`.
+
+.. note::
+
+    The rpy2 package needs to be installed to interface with the R language.
+    Installation of rpy2 is optional if R support is not required.
+    See also :ref:`installation of optional dependencies <install-optional>`.
+"""
+
+from .process import (
+    ExternalProcessModel,
+    read_frame,
+    write_frame)
+
+try:
+    from .r_rpy2 import R, dict_to_named_list
+except ImportError:  # in Python 3.6 ModuleNotFoundError can be used
+    class R:
+        """
+        Interface to R, which requires rpy2.
+        """
+
+        def __init__(self, *args, **kwargs):
+            raise Exception(
+                "Install rpy2 to enable support for the R language")
+
+    def dict_to_named_list(dct):
+        """
+        Convert a dictionary to an R named list, which requires rpy2.
+        """
+        raise Exception(
+            "Install rpy2 to enable support for the R language")
+
+
+__all__ = [
+    "R",
+    "dict_to_named_list",
+    "ExternalProcessModel",
+    "read_frame",
+    "write_frame",
+]
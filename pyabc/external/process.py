@@ -0,0 +1,220 @@
+"""
+Simulators in long-lived external processes, communicating via framed
+binary messages on their stdin and stdout.
+"""
+
+import atexit
+import os
+import struct
+import subprocess
+import threading
+import weakref
+from typing import List
+
+import numpy as np
+
+from ..model import Model
+from ..parameters import Parameter
+
+# little endian unsigned 4 byte integer
+_LENGTH = struct.Struct("<I")
+# little endian 8 byte float
+_DTYPE = np.dtype("<f8")
+
+
+def write_frame(stream, values):
+    """
+    Write `values` to the binary `stream` as one message, i.e. the number
+    of bytes as a 4 byte little endian unsigned integer, followed by the
+    values as little endian float64, and flush the stream.
+    """
+    payload = np.ascontiguousarray(values, dtype=_DTYPE).tobytes()
+    stream.write(_LENGTH.pack(len(payload)))
+    stream.write(payload)
+    stream.flush()
+
+
+def read_frame(stream):
+    """
+    Read one message, as written by :func:`write_frame`, from the binary
+    `stream`.
+
+    Returns
+    -------
+
+    values: np.ndarray
+        The float64 values, or None if the stream is at its end.
+    """
+    header = _read_exactly(stream, _LENGTH.size)
+    if header is None:
+        return None
+    length, = _LENGTH.unpack(header)
+    payload = _read_exactly(stream, length)
+    if payload is None:
+        return None
+    return np.frombuffer(payload, dtype=_DTYPE)
+
+
+def _read_exactly(stream, n: int):
+    data = b""
+    while len(data) < n:
+        chunk = stream.read(n - len(data))
+        if not chunk:
+            return None
+        data += chunk
+    return data
+
+
+# all started processes, terminated on exit
+_processes = weakref.WeakSet()
+
+
+@atexit.register
+def _terminate_all():
+    for process in list(_processes):
+        # processes inherited by forking belong to the parent
+        if process.pid_owner == os.getpid():
+            process.terminate()
+
+
+class _Process:
+    """
+    An external process started by the current process.
+    """
+
+    def __init__(self, command: List[str], cwd: str, env: dict):
+        self.popen = subprocess.Popen(
+            command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+            cwd=cwd, env=env)
+        self.pid_owner = os.getpid()
+        _processes.add(self)
+
+    def evaluate(self, pars: np.ndarray) -> np.ndarray:
+        try:
+            write_frame(self.popen.stdin, pars)
+        except (BrokenPipeError, OSError):
+            return None
+        return read_frame(self.popen.stdout)
+
+    def terminate(self):
+        if self.popen.poll() is None:
+            try:
+                self.popen.stdin.close()
+            except OSError:
+                pass
+            try:
+                self.popen.wait(timeout=1)
+            except subprocess.TimeoutExpired:
+                self.popen.kill()
+                self.popen.wait()
+
+
+class ExternalProcessModel(Model):
+    """
+    A model simulated by an external program, e.g. an R script or a
+    compiled binary, in a long-lived process. Each process of a sampler,
+    and each thread thereof, starts its own external process on first use
+    and reuses it for all further evaluations, such that the startup of
+    the program, e.g. of an interpreter, is paid only once per worker.
+
+    The program communicates via its stdin and stdout, with messages
+    framed by their length in bytes, as a 4 byte little endian unsigned
+    integer, followed by little endian float64 values, see
+    :func:`write_frame` and :func:`read_frame`. Per evaluation, the
+    program reads one message, the parameters in the order of the sorted
+    parameter names, and writes one message, the summary statistics. It
+    should run until its stdin is closed. Its stderr is not redirected,
+    so it must not write anything but messages to its stdout.
+
+    If the program terminated unexpectedly, an evaluation raises a
+    RuntimeError, and the next evaluation starts the program anew.
+
+    Parameters
+    ----------
+
+    command: List[str]
+        The command starting the program, e.g.
+        ``["Rscript", "model.R"]``.
+
+    sum_stat_names: List[str], optional
+        The names of the scalar summary statistics, in the order written
+        by the program. If None, the summary statistics are the array of
+        all values, under the name "data".
+
+    name: str, optional
+        A descriptive name of the model. Defaults to the name of the
+        program.
+
+    cwd: str, optional
+        The working directory of the program.
+
+    env: dict, optional
+        The environment of the program. Defaults to the environment of
+        the current process.
+    """
+
+    def __init__(self,
+                 command: List[str],
+                 sum_stat_names: List[str] = None,
+                 name: str = None,
+                 cwd: str = None,
+                 env: dict = None):
+        if name is None:
+            name = os.path.basename(command[0])
+        super().__init__(name)
+        self.command = list(command)
+        self.sum_stat_names = sum_stat_names
+        self.cwd = cwd
+        self.env = env
+        self._local = threading.local()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # the processes are started where used
+        del state["_local"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._local = threading.local()
+
+    def _process(self) -> _Process:
+        """
+        The external process of the current process and thread.
+        """
+        process = getattr(self._local, "process", None)
+        # a process inherited by forking belongs to the parent
+        if process is None or process.pid_owner != os.getpid() \
+                or process.popen.poll() is not None:
+            process = _Process(self.command, self.cwd, self.env)
+            self._local.process = process
+        return process
+
+    def sample(self, pars: Parameter):
+        values = np.array([pars[key] for key in sorted(pars.keys())],
+                          dtype=float)
+        process = self._process()
+        result = process.evaluate(values)
+        if result is None:
+            process.terminate()
+            self._local.process = None
+            raise RuntimeError(
+                f"The external process {self.command} of model {self.name} "
+                f"terminated with exit code {process.popen.poll()}.")
+        if self.sum_stat_names is None:
+            return {"data": result}
+        if len(result) != len(self.sum_stat_names):
+            raise ValueError(
+                f"Expected {len(self.sum_stat_names)} summary statistics "
+                f"from model {self.name}, but got {len(result)}.")
+        return {key: value
+                for key, value in zip(self.sum_stat_names, result.tolist())}
+
+    def close(self):
+        """
+        Terminate the external process of the current process and thread.
+        """
+        process = getattr(self._local, "process", None)
+        if process is not None and process.pid_owner == os.getpid():
+            process.terminate()
+        self._local.process = None
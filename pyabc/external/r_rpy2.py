@@ -0,0 +1,317 @@
+"""
+Interface to the R language via rpy2.
+"""
+
+from rpy2.robjects import r, FloatVector
+from ..random_variables import Parameter
+from ..model import BatchModel, ModelResult, to_matrix, unstack
+from ..distance import Distance
+from typing import Callable, List
+import numpy as np
+import pandas as pd
+import warnings
+
+
+__all__ = ["R", "RBatchModel", "RBatchDistance"]
+
+
+def dict_to_named_list(dct):
+    if (isinstance(dct, dict)
+            or isinstance(dct, Parameter)
+            or isinstance(dct, pd.core.series.Series)):
+        return r.list(**{key: val for key, val in dct.items()})
+    return dct
+
+
+# The way unpickling is done is not optimal
+# The objects reloaded when reading the source again will be different
+# from the unpickled objects.
+# This might cause problems if the R code relies on side effects/
+#
+# On the other hand, this might be the intended behavior, if for example
+# one of the objects is modified by hand within Python.
+
+
+class R:
+    """
+    Interface to R.
+
+    Parameters
+    ----------
+
+    source_file: str
+
+        Path to the file which contains the definitions for
+        the model, the summary statistics and the distance function as
+        well as the observed data.
+    """
+    def __init__(self, source_file: str):
+        warnings.warn("The support of the R language for ABC-SMC is "
+                      "considered experimental. The API might change in the "
+                      "future.")
+        self.source_file = source_file
+        self._read_source()
+
+    def __getstate__(self):
+        return self.source_file
+
+    def __setstate__(self, state):
+        self.source_file = state
+        self._read_source()
+
+    def _read_source(self):
+        r.source(self.source_file)
+
+    def display_source_ipython(self):
+        """
+        Convenience method to print the loaded source file
+        as syntax highlighted HTML within IPython.
+        """
+        from pygments import highlight
+        from pygments.lexers import SLexer
+
+        from pygments.formatters import HtmlFormatter
+        import IPython.display as display
+
+        with open(self.source_file) as f:
+            code = f.read()
+
+        formatter = HtmlFormatter()
+        return display.HTML('<style type="text/css">{}</style>{}'.format(
+            formatter.get_style_defs('.highlight'),
+            highlight(code, SLexer(), formatter)))
+
+    def model(self, function_name: str):
+        """
+        The R-model.
+
+        Parameters
+        ----------
+        function_name: str
+            Name of the function in the R script which defines the model.
+
+        Returns
+        -------
+
+        model: callable
+            The model.
+
+        """
+        model = r[function_name]
+
+        def model_py(par):
+            return model(dict_to_named_list(par))
+
+        model_py.__name__ = function_name
+        # set reference to this class to ensure the source file is
+        # read again when unpickling
+        model_py._R = self
+        return model_py
+
+    def model_batch(self, function_name: str,
+                    parameter_names: List[str] = None) -> "RBatchModel":
+        """
+        The R-model, evaluated for a block of parameters per call, which
+        crosses the boundary to R only once per block.
+
+        Parameters
+        ----------
+        function_name: str
+            Name of the function in the R script which defines the model.
+            It takes a data.frame with one row per parameter and one
+            column per parameter name, and returns a named list, or
+            data.frame, of numeric vectors with one entry per row.
+
+        parameter_names: List[str], optional
+            The parameter names, in the order of the columns of the
+            arrays passed to :meth:`RBatchModel.sample_batch`. Only
+            required if that method is called directly.
+
+        Returns
+        -------
+
+        model: RBatchModel
+            The model, a :class:`pyabc.model.BatchModel`.
+        """
+        return RBatchModel(self, function_name, parameter_names)
+
+    def distance_batch(self, function_name: str) -> "RBatchDistance":
+        """
+        The R-distance function, evaluated for a block of summary
+        statistics per call.
+
+        Parameters
+        ----------
+        function_name: str
+            Name of the function in the R script which defines the distance
+            function. It takes a named list of numeric vectors, the
+            summary statistics of one simulation per entry, and the
+            observed summary statistics, and returns a numeric vector of
+            the distances.
+
+        Returns
+        -------
+
+        distance: RBatchDistance
+            The distance, a :class:`pyabc.distance.Distance`.
+        """
+        return RBatchDistance(self, function_name)
+
+    def distance(self, function_name: str):
+        """
+        The R-distance function.
+
+        Parameters
+        ----------
+        function_name: str
+            Name of the function in the R script which defines the distance
+            function.
+
+        Returns
+        -------
+
+        distance: callable
+            The distance function.
+
+        """
+        distance = r[function_name]
+
+        def distance_py(*args):
+            args = tuple(dict_to_named_list(d) for d in args)
+            return float(np.array(distance(*args)))
+
+        distance_py.__name__ = function_name
+        # set reference to this class to ensure the source file is
+        # read again when unpickling
+        distance_py._R = self
+        return distance_py
+
+    def summary_statistics(self, function_name: str):
+        """
+        The R-summary statistics.
+
+        Parameters
+        ----------
+        function_name: str
+          Name of the function in the R script which defines the summary
+          statistics function.
+
+        Returns
+        -------
+
+        summary_statistics: callable
+            The summary statistics function.
+        """
+        summary_statistics = r[function_name]
+        summary_statistics.__name__ = function_name
+        # set reference to this class to ensure the source file is
+        # read again when unpickling
+        summary_statistics._R = self
+        return summary_statistics
+
+    def observation(self, name: str):
+        """
+        The summary statistics of the observed data as defined in R.
+
+        Parameters
+        ----------
+
+        name: str
+            Name of the named list defined in the R script which holds
+            the observed data.
+
+        Returns
+        -------
+
+        observation: r named list
+            A dictionary like object which holds the summary statistics
+            of the observed data.
+        """
+        obs = r[name]
+        # set reference to this class to ensure the source file is
+        # read again when unpickling
+        obs._r = self
+        return obs
+
+
+class RBatchModel(BatchModel):
+    """
+    A model defined by an R function which simulates a block of
+    parameters at once, see :meth:`R.model_batch`.
+    """
+
+    def __init__(self, r_: R, function_name: str,
+                 parameter_names: List[str] = None):
+        super().__init__(function_name)
+        self.function_name = function_name
+        self.parameter_names = parameter_names
+        # set reference to this class to ensure the source file is
+        # read again when unpickling
+        self._R = r_
+
+    def _simulate(self, parameter_names: List[str],
+                  pars: np.ndarray) -> dict:
+        data_frame = r["data.frame"](
+            **{name: FloatVector(pars[:, j].tolist())
+               for j, name in enumerate(parameter_names)})
+        result = r[self.function_name](data_frame)
+        return {name: np.asarray(value, dtype=float)
+                for name, value in zip(result.names, result)}
+
+    def sample_batch(self, pars: np.ndarray) -> dict:
+        if self.parameter_names is None:
+            raise ValueError(
+                f"The parameter names of model {self.name} are required "
+                f"to simulate a parameter array.")
+        return self._simulate(self.parameter_names, pars)
+
+    def sample(self, pars: Parameter):
+        return unstack(
+            self._simulate(sorted(pars.keys()), to_matrix([pars])), 1)[0]
+
+    def summary_statistics_batch(self,
+                                 t: int,
+                                 pars: List[Parameter],
+                                 sum_stats_calculator: Callable) \
+            -> List[ModelResult]:
+        if len(pars) == 0:
+            return []
+        raw_data = unstack(
+            self._simulate(sorted(pars[0].keys()), to_matrix(pars)),
+            len(pars))
+        return [ModelResult(sum_stats=sum_stats_calculator(x))
+                for x in raw_data]
+
+
+class RBatchDistance(Distance):
+    """
+    A distance defined by an R function which evaluates a block of summary
+    statistics at once, see :meth:`R.distance_batch`. The summary
+    statistics need to be numeric scalars.
+    """
+
+    def __init__(self, r_: R, function_name: str):
+        super().__init__()
+        self.function_name = function_name
+        # set reference to this class to ensure the source file is
+        # read again when unpickling
+        self._R = r_
+
+    def __call__(self,
+                 x: dict,
+                 x_0: dict,
+                 t: int = None,
+                 par: dict = None) -> float:
+        return float(self.distances([x], x_0, t, [par])[0])
+
+    def distances(self,
+                  xs: List[dict],
+                  x_0: dict,
+                  t: int = None,
+                  pars: List[dict] = None) -> np.ndarray:
+        if len(xs) == 0:
+            return np.empty(0)
+        stacked = r.list(**{key: FloatVector([float(x[key]) for x in xs])
+                            for key in xs[0].keys()})
+        distances = r[self.function_name](stacked, dict_to_named_list(x_0))
+        return np.asarray(distances, dtype=float)
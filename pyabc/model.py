@@ -5,11 +5,13 @@ Models
 Models for ABCSMC.
 """
 
+import numpy as np
 from .parameters import Parameter
-from typing import Callable, Any
+from typing import Callable, Any, Iterator, List
 from .epsilon import Epsilon
 from .distance import Distance
 from .acceptor import Acceptor
+from .cache import Cache, LRUCache, parameter_key
 
 
 class ModelResult:
@@ -17,12 +19,22 @@ class ModelResult:
     Result of a model evaluation.
     Allows to flexibly return summary statistics,
     distances and accepted/rejected.
+
+    The flag `truncated` indicates a rejected evaluation which was
+    stopped early, such that the summary statistics are not available and
+    the distance is only a lower bound, see :class:`IncrementalModel`.
+    The flag `cache_hit` indicates whether the summary statistics were
+    taken from the cache of a :class:`MemoizedModel`, and is None for
+    models which are not memoized.
     """
 
-    def __init__(self, sum_stats=None, distance=None, accepted=None):
+    def __init__(self, sum_stats=None, distance=None, accepted=None,
+                 truncated: bool = False, cache_hit: bool = None):
         self.sum_stats = sum_stats if sum_stats is not None else {}
         self.distance = distance
         self.accepted = accepted
+        self.truncated = truncated
+        self.cache_hit = cache_hit
 
 
 class Model:
@@ -347,3 +359,298 @@ class IntegratedModel(Model):
                acceptor: Acceptor,
                x_0: dict):
         return self.integrated_simulate(pars, eps_calculator(t))
+
+
+class IncrementalModel(Model):
+    """
+    A model which simulates its summary statistics incrementally, in
+    chunks, e.g. per time step of a time series, and stops a simulation as
+    soon as it cannot be accepted anymore.
+
+    After each chunk, a lower bound of the distance is updated via
+    :meth:`pyabc.Distance.lower_bound`, e.g. for the
+    :class:`pyabc.PNormDistance` the distance over the statistics simulated
+    so far. If it exceeds the current acceptance threshold, the simulation
+    is rejected without simulating the remaining chunks, and the result is
+    flagged as truncated, without summary statistics. Otherwise, the
+    complete summary statistics are passed to the acceptor as usual.
+    This assumes that the acceptor requires the distance to be below the
+    current threshold, as all acceptors of :mod:`pyabc.acceptor` do.
+    For distances without a lower bound, all chunks are simulated.
+
+    The truncated simulations are rejected without summary statistics, but
+    counted, see :attr:`pyabc.sampler.Sample.n_truncated`. Distances
+    adapting to the summary statistics of all simulations, e.g. the
+    :class:`pyabc.AdaptivePNormDistance`, would thus see a censored sample,
+    lacking the simulations far from the observed data, and underestimate
+    the scales. Hence, :class:`pyabc.ABCSMC` disables the truncation, with
+    a warning, if the distance requires the summary statistics of all
+    simulations.
+
+    Subclass this model and implement ``sample_incremental``. Note that
+    the chunks are the summary statistics, the summary statistics function
+    passed to :class:`pyabc.ABCSMC` is not applied.
+
+    Parameters
+    ----------
+
+    name: str, optional (default = "model")
+        A descriptive name of the model.
+
+    truncate: bool, optional (default = True)
+        Whether to truncate simulations which cannot be accepted anymore.
+        If False, all chunks are simulated.
+    """
+
+    def __init__(self, name: str = "model", truncate: bool = True):
+        super().__init__(name)
+        self.truncate = truncate
+
+    def sample_incremental(self, pars: Parameter) -> Iterator[dict]:
+        """
+        Simulate the model at parameters `pars` chunk by chunk.
+
+        This method has to be implemented by any subclass, usually as a
+        generator.
+
+        Parameters
+        ----------
+
+        pars: Parameter
+            Dictionary of parameters.
+
+        Returns
+        -------
+
+        chunks: Iterator[dict]
+            The summary statistics, in chunks of disjoint keys.
+        """
+        raise NotImplementedError()
+
+    def sample(self, pars: Parameter):
+        sum_stats = {}
+        for chunk in self.sample_incremental(pars):
+            sum_stats.update(chunk)
+        return sum_stats
+
+    def summary_statistics(self,
+                           t: int,
+                           pars: Parameter,
+                           sum_stats_calculator: Callable) -> ModelResult:
+        return ModelResult(sum_stats=self.sample(pars))
+
+    def accept(self,
+               t: int,
+               pars: Parameter,
+               sum_stats_calculator: Callable,
+               distance_calculator: Distance,
+               eps_calculator: Epsilon,
+               acceptor: Acceptor,
+               x_0: dict):
+        eps = eps_calculator(t)
+        sum_stats = {}
+        # None if no bound is computed
+        lower_bound = 0. if self.truncate else None
+        chunks = self.sample_incremental(pars)
+        try:
+            for chunk in chunks:
+                sum_stats.update(chunk)
+                if lower_bound is None:
+                    continue
+                lower_bound = distance_calculator.lower_bound(
+                    chunk, x_0, t, lower_bound)
+                if lower_bound is not None and lower_bound > eps:
+                    return ModelResult(distance=lower_bound,
+                                       accepted=False,
+                                       truncated=True)
+        finally:
+            # stop the simulation
+            close = getattr(chunks, "close", None)
+            if close is not None:
+                close()
+
+        distance, accepted = acceptor(t,
+                                      distance_calculator,
+                                      eps_calculator,
+                                      sum_stats,
+                                      x_0,
+                                      pars)
+        return ModelResult(sum_stats=sum_stats,
+                           distance=distance,
+                           accepted=accepted)
+
+
+class BatchModel(Model):
+    """
+    A model which simulates many parameters at once, for simulators which
+    are vectorized over parameters, e.g. based on NumPy.
+
+    Subclass this model and implement ``sample_batch``. Samplers which
+    support it, i.e. the :class:`pyabc.sampler.SingleCoreSampler`,
+    :class:`pyabc.sampler.MulticoreParticleParallelSampler` and
+    :class:`pyabc.sampler.MulticoreEvalParallelSampler`, then propose
+    parameters in blocks, simulate each block in one call, and compute the
+    distances of a block at once via :meth:`pyabc.Acceptor.accept_batch`.
+    For the default acceptor, these are the possibly vectorized
+    :meth:`pyabc.Distance.distances`. All other samplers simulate the
+    parameters one by one via ``sample``.
+
+    Parameters
+    ----------
+
+    name: str, optional (default = "model")
+        A descriptive name of the model.
+    """
+
+    def sample_batch(self, pars: np.ndarray) -> dict:
+        """
+        Simulate the model at several parameters at once.
+
+        This method has to be implemented by any subclass.
+
+        Parameters
+        ----------
+
+        pars: np.ndarray
+            The parameters, of shape (n, d), with one row per parameter
+            and the columns in the order of the sorted parameter names.
+
+        Returns
+        -------
+
+        sample: dict
+            The sampled data, with all values stacked along the first
+            axis, of length n.
+        """
+        raise NotImplementedError()
+
+    def sample(self, pars: Parameter):
+        return unstack(self.sample_batch(to_matrix([pars])), 1)[0]
+
+    def summary_statistics_batch(self,
+                                 t: int,
+                                 pars: List[Parameter],
+                                 sum_stats_calculator: Callable) \
+            -> List[ModelResult]:
+        """
+        As :meth:`summary_statistics`, for several parameters at once.
+
+        Returns
+        -------
+
+        model_results: List[ModelResult]
+            The results with filled summary statistics, one per parameter.
+        """
+        raw_data = unstack(self.sample_batch(to_matrix(pars)), len(pars))
+        return [ModelResult(sum_stats=sum_stats_calculator(x))
+                for x in raw_data]
+
+    def accept_batch(self,
+                     t: int,
+                     pars: List[Parameter],
+                     sum_stats_calculator: Callable,
+                     distance_calculator: Distance,
+                     eps_calculator: Epsilon,
+                     acceptor: Acceptor,
+                     x_0: dict) -> List[ModelResult]:
+        """
+        As :meth:`accept`, for several parameters at once.
+
+        Returns
+        -------
+
+        model_results: List[ModelResult]
+            The results with filled accepted fields, one per parameter.
+        """
+        results = self.summary_statistics_batch(
+            t, pars, sum_stats_calculator)
+        distances, accepted = acceptor.accept_batch(
+            t, distance_calculator, eps_calculator,
+            [result.sum_stats for result in results], x_0, pars)
+        for result, distance, accept in zip(results, distances, accepted):
+            result.distance = float(distance)
+            result.accepted = bool(accept)
+        return results
+
+
+class MemoizedModel(Model):
+    """
+    A model which caches the summary statistics of the model it wraps, by
+    parameter, such that parameters proposed repeatedly, e.g. for
+    discrete priors or the
+    :class:`pyabc.transition.DiscreteRandomWalkTransition`, are simulated
+    only once.
+
+    This is only valid for deterministic models. Only the summary
+    statistics are cached, and the distance and acceptance are computed
+    anew each time, as they can change between generations. The
+    acceptance is that of :meth:`Model.accept`, such that an ``accept``
+    method of the wrapped model is not used.
+
+    Parameters
+    ----------
+
+    model: Model or Callable
+        The model to wrap, or a function converted to a
+        :class:`SimpleModel`.
+
+    cache: pyabc.cache.Cache, optional
+        The cache. Defaults to a :class:`pyabc.cache.LRUCache`. To share
+        the cache between processes, or across runs, use a
+        :class:`pyabc.cache.SQLiteCache`.
+
+    model_id: str, optional
+        The id of the model in the cache keys, such that different models
+        can share a cache. Defaults to the name of the model.
+    """
+
+    def __init__(self,
+                 model,
+                 cache: Cache = None,
+                 model_id: str = None):
+        model = SimpleModel.assert_model(model)
+        super().__init__(model.name)
+        self.model = model
+        if cache is None:
+            cache = LRUCache()
+        self.cache = cache
+        if model_id is None:
+            model_id = model.name
+        self.model_id = model_id
+
+    def sample(self, pars: Parameter):
+        return self.model.sample(pars)
+
+    def summary_statistics(self,
+                           t: int,
+                           pars: Parameter,
+                           sum_stats_calculator: Callable) -> ModelResult:
+        key = parameter_key(self.model_id, pars)
+        sum_stats = self.cache.get(key)
+        cache_hit = sum_stats is not None
+        if not cache_hit:
+            sum_stats = self.model.summary_statistics(
+                t, pars, sum_stats_calculator).sum_stats
+            self.cache.put(key, sum_stats)
+        return ModelResult(sum_stats=sum_stats, cache_hit=cache_hit)
+
+
+def to_matrix(pars: List[Parameter]) -> np.ndarray:
+    """
+    Stack parameters to an array of shape (n, d), with the columns in the
+    order of the sorted parameter names.
+    """
+    if len(pars) == 0:
+        return np.empty((0, 0))
+    keys = sorted(pars[0].keys())
+    return np.array([[par[key] for key in keys] for par in pars],
+                    dtype=float)
+
+
+def unstack(sample: dict, n: int) -> List[dict]:
+    """
+    Split a dictionary of values stacked along the first axis into `n`
+    dictionaries.
+    """
+    return [{key: value[i] for key, value in sample.items()}
+            for i in range(n)]
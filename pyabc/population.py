@@ -9,6 +9,7 @@ iteration.
 
 
 from typing import List, Callable
+import numpy as np
 import pandas as pd
 from pyabc.parameters import Parameter
 
@@ -54,6 +55,23 @@ class Particle:
     accepted: bool
         True if particle was accepted, False if not.
 
+    timing: dict, optional
+        Durations of the phases of the evaluation, see :mod:`pyabc.timing`.
+        They are moved to the sample the particle is appended to.
+
+    profile: dict, optional
+        Profiling statistics of the evaluation, see :mod:`pyabc.profiling`.
+        They are moved to the sample the particle is appended to.
+
+    n_truncated: int, optional (default = 0)
+        Number of the rejected simulations which were truncated, and thus
+        have no summary statistics, see
+        :class:`pyabc.model.IncrementalModel`.
+
+    n_cache_hits, n_cache_misses: int, optional (default = 0)
+        Number of the simulations whose summary statistics were, or were
+        not, found in the cache of a :class:`pyabc.model.MemoizedModel`.
+
 
     .. note::
         There are two different ways of weighting particles: First, the weights
@@ -76,7 +94,12 @@ class Particle:
                  accepted_distances: List[float],
                  rejected_sum_stats: List[dict] = None,
                  rejected_distances: List[float] = None,
-                 accepted: bool = True):
+                 accepted: bool = True,
+                 timing: dict = None,
+                 profile: dict = None,
+                 n_truncated: int = 0,
+                 n_cache_hits: int = 0,
+                 n_cache_misses: int = 0):
 
         self.m = m
         self.parameter = parameter
@@ -90,6 +113,11 @@ class Particle:
             rejected_distances = []
         self.rejected_distances = rejected_distances
         self.accepted = accepted
+        self.timing = timing
+        self.profile = profile
+        self.n_truncated = n_truncated
+        self.n_cache_hits = n_cache_hits
+        self.n_cache_misses = n_cache_misses
 
 
 class Population:
@@ -158,6 +186,33 @@ class Population:
                 particle.accepted_distances[i] = distance_to_ground_truth(
                     particle.accepted_sum_stats[i], particle.parameter)
 
+    def update_distances_batch(
+            self,
+            distances_to_ground_truth: Callable[[List[dict], List[dict]],
+                                                np.ndarray]):
+        """
+        As :meth:`update_distances`, but evaluating all distances in one
+        call, e.g. via :meth:`pyabc.Distance.distances`.
+
+        :param distances_to_ground_truth:
+            Distances of a list of summary statistics, with the list of the
+            corresponding parameters, to the observed summary statistics.
+        """
+        sum_stats, parameters = [], []
+        for particle in self._list:
+            sum_stats.extend(particle.accepted_sum_stats)
+            parameters.extend(
+                [particle.parameter] * len(particle.accepted_sum_stats))
+
+        distances = distances_to_ground_truth(sum_stats, parameters)
+
+        i = 0
+        for particle in self._list:
+            n = len(particle.accepted_distances)
+            particle.accepted_distances[:] = \
+                [float(d) for d in distances[i:i + n]]
+            i += n
+
     def get_model_probabilities(self) -> dict:
         """
         Get probabilities of the individual models.
@@ -0,0 +1,93 @@
+"""
+Profiling
+=========
+
+Opt-in profiling of the model evaluations of an ABC-SMC run, see the
+``profile`` argument of :meth:`pyabc.ABCSMC.run`.
+
+Each evaluation, i.e. each call of the ``simulate_one`` function the
+samplers execute, runs under a deterministic :mod:`cProfile` profiler,
+wherever it is executed. The resulting statistics are shipped back to the
+master together with the particles, and summed over all evaluations and
+workers via the :class:`pyabc.sampler.Sample`, as the timings are, see
+:mod:`pyabc.timing`. Thus, this works with any sampler.
+The merged statistics are written per generation in the :mod:`pstats`
+format, and can be analyzed e.g. via ``pstats.Stats(file)`` or snakeviz.
+"""
+
+import cProfile
+import marshal
+import os
+import pstats
+
+
+def add_stats(stats: dict, other: dict):
+    """
+    Add the profiling statistics `other` to `stats`, in place.
+    `other` is not modified.
+
+    Parameters
+    ----------
+
+    stats, other: dict
+        Statistics as in the ``stats`` attribute of :class:`pstats.Stats`.
+    """
+    for func, func_stats in other.items():
+        if func in stats:
+            stats[func] = pstats.add_func_stats(stats[func], func_stats)
+        else:
+            cc, nc, tt, ct, callers = func_stats
+            stats[func] = (cc, nc, tt, ct, dict(callers))
+
+
+def profiled(simulate_one):
+    """
+    Wrap a ``simulate_one`` function such that it runs under a profiler,
+    and the statistics are attached to the returned particle as its
+    ``profile``. A ``simulate_batch`` attribute is wrapped as well, with
+    the statistics of a batch attached to its first particle.
+    """
+    def profiled_simulate_one():
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            particle = simulate_one()
+        finally:
+            profiler.disable()
+        profiler.create_stats()
+        particle.profile = profiler.stats
+        return particle
+
+    simulate_batch = getattr(simulate_one, "simulate_batch", None)
+    if simulate_batch is not None:
+        def profiled_simulate_batch(n):
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                particles = simulate_batch(n)
+            finally:
+                profiler.disable()
+            profiler.create_stats()
+            if particles:
+                particles[0].profile = profiler.stats
+            return particles
+        profiled_simulate_one.simulate_batch = profiled_simulate_batch
+
+    return profiled_simulate_one
+
+
+def dump_stats(stats: dict, directory: str, t: int) -> str:
+    """
+    Write the statistics of generation `t` to `directory`.
+
+    Returns
+    -------
+
+    file: str
+        The file written to, named ``t_<t>.pstats``.
+    """
+    os.makedirs(directory, exist_ok=True)
+    file = os.path.join(directory, f"t_{t}.pstats")
+    with open(file, "wb") as f:
+        marshal.dump(stats, f)
+    return file
@@ -15,6 +15,8 @@ from .multicore_evaluation_parallel import MulticoreEvalParallelSampler
 from .redis_eps import (RedisEvalParallelSampler,
                         RedisEvalParallelSamplerServerStarter)
 from .concurrent_future import ConcurrentFutureSampler
+from .eps_mixin import AdaptiveBatchSize
+from .sge_eps import SGEEvalParallelSampler
 
 __all__ = ["Sample",
            "Sampler",
@@ -25,4 +27,6 @@ __all__ = ["Sample",
            "RedisEvalParallelSampler",
            "MulticoreEvalParallelSampler",
            "RedisEvalParallelSamplerServerStarter",
-           "ConcurrentFutureSampler"]
+           "ConcurrentFutureSampler",
+           "AdaptiveBatchSize",
+           "SGEEvalParallelSampler"]
@@ -1,5 +1,11 @@
+import heapq
+import math
+import random
 from abc import ABC, ABCMeta, abstractmethod
 from pyabc.population import Particle, Population
+from pyabc.timing import add_timings
+from pyabc.profiling import add_stats
+from pyabc.distance.streaming import SumStatsAccumulator
 from typing import List, Callable
 
 
@@ -13,11 +19,80 @@ class Sample:
     record_rejected: bool
         Whether to record rejected particles as well, along with accepted
         ones.
+
+    max_nr_recorded: int, optional (default = None)
+        If not None, and `record_rejected` is True, only a uniform random
+        subsample of at most this many summary statistics of all
+        evaluations, accepted and rejected, is kept as `all_sum_stats`,
+        instead of all rejected particles. Thus, the memory is bounded
+        independently of the acceptance rate. The subsample is drawn by
+        reservoir sampling, keeping the statistics with the smallest of
+        uniformly random keys, such that samples filled on different
+        workers can be merged exactly: the merged reservoir is again a
+        uniform subsample of all evaluations of both samples. Hence, all
+        recorded statistics represent the same number of evaluations, i.e.
+        have the same weight, and scale estimates computed from them are
+        unbiased.
+
+    accumulate_sum_stats: bool, optional (default = False)
+        Whether to accumulate the summary statistics of all evaluations,
+        accepted and rejected, in a
+        :class:`pyabc.distance.streaming.SumStatsAccumulator`, which
+        requires memory independent of the number of evaluations.
+
+    accumulate_covariance: bool, optional (default = False)
+        Whether the accumulator accumulates also the covariance of all
+        numeric summary statistics, see
+        :class:`pyabc.distance.streaming.CovarianceStatistics`. Only
+        applies if `accumulate_sum_stats`.
+
+    Attributes
+    ----------
+
+    timing: dict
+        Durations of the evaluation phases, summed over all particles
+        appended to this sample, see :mod:`pyabc.timing`.
+
+    profile: dict
+        Profiling statistics, summed over all particles appended to this
+        sample, see :mod:`pyabc.profiling`. Empty unless profiling is
+        enabled.
+
+    sum_stats_accumulator: SumStatsAccumulator
+        The accumulated summary statistics, if `accumulate_sum_stats`,
+        otherwise None.
+
+    n_truncated: int
+        Number of truncated simulations of all particles appended to this
+        sample, see :class:`pyabc.model.IncrementalModel`.
+
+    n_cache_hits, n_cache_misses: int
+        Number of cache hits and misses of the memoized models of all
+        particles appended to this sample, counted where the simulations
+        ran, see :class:`pyabc.model.MemoizedModel`.
     """
 
-    def __init__(self, record_rejected: bool = False):
+    def __init__(self, record_rejected: bool = False,
+                 max_nr_recorded: int = None,
+                 accumulate_sum_stats: bool = False,
+                 accumulate_covariance: bool = False):
         self._particles = []
         self.record_rejected = record_rejected
+        self.max_nr_recorded = max_nr_recorded
+        self.accumulate_covariance = accumulate_covariance
+        self.sum_stats_accumulator = \
+            SumStatsAccumulator(covariance=accumulate_covariance) \
+            if accumulate_sum_stats else None
+        # heap of (-key, index, sum_stats) of the recorded summary
+        # statistics with the smallest keys, if bounded
+        self._reservoir = []
+        # number of summary statistics offered to the reservoir
+        self.n_recorded = 0
+        self.n_truncated = 0
+        self.n_cache_hits = 0
+        self.n_cache_misses = 0
+        self.timing = {}
+        self.profile = {}
 
     @property
     def all_sum_stats(self):
@@ -30,10 +105,31 @@ class Sample:
         all_sum_stats: List
             Concatenation of all the all_sum_stats lists of all
             particles added and accepted to this sample via append().
+            If the recording is bounded, a uniform subsample thereof.
         """
+        if self.is_bounded:
+            return [sum_stats for _, _, sum_stats in self._reservoir]
         return sum((particle.accepted_sum_stats + particle.rejected_sum_stats
                     for particle in self._particles), [])
 
+    @property
+    def is_bounded(self) -> bool:
+        """
+        Whether the recorded summary statistics are subsampled.
+        """
+        return self.record_rejected and self.max_nr_recorded is not None
+
+    def _record(self, sum_stats: dict, key: float):
+        """
+        Offer summary statistics with the given key to the reservoir.
+        """
+        entry = (-key, self.n_recorded, sum_stats)
+        self.n_recorded += 1
+        if len(self._reservoir) < self.max_nr_recorded:
+            heapq.heappush(self._reservoir, entry)
+        elif key < -self._reservoir[0][0]:
+            heapq.heapreplace(self._reservoir, entry)
+
     @property
     def _accepted_particles(self) -> List[Particle]:
         """
@@ -57,14 +153,59 @@ class Sample:
         """
 
         # add to population if accepted
-        if particle.accepted or self.record_rejected:
+        if particle.accepted or (self.record_rejected
+                                 and not self.is_bounded):
             self._particles.append(particle)
 
+        if self.is_bounded:
+            for sum_stats in (particle.accepted_sum_stats
+                              + particle.rejected_sum_stats):
+                self._record(sum_stats, random.random())
+
+        if self.sum_stats_accumulator is not None:
+            for sum_stats in (particle.accepted_sum_stats
+                              + particle.rejected_sum_stats):
+                self.sum_stats_accumulator.update(sum_stats)
+
+        self.n_truncated += particle.n_truncated
+        self.n_cache_hits += particle.n_cache_hits
+        self.n_cache_misses += particle.n_cache_misses
+
+        # take over the timing, such that it is counted only once
+        if particle.timing is not None:
+            add_timings(self.timing, particle.timing)
+            particle.timing = None
+        if particle.profile is not None:
+            add_stats(self.profile, particle.profile)
+            particle.profile = None
+
     def __add__(self, other: "Sample"):
-        sample = Sample(self.record_rejected)
+        sample = Sample(self.record_rejected, self.max_nr_recorded,
+                        self.sum_stats_accumulator is not None,
+                        self.accumulate_covariance)
         # sample's list of particles is the concatenation of both samples'
         # lists
         sample._particles = self._particles + other._particles
+        if sample.is_bounded:
+            # the smallest keys of the union
+            sample._reservoir = heapq.nlargest(
+                self.max_nr_recorded,
+                self._reservoir + other._reservoir,
+                key=lambda entry: entry[0])
+            heapq.heapify(sample._reservoir)
+            sample.n_recorded = self.n_recorded + other.n_recorded
+        if sample.sum_stats_accumulator is not None:
+            for accumulator in (self.sum_stats_accumulator,
+                                other.sum_stats_accumulator):
+                if accumulator is not None:
+                    sample.sum_stats_accumulator.merge(accumulator)
+        sample.n_truncated = self.n_truncated + other.n_truncated
+        sample.n_cache_hits = self.n_cache_hits + other.n_cache_hits
+        sample.n_cache_misses = self.n_cache_misses + other.n_cache_misses
+        sample.timing = dict(self.timing)
+        add_timings(sample.timing, other.timing)
+        add_stats(sample.profile, self.profile)
+        add_stats(sample.profile, other.profile)
         return sample
 
     @property
@@ -102,16 +243,52 @@ class SampleFactory:
 
     record_rejected: bool
         Corresponds to Sample.record_rejected.
+
+    max_nr_recorded: int, optional (default = None)
+        Corresponds to Sample.max_nr_recorded.
+
+    accumulate_sum_stats: bool, optional (default = False)
+        Corresponds to Sample.accumulate_sum_stats.
+
+    accumulate_covariance: bool, optional (default = False)
+        Corresponds to Sample.accumulate_covariance.
     """
 
-    def __init__(self, record_rejected: bool = False):
+    def __init__(self, record_rejected: bool = False,
+                 max_nr_recorded: int = None,
+                 accumulate_sum_stats: bool = False,
+                 accumulate_covariance: bool = False):
         self.record_rejected = record_rejected
+        self.max_nr_recorded = max_nr_recorded
+        self.accumulate_sum_stats = accumulate_sum_stats
+        self.accumulate_covariance = accumulate_covariance
 
     def __call__(self):
         """
         Create a new empty sample.
         """
-        return Sample(self.record_rejected)
+        return Sample(self.record_rejected, self.max_nr_recorded,
+                      self.accumulate_sum_stats, self.accumulate_covariance)
+
+
+def next_batch_size(n_missing: int,
+                    n_eval: int,
+                    n_acc: int,
+                    max_batch_size: int) -> int:
+    """
+    The number of particles to simulate in the next batch, i.e. the
+    number of evaluations expected to yield `n_missing` acceptances,
+    given `n_acc` acceptances of `n_eval` evaluations so far, at least 1
+    and at most `max_batch_size`. Without acceptances so far, the number
+    of evaluations is doubled.
+    """
+    if n_acc > 0:
+        batch_size = math.ceil(n_missing * n_eval / n_acc)
+    elif n_eval > 0:
+        batch_size = n_eval
+    else:
+        batch_size = n_missing
+    return max(1, min(batch_size, max_batch_size))
 
 
 def wrap_sample(f):
@@ -30,12 +30,14 @@ class ConcurrentFutureSampler(EPSMixin, Sampler):
         functions, which can not be pickled using default pickle, at the cost
         of an additional pickling overhead.
 
-    batch_size: int, optional
+    batch_size: int or AdaptiveBatchSize, optional
         Number of parameter samples that are evaluated in one remote execution
         call. Batch submission can be used to reduce the communication overhead
         for fast (ms-s) model evaluations. Large batch sizes can result in un-
         necessary model evaluations. By default, batch_size=1, i.e. no batching
         is done.
+        Pass an :class:`pyabc.sampler.AdaptiveBatchSize` to adapt the batch
+        size to the observed simulation times and acceptance rate.
 
     """
 
@@ -1,7 +1,37 @@
 from distributed import Client
 from .base import Sampler
-from .eps_mixin import EPSMixin
+from .eps_mixin import EPSMixin, evaluate_batch
 import numpy as np
+import cloudpickle as pickle
+import threading
+import uuid
+
+
+# worker side cache of the deserialized simulate_one of the current
+# generation, as (token, simulate_one)
+_simulate_one_cache = (None, None)
+_simulate_one_cache_lock = threading.Lock()
+
+
+def _load_simulate_one(token, simulate_one_pickle):
+    """
+    Deserialize the broadcast simulate_one only once per generation and
+    worker process.
+    """
+    global _simulate_one_cache
+    with _simulate_one_cache_lock:
+        if _simulate_one_cache[0] != token:
+            _simulate_one_cache = (token, pickle.loads(simulate_one_pickle))
+        return _simulate_one_cache[1]
+
+
+def _evaluate_broadcast_batch(simulate_one_pickle, token, job_id_batch):
+    """
+    Evaluate a batch of job ids, with simulate_one already available on
+    the worker.
+    """
+    simulate_one = _load_simulate_one(token, simulate_one_pickle)
+    return evaluate_batch(simulate_one, job_id_batch)
 
 
 class DaskDistributedSampler(EPSMixin, Sampler):
@@ -32,17 +62,28 @@ class DaskDistributedSampler(EPSMixin, Sampler):
         of an additional pickling overhead. For dask, this workaround should
         not be necessary and it should be save to use default_pickle=false.
 
-    batch_size: int, optional
+    batch_size: int or AdaptiveBatchSize, optional
         Number of parameter samples that are evaluated in one remote execution
         call. Batchsubmission can be used to reduce the communication overhead
         for fast (ms-s) model evaluations. Large batch sizes can result in un-
         necessary model evaluations. By default, batch_size=1, i.e. no
         batching is done.
+        Pass an :class:`pyabc.sampler.AdaptiveBatchSize` to adapt the batch
+        size to the observed simulation times and acceptance rate.
+
+    broadcast: bool, optional
+        If True, the serialized simulate_one is sent to all dask workers only
+        once per generation, and the tasks merely carry a reference to it
+        together with their job ids. The workers deserialize it once per
+        generation. This reduces the task submission overhead considerably
+        if simulate_one is large, e.g. because of the data it references.
+        default_pickle is then ignored. By default, broadcast=False, i.e.
+        simulate_one is serialized with every task.
 
     """
 
     def __init__(self, dask_client=None, client_max_jobs=np.inf,
-                 default_pickle=False, batch_size=1):
+                 default_pickle=False, batch_size=1, broadcast=False):
         super().__init__()
 
         # Assign Client
@@ -62,6 +103,9 @@ class DaskDistributedSampler(EPSMixin, Sampler):
         # Batchsize
         self.batch_size = batch_size
 
+        # Whether to broadcast simulate_one
+        self.broadcast = broadcast
+
     def __getstate__(self):
         d = dict(self.__dict__)
         del d['my_client']
@@ -69,3 +113,19 @@ class DaskDistributedSampler(EPSMixin, Sampler):
 
     def client_cores(self):
         return sum(self.my_client.ncores().values())
+
+    def _create_submit_job(self, simulate_one):
+        if not self.broadcast:
+            return super()._create_submit_job(simulate_one)
+
+        simulate_one_future = self.my_client.scatter(
+            pickle.dumps(simulate_one), broadcast=True, hash=False)
+        # identifies the generation in the worker side cache
+        token = uuid.uuid4().hex
+
+        def submit_job(job_id_batch):
+            return self.my_client.submit(
+                _evaluate_broadcast_batch, simulate_one_future, token,
+                job_id_batch, pure=False)
+
+        return submit_job
@@ -1,19 +1,190 @@
+import logging
+import queue
+import time
 import numpy as np
 import cloudpickle as pickle
 from sortedcontainers import SortedListWithKey
 
 
+logger = logging.getLogger("EPSMixin")
+
+
+def evaluate_batch(simulate_one, job_id_batch):
+    """
+    Evaluate simulate_one once per job id.
+
+    Returns
+    -------
+
+    result_batch: list
+        Tuples of the result, whether it was accepted, the job id and the
+        simulation time in seconds.
+    """
+    result_batch = []
+    for job_id in job_id_batch:
+        start = time.time()
+        eval_result = simulate_one()
+        result_batch.append((eval_result, eval_result.accepted, job_id,
+                             time.time() - start))
+    return result_batch
+
+
+class AdaptiveBatchSize:
+    """
+    Adaptive batch size for the
+    :class:`pyabc.sampler.DaskDistributedSampler` and the
+    :class:`pyabc.sampler.ConcurrentFutureSampler`, to be passed as their
+    `batch_size`.
+
+    The batch size is chosen such that a job takes about `target_job_time`
+    seconds, based on the observed simulation times, to amortize the
+    communication overhead.
+    Towards the end of a generation, it is reduced such that the submitted
+    jobs just suffice to obtain the missing acceptances, given the observed
+    acceptance rate, to avoid evaluations which are later discarded.
+
+    Parameters
+    ----------
+
+    target_job_time: float, optional (default = 1)
+        Targeted runtime of a job in seconds.
+
+    max_batch_size: int, optional (default = 1000)
+        Maximum batch size.
+
+    initial_batch_size: int, optional (default = 1)
+        Batch size used before any simulation time was observed.
+
+    load_factor: float, optional (default = 1)
+        Maximum number of jobs submitted at a time, per available core.
+        Values larger than one keep the workers busy while the master
+        processes results and submits new jobs.
+    """
+
+    def __init__(self, target_job_time: float = 1.,
+                 max_batch_size: int = 1000,
+                 initial_batch_size: int = 1,
+                 load_factor: float = 1.):
+        self.target_job_time = target_job_time
+        self.max_batch_size = max_batch_size
+        self.initial_batch_size = initial_batch_size
+        self.load_factor = load_factor
+        # observed mean simulation time, kept over generations
+        self.sim_time = None
+        # acceptance counters of the current generation
+        self.n_evaluated = 0
+        self.n_accepted = 0
+        # acceptance rate of the previous generation
+        self.prev_acceptance_rate = None
+
+    def initialize(self):
+        """
+        Start a new generation.
+        """
+        if self.n_evaluated > 0:
+            self.prev_acceptance_rate = self.n_accepted / self.n_evaluated
+        self.n_evaluated = 0
+        self.n_accepted = 0
+
+    def update(self, n_evaluated: int, n_accepted: int, sim_time: float):
+        """
+        Update with the results of a finished job.
+        """
+        self.n_evaluated += n_evaluated
+        self.n_accepted += n_accepted
+        if n_evaluated > 0:
+            mean = sim_time / n_evaluated
+            if self.sim_time is None:
+                self.sim_time = mean
+            else:
+                # exponential moving average, to follow changes
+                self.sim_time = 0.8 * self.sim_time + 0.2 * mean
+
+    def acceptance_rate(self) -> float:
+        if self.n_accepted > 0:
+            return self.n_accepted / self.n_evaluated
+        if self.prev_acceptance_rate:
+            # lower estimate, as acceptance rates usually decrease
+            return min(self.prev_acceptance_rate,
+                       1 / max(self.n_evaluated, 1))
+        if self.n_evaluated > 0:
+            # no acceptances yet, be pessimistic
+            return 1 / self.n_evaluated
+        return 1.
+
+    def max_jobs(self, n_cores: int) -> int:
+        """
+        Maximum number of jobs submitted at a time.
+        """
+        return int(np.ceil(self.load_factor * n_cores))
+
+    def __call__(self, n_missing: int, n_running: int,
+                 n_jobs: int) -> int:
+        """
+        Batch size of the next job.
+
+        Parameters
+        ----------
+
+        n_missing: int
+            Number of acceptances still required.
+
+        n_running: int
+            Number of evaluations submitted, but not finished.
+
+        n_jobs: int
+            Maximum number of jobs submitted at a time. The required
+            evaluations are distributed over these, such that no single
+            job takes a large share.
+        """
+        if self.sim_time is None:
+            batch_size = self.initial_batch_size
+        elif self.sim_time > 0:
+            batch_size = int(self.target_job_time / self.sim_time)
+        else:
+            batch_size = self.max_batch_size
+        # expected number of evaluations still to submit
+        n_required = int(np.ceil(n_missing / self.acceptance_rate())) \
+            - n_running
+        if n_required > 0:
+            batch_size = min(batch_size,
+                             int(np.ceil(n_required / max(n_jobs, 1))))
+        else:
+            # enough evaluations are running in expectation, only keep
+            # free workers busy
+            batch_size = 1
+        return max(1, min(batch_size, self.max_batch_size))
+
+
 class EPSMixin:
+    """
+    Evaluation parallel sampling on top of an executor-like client, which
+    provides a `submit` method returning futures with an
+    `add_done_callback` method, as e.g. concurrent.futures executors and
+    dask clients do.
+
+    The master does not poll the jobs, but blocks until a job reports its
+    completion via the callback.
+
+    The batch size is either fixed, or adapted by an
+    :class:`AdaptiveBatchSize`. After each generation,
+    `nr_submitted_evaluations_` holds the number of submitted evaluations,
+    and `nr_wasted_evaluations_` the number of those which were not used,
+    i.e. evaluated after the last used one, or cancelled.
+    """
+
+    # time in seconds to wait if no workers are available to submit to
+    NO_WORKER_SLEEP_TIME = .1
+
     def full_submit_function_pickle(self, job_id):
         simulate_one = pickle.loads(self.simulate_accept_one)
-        result_batch = []
-        for j in range(self.batch_size):
-            eval_result = simulate_one()
-            eval_accept = eval_result.accepted
-            result_batch.append((eval_result, eval_accept, job_id[j]))
-        return result_batch
+        return evaluate_batch(simulate_one, job_id)
 
-    def sample_until_n_accepted(self, n, simulate_one, all_accepted=False):
+    def _create_submit_job(self, simulate_one):
+        """
+        Create the function which submits the evaluation of a batch of
+        job ids to the client and returns the future.
+        """
         # For default pickling
         if self.default_pickle:
             self.simulate_accept_one = pickle.dumps(simulate_one)
@@ -21,41 +192,97 @@ class EPSMixin:
         else:
             # For advanced pickling, e.g. cloudpickle
             def full_submit_function(job_id):
-                result_batch = []
-                for j in range(self.batch_size):
-                    eval_result = simulate_one()
-                    eval_accept = eval_result.accepted
-                    result_batch.append((eval_result, eval_accept, job_id[j]))
-                return result_batch
+                return evaluate_batch(simulate_one, job_id)
+
+        def submit_job(job_id_batch):
+            return self.my_client.submit(full_submit_function, job_id_batch)
+
+        return submit_job
+
+    def sample_until_n_accepted(self, n, simulate_one, all_accepted=False):
+        submit_job = self._create_submit_job(simulate_one)
+
+        adaptive = isinstance(self.batch_size, AdaptiveBatchSize)
+        if adaptive:
+            self.batch_size.initialize()
 
         num_accepted_total = 0
         num_accepted_sequential = 0
         next_job_id = 0
-        running_jobs = []
+        # running jobs and their batch sizes
+        running_jobs = {}
+        # the jobs put themselves here once done
+        completed_jobs = queue.Queue()
         unprocessed_results = SortedListWithKey(key=lambda x: x[0])
         all_results = SortedListWithKey(key=lambda x: x[0])
         next_valid_index = -1
 
         # Main Loop, leave once we have enough material
         while True:
-            # Gather finished jobs
+            # Update information on scheduler state
+            # Only submit more jobs if:
+            # Number of jobs open < max_jobs
+            # Number of jobs open < self.scheduler_workers_running *
+            # worker_load_factor
+            # num_accepted_total < jobs required
+            client_cores = self.client_cores()
+            if adaptive:
+                client_cores = self.batch_size.max_jobs(client_cores)
+            max_jobs = np.minimum(self.client_max_jobs,
+                                  client_cores).astype(int)
+            if len(running_jobs) < max_jobs and num_accepted_total < n:
+                for _ in range(0, max_jobs - len(running_jobs)):
+                    if adaptive:
+                        batch_size = self.batch_size(
+                            n - num_accepted_total,
+                            sum(running_jobs.values()),
+                            max_jobs)
+                    else:
+                        batch_size = self.batch_size
+                    job_id_batch = []
+                    for i in range(batch_size):
+                        job_id_batch.append(next_job_id)
+                        next_job_id += 1
+
+                    job = submit_job(job_id_batch)
+                    running_jobs[job] = batch_size
+                    job.add_done_callback(completed_jobs.put)
+
+            if len(running_jobs) == 0:
+                # no workers available yet
+                time.sleep(self.NO_WORKER_SLEEP_TIME)
+                continue
+
+            # Wait for at least one finished job, then gather all finished
+            # jobs.
             # make sure to track and update both
             # total accepted and sequentially
             # accepted jobs
-            for curJob in running_jobs:
-                if curJob.done():
-                    remote_batch = curJob.result()
-                    running_jobs.remove(curJob)
-                    for i in range(self.batch_size):
-                        remote_evaluated = remote_batch[i]
-                        remote_result = remote_evaluated[0]
-                        remote_accept = remote_evaluated[1]
-                        remote_jobid = remote_evaluated[2]
-                        # print("Received result on job ", remote_jobid)
-                        unprocessed_results.add((remote_jobid, remote_accept,
-                                                 remote_result))
-                        if remote_accept:
-                            num_accepted_total += 1
+            finished_jobs = [completed_jobs.get()]
+            while True:
+                try:
+                    finished_jobs.append(completed_jobs.get_nowait())
+                except queue.Empty:
+                    break
+
+            for curJob in finished_jobs:
+                remote_batch = curJob.result()
+                del running_jobs[curJob]
+                num_accepted_batch = 0
+                for remote_evaluated in remote_batch:
+                    remote_result = remote_evaluated[0]
+                    remote_accept = remote_evaluated[1]
+                    remote_jobid = remote_evaluated[2]
+                    # print("Received result on job ", remote_jobid)
+                    unprocessed_results.add((remote_jobid, remote_accept,
+                                             remote_result))
+                    if remote_accept:
+                        num_accepted_total += 1
+                        num_accepted_batch += 1
+                if adaptive:
+                    self.batch_size.update(
+                        len(remote_batch), num_accepted_batch,
+                        sum(res[3] for res in remote_batch))
 
             if len(unprocessed_results) > 0:
                 next_index = unprocessed_results[0][0]
@@ -79,28 +306,6 @@ class EPSMixin:
             if num_accepted_sequential >= n:
                 break
 
-            # Update information on scheduler state
-            # Only submit more jobs if:
-            # Number of jobs open < max_jobs
-            # Number of jobs open < self.scheduler_workers_running *
-            # worker_load_factor
-            # num_accepted_total < jobs required
-            if (len(running_jobs) < self.client_max_jobs) and \
-                    (len(running_jobs) < self.client_cores()) and \
-                    (num_accepted_total < n):
-                for _ in range(0,
-                               np.minimum(self.client_max_jobs,
-                                          self.client_cores()).astype(int)
-                               - len(running_jobs)):
-                    job_id_batch = []
-                    for i in range(self.batch_size):
-                        job_id_batch.append(next_job_id)
-                        next_job_id += 1
-
-                    running_jobs.append(
-                        self.my_client.submit(full_submit_function,
-                                              job_id_batch))
-
         # cancel all unfinished jobs
         for curJob in running_jobs:
             curJob.cancel()
@@ -118,4 +323,11 @@ class EPSMixin:
             # n_eval is latest job_id + 1
             self.nr_evaluations_ = max(self.nr_evaluations_, cur_res[0] + 1)
 
+        # evaluations which were submitted, but not used
+        self.nr_submitted_evaluations_ = next_job_id
+        self.nr_wasted_evaluations_ = next_job_id - self.nr_evaluations_
+        logger.debug(f"Submitted {self.nr_submitted_evaluations_} "
+                     f"evaluations, of which "
+                     f"{self.nr_wasted_evaluations_} were wasted.")
+
         return sample
@@ -1,6 +1,5 @@
 import functools
 import random
-
 import dill as pickle
 import numpy as np
 
@@ -54,14 +53,51 @@ latest/task.html#quick-and-easy-parallelism)
         For example, for the
         :class:`pyabc.sge.SGE` mapper, this option should be set to
         `True` for better performance.
+
+    overprovision: float, optional
+        If not None, switch to a straggler tolerant mode. Instead of n tasks
+        each sampling until one acceptance, tasks of `batch_size`
+        evaluations each are mapped, with pre-assigned consecutive ids.
+        Their number is the expected number required for n acceptances,
+        according to the last observed acceptance rate, times
+        `overprovision`. The results are processed in the order of the
+        task ids, and the sampler returns as soon as the tasks with the
+        smallest ids contain n acceptances. This avoids a bias towards
+        short running simulations, and the fixed number of evaluations
+        per task keeps the task runtimes similar. If the tasks do not
+        suffice, more are mapped.
+
+        This mode requires a lazy map which returns an iterator, such as
+        the built in `map`, `concurrent.futures.Executor.map`,
+        `multiprocessing.pool.Pool.imap` or
+        `multiprocessing.pool.Pool.imap_unordered`. The iterator is then
+        closed, which cancels the remaining tasks for
+        `concurrent.futures.Executor.map`. The remaining tasks of a
+        `multiprocessing.pool.Pool` cannot be cancelled, they are not
+        awaited and their results are dropped. For the built in `map`,
+        they are not evaluated. Eager maps evaluate all tasks before the
+        results are processed. After each generation,
+        `nr_surplus_evaluations_` holds the number of evaluations which
+        were received, but not needed.
+        The default is None, i.e. n tasks each sampling until one
+        acceptance.
+
+    batch_size: int, optional
+        Number of evaluations per task if `overprovision` is set.
+        The default is 1.
     """
 
-    def __init__(self, map_=map, mapper_pickles=False):
+    def __init__(self, map_=map, mapper_pickles=False,
+                 overprovision=None, batch_size=1):
         super().__init__()
         self.map_ = map_
         self.pickle, self.unpickle = ((identity, identity)
                                       if mapper_pickles
                                       else (pickle.dumps, pickle.loads))
+        self.overprovision = overprovision
+        self.batch_size = batch_size
+        # acceptance rate observed in the last generation
+        self._acceptance_rate = None
 
     def __getstate__(self):
         return (self.pickle, self.unpickle,
@@ -88,7 +124,38 @@ latest/task.html#quick-and-easy-parallelism)
 
         return sample, nr_simulations
 
+    def map_function_batch(self, simulate_one, task):
+        """
+        Evaluate a batch of fixed size, for the overprovisioned mode.
+
+        The evaluations are split into one sample per accepted particle,
+        holding also the rejected evaluations before it, and a last sample
+        of the rejected evaluations after the last accepted one. Thus, the
+        batch can be cut after any accepted particle, including the
+        recorded and accumulated summary statistics of the rejected
+        evaluations.
+        """
+        task_id, batch_size = task
+        simulate_one = self.unpickle(simulate_one)
+
+        np.random.seed()
+        random.seed()
+        samples = [self._create_empty_sample()]
+        accepted_ixs = []
+
+        for ix in range(batch_size):
+            new_sim = simulate_one()
+            samples[-1].append(new_sim)
+            if new_sim.accepted:
+                accepted_ixs.append(ix)
+                samples.append(self._create_empty_sample())
+
+        return task_id, samples, accepted_ixs
+
     def sample_until_n_accepted(self, n, simulate_one, all_accepted=False):
+        if self.overprovision is not None:
+            return self._sample_overprovisioned(n, simulate_one)
+
         # pickle them as a tuple instead of individual pickling
         # this should save time and should make better use of
         # shared references.
@@ -114,6 +181,95 @@ latest/task.html#quick-and-easy-parallelism)
 
         return sample
 
+    def _sample_overprovisioned(self, n, simulate_one):
+        sample_simulate_accept = self.pickle(simulate_one)
+        map_function = functools.partial(self.map_function_batch,
+                                         sample_simulate_accept)
+
+        acceptance_rate = self._acceptance_rate or 1.
+        next_task_id = 0
+        # received, but not yet processed results, by task id
+        results = {}
+        next_processed_id = 0
+        samples = []
+        n_accepted = 0
+        nr_evaluations = 0
+        # all received evaluations and acceptances
+        n_received_eval = 0
+        n_received_acc = 0
+
+        def process(task_id):
+            """
+            Use the result of the given task, up to the n-th acceptance.
+            """
+            nonlocal n_accepted, nr_evaluations
+            task_samples, accepted_ixs = results.pop(task_id)
+            n_missing = n - n_accepted
+            if len(accepted_ixs) >= n_missing:
+                # only use the evaluations up to the last required
+                # acceptance
+                nr_evaluations += accepted_ixs[n_missing - 1] + 1
+                samples.extend(task_samples[:n_missing])
+                n_accepted = n
+            else:
+                nr_evaluations += self.batch_size
+                n_accepted += len(accepted_ixs)
+                samples.extend(task_samples)
+
+        while n_accepted < n:
+            n_tasks = int(np.ceil(
+                self.overprovision * (n - n_accepted)
+                / (acceptance_rate * self.batch_size)))
+            tasks = [(task_id, self.batch_size) for task_id
+                     in range(next_task_id, next_task_id + n_tasks)]
+            next_task_id += n_tasks
+
+            mapped = self.map_(map_function, tasks)
+            results_iter = iter(mapped)
+            try:
+                for result in results_iter:
+                    if isinstance(result, Exception):
+                        continue
+                    task_id, task_samples, accepted_ixs = result
+                    results[task_id] = task_samples, accepted_ixs
+                    n_received_eval += self.batch_size
+                    n_received_acc += len(accepted_ixs)
+                    # process the results in the order of the task ids
+                    while next_processed_id in results and n_accepted < n:
+                        process(next_processed_id)
+                        next_processed_id += 1
+                    if n_accepted >= n:
+                        break
+            finally:
+                # cancels the remaining tasks, if supported
+                if hasattr(results_iter, "close"):
+                    results_iter.close()
+            if results_iter is not mapped:
+                # the map was eager, the remaining results are available
+                n_received_eval += self.batch_size * sum(
+                    not isinstance(result, Exception)
+                    for result in results_iter)
+
+            # skip failed tasks
+            while len(results) > 0 and n_accepted < n:
+                next_processed_id = min(results)
+                process(next_processed_id)
+            next_processed_id = next_task_id
+
+            if n_received_acc > 0:
+                acceptance_rate = n_received_acc / n_received_eval
+            else:
+                acceptance_rate = 1 / max(n_received_eval, 1)
+
+        self._acceptance_rate = acceptance_rate
+        self.nr_evaluations_ = nr_evaluations
+        self.nr_surplus_evaluations_ = n_received_eval - nr_evaluations
+
+        sample = self._create_empty_sample()
+        for result in samples:
+            sample += result
+        return sample
+
 
 def identity(x):
     return x
@@ -11,9 +11,9 @@ logger = logging.getLogger("MulticoreSampler")
 SENTINEL = None
 
 
-def feed(feed_q, n_jobs, n_proc):
-    for _ in range(n_jobs):
-        feed_q.put(1)
+def feed(feed_q, job_sizes, n_proc):
+    for job_size in job_sizes:
+        feed_q.put(job_size)
 
     for _ in range(n_proc):
         feed_q.put(SENTINEL)
@@ -29,7 +29,7 @@ def work(feed_q, result_q, simulate_one, single_core_sampler):
             break
 
         res = single_core_sampler.sample_until_n_accepted(
-            1, simulate_one)
+            arg, simulate_one)
         result_q.put((res, single_core_sampler.nr_evaluations_))
 
 
@@ -52,11 +52,16 @@ class MulticoreParticleParallelSampler(MultiCoreSampler):
     or similar, this could cause overhead
 
 
+    For batch simulation, e.g. of a :class:`pyabc.model.BatchModel`, each
+    process instead samples an equal share of the particles, in batches.
+
     Parameters
     ----------
         n_procs: int, optional
             If set to None, the Number of cores is determined according to
             :func:`pyabc.sge.nr_cores_available`.
+        max_batch_size: int, optional (default = 1000)
+            The maximum number of particles simulated in one batch.
 
 
     .. warning::
@@ -75,10 +80,18 @@ class MulticoreParticleParallelSampler(MultiCoreSampler):
         feed_q = Queue()
         result_q = Queue()
 
-        feed_process = Process(target=feed, args=(feed_q, n,
+        if hasattr(simulate_one, "simulate_batch"):
+            # one job per process, to not discard partial batches per
+            # particle
+            job_sizes = [n // n_procs + (i < n % n_procs)
+                         for i in range(n_procs)]
+        else:
+            job_sizes = [1] * n
+
+        feed_process = Process(target=feed, args=(feed_q, job_sizes,
                                                   n_procs))
 
-        single_core_sampler = SingleCoreSampler()
+        single_core_sampler = SingleCoreSampler(self.max_batch_size)
         single_core_sampler.sample_factory = self.sample_factory
 
         worker_processes = [Process(target=work, args=(feed_q, result_q,
@@ -93,7 +106,7 @@ class MulticoreParticleParallelSampler(MultiCoreSampler):
 
         collected_results = []
 
-        for _ in range(n):
+        for _ in job_sizes:
             res = get_if_worker_healthy(worker_processes, result_q)
             collected_results.append(res)
 
@@ -1,5 +1,7 @@
 from multiprocessing import Process, Queue, Value
 from ctypes import c_longlong
+import math
+from .base import next_batch_size
 from .multicorebase import MultiCoreSampler
 from ..sge import nr_cores_available
 import numpy as np
@@ -15,32 +17,50 @@ def work(simulate_one,
          n_acc: Value,
          n: int,
          all_accepted: bool,
-         sample_factory):
+         sample_factory,
+         n_procs: int,
+         max_batch_size: int):
     random.seed()
     np.random.seed()
 
+    simulate_batch = getattr(simulate_one, "simulate_batch", None)
+
     sample = sample_factory()
 
     while n_acc.value < n and \
             (not all_accepted or n_eval.value < n):
+        if simulate_batch is None:
+            batch_size = 1
+        else:
+            # this process' share of the missing acceptances
+            batch_size = next_batch_size(
+                math.ceil((n - n_acc.value) / n_procs),
+                n_eval.value, n_acc.value, max_batch_size)
+
         with n_eval.get_lock():
-            particle_id = n_eval.value
-            n_eval.value += 1
+            first_particle_id = n_eval.value
+            n_eval.value += batch_size
 
-        new_sim = simulate_one()
-        sample.append(new_sim)
+        if simulate_batch is None:
+            new_sims = [simulate_one()]
+        else:
+            new_sims = simulate_batch(batch_size)
 
-        if new_sim.accepted:
+        for particle_id, new_sim in enumerate(new_sims,
+                                              start=first_particle_id):
+            sample.append(new_sim)
 
-            # increase number of accepted particles
-            with n_acc.get_lock():
-                n_acc.value += 1
+            if new_sim.accepted:
 
-            # put into queue
-            queue.put((particle_id, sample))
+                # increase number of accepted particles
+                with n_acc.get_lock():
+                    n_acc.value += 1
 
-            # create empty sample and record until next accepted
-            sample = sample_factory()
+                # put into queue
+                queue.put((particle_id, sample))
+
+                # create empty sample and record until next accepted
+                sample = sample_factory()
 
     # indicate worker finished
     queue.put(DONE)
@@ -79,6 +99,13 @@ class MulticoreEvalParallelSampler(MultiCoreSampler):
     n_procs: int, optional
         If set to None, the Number of cores is determined according to
         :func:`pyabc.sge.nr_cores_available`.
+
+    max_batch_size: int, optional (default = 1000)
+        For batch simulation, e.g. of a :class:`pyabc.model.BatchModel`,
+        the maximum number of particles a process simulates in one batch.
+        The batches are sized by the acceptance rate observed so far, and
+        particles are ordered by their ids as before, such that accepted
+        particles beyond the first n are discarded.
     """
 
     @property
@@ -100,7 +127,8 @@ class MulticoreEvalParallelSampler(MultiCoreSampler):
             Process(target=work,
                     args=(simulate_one,
                           queue, n_eval, n_acc, n, all_accepted,
-                          self._create_empty_sample),
+                          self._create_empty_sample,
+                          self.n_procs, self.max_batch_size),
                     daemon=self.daemon)
             for _ in range(self.n_procs)
         ]
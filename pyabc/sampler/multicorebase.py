@@ -10,12 +10,17 @@ class MultiCoreSampler(Sampler):
     Multi-core sampler base class. This sampler is not functional but provides
     the number of cores selection functionality used by all the multiprocessing
     samplers.
+
+    The maximum number of particles simulated in one batch, for batch
+    simulation, is `max_batch_size`, see
+    :class:`pyabc.sampler.SingleCoreSampler`.
     """
 
-    def __init__(self, n_procs=None, daemon=True):
+    def __init__(self, n_procs=None, daemon=True, max_batch_size=1000):
         super().__init__()
         self._n_procs = n_procs
         self.daemon = daemon
+        self.max_batch_size = max_batch_size
 
     @property
     def n_procs(self):
@@ -9,8 +9,17 @@ from time import time
 import click
 from .redis_logging import logger
 from .cmd import (N_EVAL, N_ACC, N_REQ, ALL_ACCEPTED,
-                  N_WORKER, SSA, QUEUE, START, STOP,
-                  MSG, BATCH_SIZE)
+                  N_WORKER, SSA, START, STOP,
+                  MSG, BATCH_SIZE, COMPACT, COMPRESS, SCHEMAS,
+                  ANALYSES, CLAIMS, N_LOST, WORKERS, LEASE_TIME, STATS,
+                  REISSUED, idfy)
+from .encoding import SampleEncoder
+from .telemetry import (WorkerStats, load_stats, rates, aggregate,
+                        format_rates)
+from .lease import (Heartbeat, create_worker_id, register_worker,
+                    unregister_worker, claim_evaluations, parse_claim,
+                    report_evaluations)
+from .scheduler import choose_analysis, FAIR, SCHEDULES
 from multiprocessing import Pool
 import numpy as np
 import random
@@ -44,21 +53,26 @@ class KillHandler:
 def work_on_population(redis: StrictRedis,
                        start_time: int,
                        max_runtime_s: int,
-                       kill_handler: KillHandler):
+                       kill_handler: KillHandler,
+                       analysis_id: str = "",
+                       lease_time: float = LEASE_TIME):
     """
-    Here the actual sampling happens.
+    Here the actual sampling happens, for the current population of the
+    analysis with the given id.
+    While working on the population, the worker holds a lease which
+    is refreshed by a heartbeat thread, see :mod:`.lease`.
     """
-
-    # set timers
-    population_start_time = time()
-    cumulative_simulation_time = 0
+    ana_id = analysis_id
 
     # read from pipeline
     pipeline = redis.pipeline()
     # extract bytes
-    ssa_b, batch_size_b, all_accepted_b, n_req_b, n_acc_b \
-        = (pipeline.get(SSA).get(BATCH_SIZE)
-           .get(ALL_ACCEPTED).get(N_REQ).get(N_ACC).execute())
+    ssa_b, batch_size_b, all_accepted_b, n_req_b, n_acc_b, \
+        compact_b, compress_b \
+        = (pipeline.get(idfy(SSA, ana_id)).get(idfy(BATCH_SIZE, ana_id))
+           .get(idfy(ALL_ACCEPTED, ana_id)).get(idfy(N_REQ, ana_id))
+           .get(idfy(N_ACC, ana_id)).get(idfy(COMPACT, ana_id))
+           .get(idfy(COMPRESS, ana_id)).execute())
 
     if ssa_b is None:
         return
@@ -73,31 +87,64 @@ def work_on_population(redis: StrictRedis,
     batch_size = int(batch_size_b.decode())
     all_accepted = bool(int(all_accepted_b.decode()))
     n_req = int(n_req_b.decode())
+    compact = bool(int(compact_b.decode()))
+    compress = bool(int(compress_b.decode()))
+
+    # encode compactly or just pickle the accepted samples
+    if compact:
+        encode = SampleEncoder(
+            redis, compress, schemas=idfy(SCHEMAS, ana_id)).encode
+    else:
+        def encode(id_, sample):
+            return cloudpickle.dumps((id_, sample))
 
     # notify sign up as worker
-    n_worker = redis.incr(N_WORKER)
+    worker_id = create_worker_id()
+    n_worker = register_worker(redis, worker_id, ana_id, lease_time)
+    heartbeat = Heartbeat(redis, worker_id, ana_id, lease_time)
+    heartbeat.start()
+
+    def quit_population():
+        heartbeat.stop()
+        if not unregister_worker(redis, worker_id, ana_id):
+            logger.warning(
+                f"Worker {n_worker} had already been reclaimed by the "
+                f"master, as its lease expired.")
+
     logger.info(
-        f"Begin population, batch size {batch_size}. "
-        f"I am worker {n_worker}")
+        f"Begin population{f' of analysis {ana_id}' if ana_id else ''}, "
+        f"batch size {batch_size}. I am worker {n_worker}")
 
-    # counter for number of simulations
-    internal_counter = 0
+    # counters and timers, published regularly
+    stats = WorkerStats(worker_id, batch_size)
 
     # create empty sample
     sample = sample_factory()
 
     # loop until no more particles required
-    while int(redis.get(N_ACC).decode()) < n_req \
-            and (not all_accepted or int(redis.get(N_EVAL).decode()) < n_req):
+    while True:
+        with stats.time_io():
+            if not _requires_particles(redis, ana_id, n_req, all_accepted):
+                break
+
         if kill_handler.killed:
             logger.info(
                 f"Worker {n_worker} received stop signal. "
                 f"Terminating in the middle of a population "
-                f"after {internal_counter} samples.")
+                f"after {stats.n_sim} samples.")
             # notify quit
-            redis.decr(N_WORKER)
+            quit_population()
             sys.exit(0)
 
+        if heartbeat.evicted:
+            # the master assumes this worker dead and does not wait
+            # for it, so stop silently
+            logger.warning(
+                f"Worker {n_worker} stops during population because its "
+                f"lease expired.")
+            kill_handler.exit = True
+            return
+
         # check whether time's up
         current_runtime = time() - start_time
         if current_runtime > max_runtime_s:
@@ -106,63 +153,88 @@ def work_on_population(redis: StrictRedis,
                 f"runtime {current_runtime} exceeds "
                 f"max runtime {max_runtime_s}")
             # notify quit
-            redis.decr(N_WORKER)
+            quit_population()
             return
 
-        # increase global number of evaluations counter
-        particle_max_id = redis.incr(N_EVAL, batch_size)
+        # claim the evaluations of dead workers, or else increase global
+        # number of evaluations counter, and note them in the lease
+        with stats.time_io():
+            pipeline = redis.pipeline()
+            claim_evaluations(pipeline, worker_id, ana_id, batch_size)
+            stats.publish(pipeline, idfy(STATS, ana_id))
+            particle_max_id, n_claimed = parse_claim(pipeline.execute()[0])
 
-        # timer for current simulation until batch_size acceptances
-        this_sim_start = time()
         # collect accepted particles
         accepted_samples = []
 
-        # make batch_size attempts
-        for n_batched in range(batch_size):
+        # make the claimed attempts
+        for n_batched in range(n_claimed):
             # simulate
-            new_sim = simulate_one()
+            with stats.time_sim():
+                new_sim = simulate_one()
             # append to current sample
             sample.append(new_sim)
             # increase evaluation counter
-            internal_counter += 1
+            stats.n_sim += 1
             # check for acceptance
             if new_sim.accepted:
+                stats.n_acc += 1
                 # the order of the IDs is reversed, but this does not
                 # matter. Important is only that the IDs are specified
                 # before the simulation starts
 
                 # append to accepted list
                 accepted_samples.append(
-                    cloudpickle.dumps((particle_max_id - n_batched, sample)))
+                    encode(particle_max_id - n_batched, sample))
                 # initialize new sample
                 sample = sample_factory()
 
-        # update total simulation-specific time
-        cumulative_simulation_time += time() - this_sim_start
+        if heartbeat.evicted:
+            # the master does not wait for the results anymore, and
+            # re-issued the claim
+            continue
 
-        # push to pipeline if at least one sample got accepted
-        if len(accepted_samples) > 0:
-            # new pipeline
-            pipeline = redis.pipeline()
-            # update particles counter
-            pipeline.incr(N_ACC, len(accepted_samples))
-            # note: samples are appended 1-by-1
-            pipeline.rpush(QUEUE, *accepted_samples)
-            # execute all commands
-            pipeline.execute()
+        # push the accepted samples, and release the claim, also if none
+        # got accepted
+        with stats.time_io():
+            report_evaluations(redis, worker_id, ana_id, accepted_samples)
 
     # end of sampling loop
 
     # notify quit
-    redis.decr(N_WORKER)
+    quit_population()
     kill_handler.exit = True
-    population_total_time = time() - population_start_time
+    population_total_time = time() - stats.start_time
     logger.info(
-        f"Finished population, did {internal_counter} samples. "
-        f"Simulation time: {cumulative_simulation_time:.2f}s, "
+        f"Finished population, did {stats.n_sim} samples. "
+        f"Simulation time: {stats.sim_time:.2f}s, "
+        f"redis time: {stats.io_time:.2f}s, "
         f"total time {population_total_time:.2f}.")
 
 
+def _requires_particles(redis: StrictRedis, ana_id: str, n_req: int,
+                        all_accepted: bool) -> bool:
+    """
+    Whether the population still requires particles.
+    The re-issued evaluations of dead workers are always evaluated anew,
+    see :mod:`.lease`.
+    """
+    pipeline = redis.pipeline()
+    n_acc_b, n_eval_b, n_reissued = (
+        pipeline.get(idfy(N_ACC, ana_id)).get(idfy(N_EVAL, ana_id))
+        .llen(idfy(REISSUED, ana_id)).execute())
+    if n_acc_b is None:
+        # the master already cleaned up
+        return False
+    if n_reissued > 0:
+        return True
+    if int(n_acc_b.decode()) >= n_req:
+        return False
+    if not all_accepted:
+        return True
+    return int(n_eval_b.decode()) < n_req
+
+
 @click.command(help="Evaluation parallel redis sampler for pyABC.")
 @click.option('--host', default="localhost", help='Redis host.')
 @click.option('--port', default=6379, type=int, help='Redis port.')
@@ -175,7 +247,19 @@ def work_on_population(redis: StrictRedis,
                    'a day you could do 0.5d.')
 @click.option('--processes', type=int, default=1, help="The number of worker "
                                                        "processes to start")
-def work(host="localhost", port=6379, runtime="2h", processes=1):
+@click.option('--schedule', type=click.Choice(SCHEDULES), default=FAIR,
+              help="How to choose among several concurrently sampling "
+                   "analyses. 'fair' distributes the workers proportionally "
+                   "to the analysis priorities, 'priority' serves the "
+                   "analysis with the highest priority first.")
+@click.option('--lease-time', type=float, default=LEASE_TIME,
+              help="Time in seconds after which the master considers a "
+                   "worker dead if it does not receive a heartbeat. "
+                   "The heartbeat is sent from a background thread, so "
+                   "increase this only if simulations block the python "
+                   "interpreter for long.")
+def work(host="localhost", port=6379, runtime="2h", processes=1,
+         schedule=FAIR, lease_time=LEASE_TIME):
     """
     Corresponds to the entry point abc-redis-worker.
     """
@@ -183,14 +267,16 @@ def work(host="localhost", port=6379, runtime="2h", processes=1):
         # start a single process right here, not within pool
         # this handles the problem of starting a daemon process within a
         # daemon process
-        return _work(host, port, runtime)
+        return _work(host, port, runtime, schedule, lease_time)
 
     with Pool(processes) as pool:
-        res = pool.starmap(_work, [(host, port, runtime)] * processes)
+        res = pool.starmap(
+            _work, [(host, port, runtime, schedule, lease_time)] * processes)
     return res
 
 
-def _work(host="localhost", port=6379, runtime="2h"):
+def _work(host="localhost", port=6379, runtime="2h", schedule=FAIR,
+          lease_time=LEASE_TIME):
     np.random.seed()
     random.seed()
 
@@ -214,7 +300,13 @@ def _work(host="localhost", port=6379, runtime="2h"):
 
         # check if it is int to (first iteration) run at least once
         if data == START or isinstance(data, int):
-            work_on_population(redis, start_time, max_runtime_s, kill_handler)
+            # work on populations as long as any analysis requires particles
+            while time() - start_time <= max_runtime_s:
+                analysis_id = choose_analysis(redis, schedule)
+                if analysis_id is None:
+                    break
+                work_on_population(redis, start_time, max_runtime_s,
+                                   kill_handler, analysis_id, lease_time)
 
         if data == STOP:
             logger.info("Received stop signal. Shutdown redis worker.")
@@ -229,39 +321,78 @@ def _work(host="localhost", port=6379, runtime="2h"):
 
 
 @click.command(help="ABC Redis cluster manager. "
-                    "The command can be 'info' or 'stop'. "
+                    "The command can be 'info', 'stats', 'stop' or "
+                    "'reset-workers'. "
                     "For 'stop' the workers are shut down cleanly "
                     "after the current population. "
                     "For 'info' you'll see how many workers are connected, "
                     "how many evaluations the current population has, and "
-                    "how many particles are still missing. "
+                    "how many particles are still missing, and how many "
+                    "evaluations of dead workers were re-issued. "
+                    "For 'stats' you'll see the throughput of each "
+                    "sampling worker and the total: simulations per second, "
+                    "acceptance rate, mean simulation time, and the "
+                    "fractions of time spent in redis communication and in "
+                    "simulations. "
                     "For 'reset-workers', the worker count will be resetted to"
-                    "zero. This does not cancel the sampling. This is useful "
-                    "if workers were unexpectedly killed.")
+                    "zero. This does not cancel the sampling. Workers which "
+                    "were unexpectedly killed are usually detected via their "
+                    "expired leases, this is a fallback. "
+                    "'info', 'stats' and 'reset-workers' refer to the "
+                    "analysis given via --analysis-id. If several analyses "
+                    "share the server, 'info' and 'stats' without "
+                    "--analysis-id list all currently sampling ones.")
 @click.option('--host', default="localhost", help='Redis host.')
 @click.option('--port', default=6379, type=int, help='Redis port.')
+@click.option('--analysis-id', default=None, type=str,
+              help='Analysis id as passed to the sampler.')
 @click.argument('command', type=str)
-def manage(command, host="localhost", port=6379):
+def manage(command, host="localhost", port=6379, analysis_id=None):
     """
     Corresponds to the entry point abc-redis-manager.
     """
-    return _manage(command, host=host, port=port)
+    return _manage(command, host=host, port=port, analysis_id=analysis_id)
 
 
-def _manage(command, host="localhost", port=6379):
+def _manage(command, host="localhost", port=6379, analysis_id=None):
     redis = StrictRedis(host=host, port=port)
+    if analysis_id is not None:
+        ana_ids = [analysis_id]
+    else:
+        ana_ids = sorted(ana_id.decode()
+                         for ana_id in redis.hkeys(ANALYSES)) or [""]
     if command == "info":
-        pipe = redis.pipeline()
-        pipe.get(N_WORKER)
-        pipe.get(N_EVAL)
-        pipe.get(N_ACC)
-        pipe.get(N_REQ)
-        res = pipe.execute()
-        res = [r.decode() if r is not None else r for r in res]
-        print("Workers={} Evaluations={} Acceptances={}/{}".format(*res))
+        for ana_id in ana_ids:
+            pipe = redis.pipeline()
+            pipe.get(idfy(N_WORKER, ana_id))
+            pipe.get(idfy(N_EVAL, ana_id))
+            pipe.get(idfy(N_ACC, ana_id))
+            pipe.get(idfy(N_REQ, ana_id))
+            pipe.get(idfy(N_LOST, ana_id))
+            res = pipe.execute()
+            res = [r.decode() if r is not None else r for r in res]
+            prefix = f"Analysis={ana_id} " if ana_id else ""
+            print(prefix + "Workers={} Evaluations={} Acceptances={}/{} "
+                  "Reissued={}".format(*res))
+    elif command == "stats":
+        for ana_id in ana_ids:
+            prefix = f"Analysis={ana_id} " if ana_id else ""
+            stats = load_stats(redis, idfy(STATS, ana_id))
+            for worker_id, worker_stats in sorted(stats.items()):
+                print(prefix + f"Worker={worker_id} "
+                      f"Batch={worker_stats['batch_size']} "
+                      + format_rates(rates(worker_stats)))
+            total = aggregate(list(stats.values()))
+            print(prefix + f"Total Workers={total['n_worker']} "
+                  + format_rates(total))
     elif command == "stop":
         redis.publish(MSG, STOP)
     elif command == "reset-workers":
-        redis.set(N_WORKER, 0)
+        ana_id = analysis_id or ""
+        pipe = redis.pipeline()
+        pipe.set(idfy(N_WORKER, ana_id), 0)
+        pipe.delete(idfy(WORKERS, ana_id))
+        pipe.delete(idfy(CLAIMS, ana_id))
+        pipe.execute()
     else:
         print("Unknown command:", command)
@@ -7,9 +7,40 @@ N_REQ = "n_req"
 ALL_ACCEPTED = "all_accepted"
 SSA = "sample_simulate_accept"
 N_WORKER = "n_workers"
+COMPACT = "compact_encoding"
+COMPRESS = "compress"
+SCHEMAS = "schemas"
+# leases of the workers, see lease.py
+WORKERS = "workers"
+CLAIMS = "claims"
+HEARTBEAT = "heartbeat"
+# number of evaluations of dead workers, and their re-issued id ranges
+N_LOST = "n_lost"
+REISSUED = "reissued"
+# hash of the throughput counters of the workers, see telemetry.py
+STATS = "stats"
+
+# hash of the currently sampling analyses and their priorities
+ANALYSES = "analyses"
 
 MSG = "msg_pubsub"
 START = "start"
 STOP = "stop"
 BATCH_SIZE = "batch_size"
 SLEEP_TIME = .1
+# default time in seconds after which the lease of a worker expires
+LEASE_TIME = 60
+# interval in seconds in which the master checks the leases
+LEASE_CHECK_INTERVAL = 1
+# minimum interval in seconds in which the workers publish their counters
+STATS_INTERVAL = 5
+
+
+def idfy(key: str, analysis_id: str) -> str:
+    """
+    Scope a key to an analysis, such that several analyses can share one
+    redis server. The empty analysis id leaves the key unchanged.
+    """
+    if not analysis_id:
+        return key
+    return f"{analysis_id}:{key}"
@@ -0,0 +1,366 @@
+"""
+Compact encoding of the samples which the redis workers send to the
+master.
+
+Instead of pickling full :class:`pyabc.sampler.Sample` objects, which
+contain one :class:`pyabc.Particle` per evaluation together with its
+:class:`pyabc.Parameter` and summary statistics dictionaries, the
+parameter and summary statistics values are packed into flat float64 and
+int64 arrays. Only numpy arrays and numeric scalars are packed, all other
+values, e.g. pandas DataFrames and Series, are pickled as they are.
+The key order, shapes and dtypes are only transferred once per population
+and worker, as a schema stored in a redis hash.
+Rejected particles are aggregated per schema to one block of summary
+statistics, as their parameters are not needed on the master.
+
+Each message starts with the 8 byte particle id, such that the master can
+sort the results and then decode only those it actually uses.
+"""
+
+import pickle
+import struct
+import zlib
+import hashlib
+import numpy as np
+
+from ...parameters import Parameter
+from ...population import Particle
+from .cmd import SCHEMAS
+
+
+ID_FORMAT = "<q"
+ID_SIZE = struct.calcsize(ID_FORMAT)
+SCALAR_TYPES = (bool, int, float, np.bool_, np.integer, np.floating)
+
+
+def _packable(dtype: np.dtype) -> bool:
+    """
+    Whether values of this dtype can be packed without loss, into the
+    int64 buffer for booleans and integers, or into the float64 buffer.
+    """
+    return dtype.kind in "bi" \
+        or (dtype.kind == "u" and dtype.itemsize < 8) \
+        or (dtype.kind == "f" and dtype.itemsize <= 8)
+
+
+def _is_int(dtype_str: str) -> bool:
+    return np.dtype(dtype_str).kind in "biu"
+
+
+def _layout(dct):
+    """
+    Compute the layout, i.e. a tuple of (key, shape, dtype) entries, of a
+    dictionary.
+
+    Returns
+    -------
+
+    layout: tuple or None
+        None if any value is not a numpy array or a numeric scalar of a
+        packable dtype, e.g. a pandas DataFrame or Series, and the
+        dictionary can thus not be packed.
+    """
+    layout = []
+    for key, val in dct.items():
+        if not isinstance(val, (np.ndarray,) + SCALAR_TYPES):
+            return None
+        arr = np.asarray(val)
+        if not _packable(arr.dtype):
+            return None
+        layout.append((key, arr.shape, arr.dtype.str))
+    return tuple(layout)
+
+
+def _concatenate(values, dtype):
+    if len(values) == 0:
+        return np.empty(0, dtype=dtype)
+    return np.concatenate(values)
+
+
+def _flatten(dct, layout):
+    """
+    Pack the values of a dictionary into one flat float64 and one flat
+    int64 array, the latter for booleans and integers, such that large
+    integers are not rounded.
+    """
+    floats = [np.asarray(dct[key], dtype=np.float64).ravel()
+              for key, _, dtype in layout if not _is_int(dtype)]
+    ints = [np.asarray(dct[key], dtype=np.int64).ravel()
+            for key, _, dtype in layout if _is_int(dtype)]
+    return _concatenate(floats, np.float64), _concatenate(ints, np.int64)
+
+
+def _unflatten(vecs, layout):
+    """
+    Inverse of `_flatten`. Scalars are restored as numpy scalars and arrays
+    with their original shape, both of their original dtype.
+    """
+    floats, ints = vecs
+    dct = {}
+    ix_float = 0
+    ix_int = 0
+    for key, shape, dtype in layout:
+        size = int(np.prod(shape))
+        if _is_int(dtype):
+            val = ints[ix_int:ix_int + size].astype(dtype)
+            ix_int += size
+        else:
+            val = floats[ix_float:ix_float + size].astype(dtype)
+            ix_float += size
+        if shape == ():
+            val = val[0]
+        else:
+            val = val.reshape(shape)
+        dct[key] = val
+    return dct
+
+
+def _sum_stats_layout(sum_stats):
+    """
+    Common layout of a list of summary statistics, or None if they do not
+    share one.
+    """
+    if len(sum_stats) == 0:
+        return ()
+    layout = _layout(sum_stats[0])
+    if layout is None or any(_layout(sum_stat) != layout
+                             for sum_stat in sum_stats[1:]):
+        return None
+    return layout
+
+
+def _stack(sum_stats, layout):
+    """
+    Stack packed summary statistics to a float64 array of shape
+    (n_sum_stats, n_float_values) and an int64 array of shape
+    (n_sum_stats, n_int_values).
+    """
+    n_ints = sum(int(np.prod(shape)) for _, shape, dtype in layout
+                 if _is_int(dtype))
+    n_floats = sum(int(np.prod(shape)) for _, shape, _ in layout) - n_ints
+    if len(sum_stats) == 0:
+        return (np.empty((0, n_floats), dtype=np.float64),
+                np.empty((0, n_ints), dtype=np.int64))
+    floats, ints = zip(*(_flatten(sum_stat, layout)
+                         for sum_stat in sum_stats))
+    return (np.array(floats, dtype=np.float64).reshape(-1, n_floats),
+            np.array(ints, dtype=np.int64).reshape(-1, n_ints))
+
+
+def _unstack(stacked, layout):
+    """
+    Inverse of `_stack`.
+    """
+    return [_unflatten(vecs, layout) for vecs in zip(*stacked)]
+
+
+def _schema_id(schema):
+    return hashlib.sha1(pickle.dumps(schema)).hexdigest()[:16]
+
+
+def load_id(dump: bytes) -> int:
+    """
+    Read the particle id of an encoded sample without decoding it.
+    """
+    return struct.unpack_from(ID_FORMAT, dump)[0]
+
+
+class SampleEncoder:
+    """
+    Encode samples on the worker side.
+
+    Parameters
+    ----------
+
+    redis: StrictRedis
+        Connection to the redis server, used to publish the schemas.
+
+    compress: bool, optional (default = False)
+        Whether to zlib compress the messages.
+
+    schemas: str, optional (default = SCHEMAS)
+        Key of the redis hash holding the schemas.
+    """
+
+    def __init__(self, redis, compress: bool = False, schemas: str = SCHEMAS):
+        self.redis = redis
+        self.compress = compress
+        self.schemas = schemas
+        self._registered = set()
+
+    def _register(self, schema) -> str:
+        """
+        Publish the schema, once per encoder, and return its id.
+        """
+        schema_id = _schema_id(schema)
+        if schema_id not in self._registered:
+            self.redis.hsetnx(self.schemas, schema_id, pickle.dumps(schema))
+            self._registered.add(schema_id)
+        return schema_id
+
+    def encode(self, id_: int, sample) -> bytes:
+        """
+        Encode a sample with the given particle id.
+
+        Particles which cannot be packed, e.g. because their parameters or
+        summary statistics are not numeric, are pickled as they are.
+        """
+        accepted = []
+        rejected = {}
+        raw = []
+
+        for particle in sample._particles:
+            try:
+                self._encode_particle(particle, accepted, rejected)
+            except (TypeError, ValueError):
+                raw.append(particle)
+
+        rejected = [(schema_id, _stack(sum_stats, ss_layout),
+                     np.asarray(distances, dtype=float))
+                    for schema_id, (ss_layout, sum_stats, distances)
+                    in rejected.items()]
+
+        payload = pickle.dumps(
+            (accepted, rejected, raw, sample.timing, sample.profile,
+             sample._reservoir, sample.n_recorded,
+             sample.sum_stats_accumulator, sample.n_truncated,
+             sample.n_cache_hits, sample.n_cache_misses),
+            protocol=pickle.HIGHEST_PROTOCOL)
+        if self.compress:
+            payload = zlib.compress(payload)
+
+        return struct.pack(ID_FORMAT, id_) + payload
+
+    def _encode_particle(self, particle, accepted: list, rejected: dict):
+        """
+        Append the packed particle to the accepted list, or its summary
+        statistics to the rejected blocks.
+
+        Raises
+        ------
+
+        TypeError, ValueError
+            If the particle cannot be packed.
+        """
+        all_sum_stats = (particle.accepted_sum_stats
+                         + particle.rejected_sum_stats)
+        ss_layout = _sum_stats_layout(all_sum_stats)
+        if ss_layout is None:
+            raise TypeError("Summary statistics cannot be packed.")
+
+        if not particle.accepted:
+            # only the summary statistics of rejected particles are
+            # required, so aggregate them
+            distances = (particle.accepted_distances
+                         + particle.rejected_distances)
+            schema_id = self._register((None, ss_layout))
+            block = rejected.setdefault(schema_id, (ss_layout, [], []))
+            block[1].extend(all_sum_stats)
+            block[2].extend(distances)
+            return
+
+        par_layout = _layout(particle.parameter)
+        if par_layout is None:
+            raise TypeError("Parameters cannot be packed.")
+        schema_id = self._register((par_layout, ss_layout))
+        accepted.append((
+            schema_id, particle.m, particle.weight,
+            _flatten(particle.parameter, par_layout),
+            _stack(particle.accepted_sum_stats, ss_layout),
+            np.asarray(particle.accepted_distances, dtype=float),
+            _stack(particle.rejected_sum_stats, ss_layout),
+            np.asarray(particle.rejected_distances, dtype=float)))
+
+
+class SampleDecoder:
+    """
+    Decode samples on the master side.
+
+    Parameters
+    ----------
+
+    redis: StrictRedis
+        Connection to the redis server, used to retrieve the schemas.
+
+    sample_factory: SampleFactory
+        Creates the empty samples to fill.
+
+    compress: bool, optional (default = False)
+        Whether the messages are zlib compressed.
+
+    schemas: str, optional (default = SCHEMAS)
+        Key of the redis hash holding the schemas.
+    """
+
+    def __init__(self, redis, sample_factory, compress: bool = False,
+                 schemas: str = SCHEMAS):
+        self.redis = redis
+        self.sample_factory = sample_factory
+        self.compress = compress
+        self.schemas = schemas
+        self._cache = {}
+
+    def _schema(self, schema_id):
+        if schema_id not in self._cache:
+            self._cache[schema_id] = pickle.loads(
+                self.redis.hget(self.schemas, schema_id))
+        return self._cache[schema_id]
+
+    def decode(self, dump: bytes):
+        """
+        Decode a message.
+
+        Returns
+        -------
+
+        id_, sample: int, Sample
+            The particle id and the sample.
+        """
+        payload = dump[ID_SIZE:]
+        if self.compress:
+            payload = zlib.decompress(payload)
+        (accepted, rejected, raw, timing, profile, reservoir, n_recorded,
+         sum_stats_accumulator, n_truncated, n_cache_hits,
+         n_cache_misses) = pickle.loads(payload)
+
+        sample = self.sample_factory()
+        sample.timing = timing
+        sample.profile = profile
+
+        for (schema_id, m, weight, par, acc_ss, acc_d, rej_ss, rej_d) \
+                in accepted:
+            par_layout, ss_layout = self._schema(schema_id)
+            sample.append(Particle(
+                m=m,
+                parameter=Parameter(_unflatten(par, par_layout)),
+                weight=weight,
+                accepted_sum_stats=_unstack(acc_ss, ss_layout),
+                accepted_distances=list(acc_d),
+                rejected_sum_stats=_unstack(rej_ss, ss_layout),
+                rejected_distances=list(rej_d),
+                accepted=True))
+
+        for schema_id, rej_ss, rej_d in rejected:
+            _, ss_layout = self._schema(schema_id)
+            sample.append(Particle(
+                m=None,
+                parameter=None,
+                weight=0,
+                accepted_sum_stats=[],
+                accepted_distances=[],
+                rejected_sum_stats=_unstack(rej_ss, ss_layout),
+                rejected_distances=list(rej_d),
+                accepted=False))
+
+        for particle in raw:
+            sample.append(particle)
+
+        # the particles were already recorded on the worker
+        sample._reservoir = reservoir
+        sample.n_recorded = n_recorded
+        sample.sum_stats_accumulator = sum_stats_accumulator
+        sample.n_truncated = n_truncated
+        sample.n_cache_hits = n_cache_hits
+        sample.n_cache_misses = n_cache_misses
+
+        return load_id(dump), sample
@@ -0,0 +1,280 @@
+"""
+Leases of the redis workers, such that the master can detect workers which
+died during a population, e.g. by being killed or preempted, and need not
+wait for them forever.
+
+Each worker registers itself for the population in the set WORKERS,
+together with a heartbeat key which expires after the lease time unless it
+is refreshed. A background thread of the worker refreshes the heartbeat.
+The id range of the claimed, but not yet reported evaluations of each
+worker is kept in the hash CLAIMS, as "max_id:n", and removed when the
+batch is reported, whether any particle was accepted or not.
+
+If the heartbeat of a registered worker expired, the master unregisters
+it, decrements N_WORKER, puts its claimed id range into the list
+REISSUED, and adds the number of these evaluations to N_LOST.
+Registration and unregistration use optimistic transactions on the WORKERS
+set, such that a worker is unregistered exactly once, either by itself or
+by the master, and a batch is reported only by a registered worker.
+
+The workers claim re-issued id ranges before new ones, and keep working
+on them even if enough particles were accepted, until the master stopped
+waiting for the workers. Thus, the ids of evaluations of dead workers are
+evaluated anew, instead of being missing among the smallest ids, such
+that selecting the accepted particles with the smallest ids stays free of
+a bias against long running simulations.
+"""
+
+import os
+import socket
+import threading
+import uuid
+from redis import StrictRedis
+
+from .cmd import (WORKERS, CLAIMS, HEARTBEAT, N_WORKER, N_LOST, STATS,
+                  REISSUED, N_EVAL, N_ACC, QUEUE, idfy)
+from .redis_logging import logger
+
+
+# claim a re-issued id range, or else a new one, and note it as claimed by
+# the worker, in one atomic step
+_CLAIM_SCRIPT = """
+local claim = redis.call('LPOP', KEYS[1])
+if not claim then
+    local max_id = redis.call('INCRBY', KEYS[2], ARGV[2])
+    claim = max_id .. ':' .. ARGV[2]
+end
+redis.call('HSET', KEYS[3], ARGV[1], claim)
+return claim
+"""
+
+
+def _heartbeat_key(worker_id: str, ana_id: str) -> str:
+    return idfy(f"{HEARTBEAT}:{worker_id}", ana_id)
+
+
+def create_worker_id() -> str:
+    """
+    Create a worker id unique across hosts and processes.
+    """
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def register_worker(redis: StrictRedis, worker_id: str, ana_id: str,
+                    lease_time: float) -> int:
+    """
+    Register the worker for the current population and start its lease.
+
+    Returns
+    -------
+
+    n_worker: int
+        The number of registered workers, including this one.
+    """
+    pipeline = redis.pipeline()
+    pipeline.set(_heartbeat_key(worker_id, ana_id), 1,
+                 px=int(lease_time * 1000))
+    pipeline.sadd(idfy(WORKERS, ana_id), worker_id)
+    pipeline.incr(idfy(N_WORKER, ana_id))
+    return pipeline.execute()[-1]
+
+
+def unregister_worker(redis: StrictRedis, worker_id: str,
+                      ana_id: str) -> bool:
+    """
+    Unregister the worker at the end of its work on the population.
+
+    Returns
+    -------
+
+    unregistered: bool
+        False if the worker had already been unregistered by the master.
+    """
+    workers = idfy(WORKERS, ana_id)
+    unregistered = []
+
+    def unregister(pipe):
+        del unregistered[:]
+        if not pipe.sismember(workers, worker_id):
+            return
+        pipe.multi()
+        pipe.srem(workers, worker_id)
+        pipe.hdel(idfy(CLAIMS, ana_id), worker_id)
+        pipe.hdel(idfy(STATS, ana_id), worker_id)
+        pipe.delete(_heartbeat_key(worker_id, ana_id))
+        pipe.decr(idfy(N_WORKER, ana_id))
+        unregistered.append(True)
+
+    redis.transaction(unregister, workers)
+    return bool(unregistered)
+
+
+def claim_evaluations(pipeline, worker_id: str, ana_id: str,
+                      batch_size: int):
+    """
+    Add the claim of evaluation ids by the worker to the `pipeline`: a
+    re-issued id range if there is one, otherwise `batch_size` new ids.
+    The result of the command is to be parsed via :func:`parse_claim`.
+    """
+    script = pipeline.register_script(_CLAIM_SCRIPT)
+    script(keys=[idfy(REISSUED, ana_id), idfy(N_EVAL, ana_id),
+                 idfy(CLAIMS, ana_id)],
+           args=[worker_id, batch_size], client=pipeline)
+
+
+def parse_claim(claim) -> (int, int):
+    """
+    Returns
+    -------
+
+    max_id, n: int, int
+        The largest claimed id, and the number of claimed ids.
+    """
+    if isinstance(claim, bytes):
+        claim = claim.decode()
+    max_id, n = claim.split(":")
+    return int(max_id), int(n)
+
+
+def report_evaluations(redis: StrictRedis, worker_id: str, ana_id: str,
+                       accepted_samples: list) -> bool:
+    """
+    Push the encoded accepted samples of the claimed batch to the queue,
+    and release the claim.
+
+    Returns
+    -------
+
+    reported: bool
+        False if the worker had already been unregistered by the master,
+        which re-issued the claim, in which case nothing is reported.
+    """
+    workers = idfy(WORKERS, ana_id)
+    reported = []
+
+    def report(pipe):
+        del reported[:]
+        if not pipe.sismember(workers, worker_id):
+            return
+        pipe.multi()
+        if accepted_samples:
+            pipe.incr(idfy(N_ACC, ana_id), len(accepted_samples))
+            # note: samples are appended 1-by-1
+            pipe.rpush(idfy(QUEUE, ana_id), *accepted_samples)
+        pipe.hdel(idfy(CLAIMS, ana_id), worker_id)
+        reported.append(True)
+
+    redis.transaction(report, workers)
+    return bool(reported)
+
+
+def reclaim_dead_workers(redis: StrictRedis, ana_id: str) -> int:
+    """
+    Unregister the workers whose lease expired, i.e. which did not refresh
+    their heartbeat in time, and re-issue their claimed id ranges.
+
+    Returns
+    -------
+
+    n_dead: int
+        The number of reclaimed workers.
+    """
+    workers = idfy(WORKERS, ana_id)
+    worker_ids = [worker_id.decode()
+                  for worker_id in redis.smembers(workers)]
+    if len(worker_ids) == 0:
+        return 0
+
+    pipeline = redis.pipeline()
+    for worker_id in worker_ids:
+        pipeline.exists(_heartbeat_key(worker_id, ana_id))
+    alive = pipeline.execute()
+
+    n_dead = 0
+    for worker_id, is_alive in zip(worker_ids, alive):
+        if is_alive:
+            continue
+        heartbeat = _heartbeat_key(worker_id, ana_id)
+        n_lost = []
+
+        def reclaim(pipe):
+            del n_lost[:]
+            if not pipe.sismember(workers, worker_id) \
+                    or pipe.exists(heartbeat):
+                return
+            claim = pipe.hget(idfy(CLAIMS, ana_id), worker_id)
+            pipe.multi()
+            pipe.srem(workers, worker_id)
+            pipe.hdel(idfy(CLAIMS, ana_id), worker_id)
+            pipe.hdel(idfy(STATS, ana_id), worker_id)
+            pipe.decr(idfy(N_WORKER, ana_id))
+            claimed = 0
+            if claim is not None:
+                _, claimed = parse_claim(claim)
+                pipe.rpush(idfy(REISSUED, ana_id), claim)
+                pipe.incr(idfy(N_LOST, ana_id), claimed)
+            n_lost.append(claimed)
+
+        redis.transaction(reclaim, workers, heartbeat)
+        if n_lost:
+            n_dead += 1
+            logger.warning(
+                f"Lease of worker {worker_id} expired. Reclaimed it, "
+                f"{n_lost[0]} claimed evaluations are re-issued.")
+    return n_dead
+
+
+class Heartbeat(threading.Thread):
+    """
+    Daemon thread refreshing the lease of a worker, while the worker
+    simulates.
+
+    Parameters
+    ----------
+
+    redis: StrictRedis
+        Connection to the redis server.
+
+    worker_id: str
+        Id of the worker.
+
+    ana_id: str
+        Id of the analysis the worker works on.
+
+    lease_time: float
+        Time in seconds after which the lease expires, if it is not
+        refreshed. It is refreshed four times per lease time.
+
+    Attributes
+    ----------
+
+    evicted: bool
+        Whether the master reclaimed the worker, because its lease had
+        expired nonetheless, e.g. as the worker was suspended.
+    """
+
+    def __init__(self, redis: StrictRedis, worker_id: str, ana_id: str,
+                 lease_time: float):
+        super().__init__(daemon=True)
+        self.redis = redis
+        self.worker_id = worker_id
+        self.ana_id = ana_id
+        self.lease_time = lease_time
+        self.evicted = False
+        self._stopped = threading.Event()
+
+    def run(self):
+        key = _heartbeat_key(self.worker_id, self.ana_id)
+        workers = idfy(WORKERS, self.ana_id)
+        while not self._stopped.wait(self.lease_time / 4):
+            pipeline = self.redis.pipeline()
+            pipeline.sismember(workers, self.worker_id)
+            pipeline.set(key, 1, px=int(self.lease_time * 1000), xx=True)
+            registered, _ = pipeline.execute()
+            if not registered:
+                self.evicted = True
+                return
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
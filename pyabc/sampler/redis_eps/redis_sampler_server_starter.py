@@ -12,7 +12,8 @@ class RedisEvalParallelSamplerServerStarter(RedisEvalParallelSampler):
     """
 
     def __init__(self, host="localhost", port=6379, batch_size=1,
-                 workers=2, processes_per_worker=1):
+                 workers=2, processes_per_worker=1,
+                 compact_encoding=True, compress=False):
         # start server
         conn = psutil.net_connections()
         ports = [c.laddr[1] for c in conn]
@@ -23,7 +24,9 @@ class RedisEvalParallelSamplerServerStarter(RedisEvalParallelSampler):
         # give redis-server time to start
         sleep(1)
 
-        super().__init__(host, port, batch_size=batch_size)
+        super().__init__(host, port, batch_size=batch_size,
+                         compact_encoding=compact_encoding,
+                         compress=compress)
 
         # initiate worker processes
         self.__worker = [
@@ -5,7 +5,11 @@ from redis import StrictRedis
 from ...sampler import Sampler
 from .cmd import (SSA, N_EVAL, N_ACC, N_REQ, ALL_ACCEPTED,
                   N_WORKER, QUEUE, MSG, START,
-                  SLEEP_TIME, BATCH_SIZE)
+                  SLEEP_TIME, BATCH_SIZE, COMPACT, COMPRESS, SCHEMAS,
+                  ANALYSES, WORKERS, CLAIMS, N_LOST, LEASE_CHECK_INTERVAL,
+                  STATS, REISSUED, idfy)
+from .encoding import SampleDecoder, load_id
+from .lease import reclaim_dead_workers
 from .redis_logging import logger
 
 
@@ -32,7 +36,16 @@ class RedisEvalParallelSampler(Sampler):
     workers.
 
     Start as many workers as you wish. Workers can be dynamically added
-    during the ABC run.
+    during the ABC run. Workers which die during a population, e.g.
+    because they are killed or their node is preempted, are detected via
+    expired leases, see :mod:`pyabc.sampler.redis_eps.lease`, and not waited
+    for. The ids of their unreported evaluations are re-issued to the other
+    workers.
+
+    Several analyses can share one Redis server and pool of workers, if
+    each sampler is given a different ``analysis_id``. The workers then
+    distribute themselves over the analyses which currently require
+    particles, see ``abc-redis-worker --help``.
 
     Parameters
     ----------
@@ -50,14 +63,41 @@ class RedisEvalParallelSampler(Sampler):
         the REDIS server. Defaults to 1. Increase this value if model
         evaluation times are short or the number of workers is large
         to reduce communication overhead.
+
+    compact_encoding: bool, optional
+        Whether the workers send the accepted samples in a compact format,
+        with parameters and summary statistics packed into float arrays,
+        and the summary statistics of rejected particles aggregated, see
+        :mod:`pyabc.sampler.redis_eps.encoding`. Non-numeric values are
+        transferred as before. Defaults to True.
+
+    compress: bool, optional
+        Whether to additionally zlib compress the compactly encoded samples.
+        This reduces network volume, in particular for large summary
+        statistics, at the cost of some CPU time. Defaults to False.
+
+    analysis_id: str, optional
+        Identifier of the analysis, used to scope all Redis keys.
+        Required to be unique if several analyses use the same Redis server
+        concurrently. Defaults to "", i.e. unscoped keys.
+
+    priority: float, optional
+        Weight of the analysis when the workers are distributed over several
+        concurrent analyses. Defaults to 1.
     """
-    def __init__(self, host="localhost", port=6379, batch_size=1):
+    def __init__(self, host="localhost", port=6379, batch_size=1,
+                 compact_encoding=True, compress=False,
+                 analysis_id="", priority=1.):
         super().__init__()
         logger.debug(
             f"Redis sampler: host={host} port={port}")
         # handles the connection to the redis-server
         self.redis = StrictRedis(host=host, port=port)
         self.batch_size = batch_size
+        self.compact_encoding = compact_encoding
+        self.compress = compress
+        self.analysis_id = analysis_id
+        self.priority = priority
 
     def n_worker(self):
         """
@@ -71,20 +111,34 @@ class RedisEvalParallelSampler(Sampler):
         return self.redis.pubsub_numsub(MSG)[0][-1]
 
     def sample_until_n_accepted(self, n, simulate_one, all_accepted=False):
+        ana_id = self.analysis_id
+
         # open pipeline
         pipeline = self.redis.pipeline()
 
         # write initial values to pipeline
         self.redis.set(
-            SSA, cloudpickle.dumps((simulate_one, self.sample_factory)))
-        pipeline.set(N_EVAL, 0)
-        pipeline.set(N_ACC, 0)
-        pipeline.set(N_REQ, n)
-        pipeline.set(ALL_ACCEPTED, int(all_accepted))  # encode as int
-        pipeline.set(N_WORKER, 0)
-        pipeline.set(BATCH_SIZE, self.batch_size)
+            idfy(SSA, ana_id),
+            cloudpickle.dumps((simulate_one, self.sample_factory)))
+        pipeline.set(idfy(N_EVAL, ana_id), 0)
+        pipeline.set(idfy(N_ACC, ana_id), 0)
+        pipeline.set(idfy(N_REQ, ana_id), n)
+        # encode as int
+        pipeline.set(idfy(ALL_ACCEPTED, ana_id), int(all_accepted))
+        pipeline.set(idfy(N_WORKER, ana_id), 0)
+        pipeline.set(idfy(N_LOST, ana_id), 0)
+        pipeline.delete(idfy(WORKERS, ana_id))
+        pipeline.delete(idfy(CLAIMS, ana_id))
+        pipeline.delete(idfy(REISSUED, ana_id))
+        pipeline.delete(idfy(STATS, ana_id))
+        pipeline.set(idfy(BATCH_SIZE, ana_id), self.batch_size)
+        pipeline.set(idfy(COMPACT, ana_id), int(self.compact_encoding))
+        pipeline.set(idfy(COMPRESS, ana_id), int(self.compress))
         # delete previous results
-        pipeline.delete(QUEUE)
+        pipeline.delete(idfy(QUEUE, ana_id))
+        pipeline.delete(idfy(SCHEMAS, ana_id))
+        # register analysis for the workers
+        pipeline.hset(ANALYSES, ana_id, self.priority)
         # execute all commands
         pipeline.execute()
 
@@ -96,39 +150,58 @@ class RedisEvalParallelSampler(Sampler):
         # wait until n acceptances
         while len(id_results) < n:
             # pop result from queue, block until one is available
-            dump = self.redis.blpop(QUEUE)[1]
-            # extract pickled object
-            particle_with_id = pickle.loads(dump)
-            # append to collected results
-            id_results.append(particle_with_id)
-
-        # wait until all workers done
-        while int(self.redis.get(N_WORKER).decode()) > 0:
+            res = self.redis.blpop(
+                idfy(QUEUE, ana_id), timeout=LEASE_CHECK_INTERVAL)
+            if res is None:
+                # nothing arrived for a while, check that the workers
+                # are still alive
+                reclaim_dead_workers(self.redis, ana_id)
+                continue
+            # extract id, the sample itself is only decoded if needed
+            id_results.append(self._load_id_result(res[1]))
+
+        # no further workers are required
+        self.redis.hdel(ANALYSES, ana_id)
+
+        # wait until all workers done, or are found dead
+        n_sleep_check = max(int(LEASE_CHECK_INTERVAL / SLEEP_TIME), 1)
+        n_sleep = 0
+        while int(self.redis.get(idfy(N_WORKER, ana_id)).decode()) > 0:
             sleep(SLEEP_TIME)
+            n_sleep += 1
+            if n_sleep % n_sleep_check == 0:
+                reclaim_dead_workers(self.redis, ana_id)
 
         # make sure all results are collected
-        while self.redis.llen(QUEUE) > 0:
-            id_results.append(pickle.loads(self.redis.blpop(QUEUE)[1]))
+        while self.redis.llen(idfy(QUEUE, ana_id)) > 0:
+            id_results.append(self._load_id_result(
+                self.redis.blpop(idfy(QUEUE, ana_id))[1]))
 
         # set total number of evaluations
-        self.nr_evaluations_ = int(self.redis.get(N_EVAL).decode())
-
-        # delete keys from pipeline
-        pipeline = self.redis.pipeline()
-        pipeline.delete(SSA)
-        pipeline.delete(N_EVAL)
-        pipeline.delete(N_ACC)
-        pipeline.delete(N_REQ)
-        pipeline.delete(ALL_ACCEPTED)
-        pipeline.delete(BATCH_SIZE)
-        pipeline.execute()
+        self.nr_evaluations_ = int(
+            self.redis.get(idfy(N_EVAL, ana_id)).decode())
 
         # avoid bias toward short running evaluations (for
         # dynamic scheduling)
         id_results.sort(key=lambda x: x[0])
         id_results = id_results[:n]
 
-        results = [res[1] for res in id_results]
+        if self.compact_encoding:
+            # decode only the used samples
+            decoder = SampleDecoder(
+                self.redis, self.sample_factory, self.compress,
+                schemas=idfy(SCHEMAS, ana_id))
+            results = [decoder.decode(res[1])[1] for res in id_results]
+        else:
+            results = [res[1] for res in id_results]
+
+        # delete keys from pipeline
+        pipeline = self.redis.pipeline()
+        for key in (SSA, N_EVAL, N_ACC, N_REQ, ALL_ACCEPTED, BATCH_SIZE,
+                    COMPACT, COMPRESS, SCHEMAS, N_LOST, WORKERS, CLAIMS,
+                    REISSUED, STATS):
+            pipeline.delete(idfy(key, ana_id))
+        pipeline.execute()
 
         # create 1 to-be-returned sample from results
         sample = self._create_empty_sample()
@@ -136,3 +209,12 @@ class RedisEvalParallelSampler(Sampler):
             sample += results[j]
 
         return sample
+
+    def _load_id_result(self, dump):
+        """
+        Get a tuple of particle id and result from a queue entry.
+        For the compact encoding, the result is the still encoded sample.
+        """
+        if self.compact_encoding:
+            return load_id(dump), dump
+        return pickle.loads(dump)
@@ -0,0 +1,100 @@
+"""
+Selection of the analysis a redis worker works on next, if several analyses
+share one redis server.
+"""
+
+import random
+from redis import StrictRedis
+
+from .cmd import (ANALYSES, N_WORKER, N_ACC, N_REQ, N_EVAL, ALL_ACCEPTED,
+                  REISSUED, idfy)
+
+
+FAIR = "fair"
+PRIORITY = "priority"
+SCHEDULES = [FAIR, PRIORITY]
+
+
+def open_analyses(redis: StrictRedis):
+    """
+    Get the analyses which currently require particles.
+
+    Returns
+    -------
+
+    analyses: List[Tuple[str, float, int]]
+        Tuples of analysis id, priority and number of active workers.
+    """
+    priorities = redis.hgetall(ANALYSES)
+    ana_ids = [ana_id.decode() for ana_id in priorities]
+
+    keys = [N_WORKER, N_ACC, N_REQ, N_EVAL, ALL_ACCEPTED]
+    pipeline = redis.pipeline()
+    for ana_id in ana_ids:
+        for key in keys:
+            pipeline.get(idfy(key, ana_id))
+        pipeline.llen(idfy(REISSUED, ana_id))
+    res = pipeline.execute()
+
+    analyses = []
+    for j, ana_id in enumerate(ana_ids):
+        values = res[(len(keys) + 1) * j:(len(keys) + 1) * (j + 1)]
+        n_reissued = values.pop()
+        if any(val is None for val in values):
+            # population finished or not yet set up
+            continue
+        n_worker, n_acc, n_req, n_eval, all_accepted = \
+            (int(val.decode()) for val in values)
+        # same criterion as in the worker's sampling loop
+        if n_reissued == 0 and (
+                n_acc >= n_req or (all_accepted and n_eval >= n_req)):
+            continue
+        priority = float(priorities[ana_id.encode()].decode())
+        analyses.append((ana_id, priority, n_worker))
+    return analyses
+
+
+def choose_analysis(redis: StrictRedis, schedule: str = FAIR):
+    """
+    Choose the analysis to work on next.
+
+    Parameters
+    ----------
+
+    redis: StrictRedis
+        Connection to the redis server.
+
+    schedule: str, optional (default = "fair")
+        * "fair": Weighted fair share. Join the analysis with the lowest
+          number of workers per unit priority, such that the workers are
+          distributed proportionally to the priorities.
+        * "priority": Join the analysis with the highest priority, and
+          among equal priorities the one with the fewest workers.
+
+    Returns
+    -------
+
+    analysis_id: str or None
+        None if no analysis requires particles.
+    """
+    analyses = open_analyses(redis)
+    if len(analyses) == 0:
+        return None
+
+    if schedule == FAIR:
+        def key(analysis):
+            _, priority, n_worker = analysis
+            if priority <= 0:
+                return float("inf")
+            return (n_worker + 1) / priority
+    elif schedule == PRIORITY:
+        def key(analysis):
+            _, priority, n_worker = analysis
+            return -priority, n_worker
+    else:
+        raise ValueError(f"Schedule {schedule} not in {SCHEDULES}.")
+
+    best = min(key(analysis) for analysis in analyses)
+    # break ties randomly to not let all workers join the same analysis
+    return random.choice([analysis[0] for analysis in analyses
+                          if key(analysis) == best])
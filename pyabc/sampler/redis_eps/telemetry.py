@@ -0,0 +1,153 @@
+"""
+Live throughput statistics of the redis workers.
+
+Each worker keeps counters of its work on the current population and
+publishes them regularly to the redis hash STATS, piggybacked on the
+commands it sends anyway. ``abc-redis-manager stats`` aggregates them.
+"""
+
+import json
+import os
+import socket
+from contextlib import contextmanager
+from time import time
+from typing import List
+
+from .cmd import STATS_INTERVAL
+
+
+class WorkerStats:
+    """
+    Counters of a worker for one population.
+
+    Parameters
+    ----------
+
+    worker_id: str
+        Id of the worker.
+
+    batch_size: int
+        The current batch size.
+
+    interval: float, optional (default = STATS_INTERVAL)
+        Minimum time in seconds between two publications.
+    """
+
+    def __init__(self, worker_id: str, batch_size: int,
+                 interval: float = STATS_INTERVAL):
+        self.worker_id = worker_id
+        self.batch_size = batch_size
+        self.interval = interval
+        self.start_time = time()
+        self.n_sim = 0
+        self.n_acc = 0
+        self.sim_time = 0.
+        self.io_time = 0.
+        self._last_published = self.start_time
+
+    @contextmanager
+    def time_sim(self):
+        """
+        Measure time spent simulating.
+        """
+        start = time()
+        yield
+        self.sim_time += time() - start
+
+    @contextmanager
+    def time_io(self):
+        """
+        Measure time spent in communication with the redis server.
+        """
+        start = time()
+        yield
+        self.io_time += time() - start
+
+    def as_dict(self) -> dict:
+        return {
+            "host": socket.gethostname(),
+            "pid": os.getpid(),
+            "batch_size": self.batch_size,
+            "n_sim": self.n_sim,
+            "n_acc": self.n_acc,
+            "sim_time": self.sim_time,
+            "io_time": self.io_time,
+            "total_time": time() - self.start_time,
+        }
+
+    def publish(self, pipeline, key: str, force: bool = False):
+        """
+        Add the publication of the counters to a pipeline, if the last
+        publication is long enough ago, or if forced.
+        """
+        now = time()
+        if not force and now - self._last_published < self.interval:
+            return
+        pipeline.hset(key, self.worker_id, json.dumps(self.as_dict()))
+        self._last_published = now
+
+
+def load_stats(redis, key: str) -> dict:
+    """
+    Read the published counters of all workers.
+
+    Returns
+    -------
+
+    stats: dict
+        Dictionary of worker id and counters.
+    """
+    return {worker_id.decode(): json.loads(stats.decode())
+            for worker_id, stats in redis.hgetall(key).items()}
+
+
+def rates(stats: dict) -> dict:
+    """
+    Compute rates from the counters of one worker.
+
+    Returns
+    -------
+
+    rates: dict
+        Simulations per second, acceptance rate, mean simulation time,
+        and fractions of time spent in redis communication and in
+        simulations. Undefined rates are nan.
+    """
+    def ratio(a, b):
+        return a / b if b > 0 else float("nan")
+
+    return {
+        "sims_per_s": ratio(stats["n_sim"], stats["total_time"]),
+        "acceptance_rate": ratio(stats["n_acc"], stats["n_sim"]),
+        "mean_sim_time": ratio(stats["sim_time"], stats["n_sim"]),
+        "io_fraction": ratio(stats["io_time"], stats["total_time"]),
+        "sim_fraction": ratio(stats["sim_time"], stats["total_time"]),
+    }
+
+
+def aggregate(stats: List[dict]) -> dict:
+    """
+    Aggregate the counters of several workers.
+
+    Returns
+    -------
+
+    aggregate: dict
+        The number of workers and the rates as in :func:`rates`, where the
+        simulations per second are summed over the workers.
+    """
+    total = {key: sum(s[key] for s in stats)
+             for key in ["n_sim", "n_acc", "sim_time", "io_time",
+                         "total_time"]}
+    res = rates(total)
+    res["sims_per_s"] = sum(rates(s)["sims_per_s"] for s in stats
+                            if s["total_time"] > 0)
+    res["n_worker"] = len(stats)
+    return res
+
+
+def format_rates(rates_: dict) -> str:
+    return ("Sims/s={sims_per_s:.3g} Acceptance={acceptance_rate:.3g} "
+            "SimTime={mean_sim_time:.3g}s "
+            "Redis/Sim={io_fraction:.1%}/{sim_fraction:.1%}"
+            .format(**rates_))
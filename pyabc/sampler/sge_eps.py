@@ -0,0 +1,283 @@
+import logging
+import pickle
+import shutil
+import tempfile
+import threading
+import time
+import weakref
+from functools import partial
+
+import cloudpickle
+
+from ..sge import SGE
+from ..sge.db import generation_db_factory
+from .base import Sampler
+
+
+logger = logging.getLogger("SGE-EPS")
+
+# bounds in seconds of the adaptive interval in which idle workers poll
+# for work, and the master for results
+MIN_POLL_INTERVAL = .05
+MAX_POLL_INTERVAL = 1
+
+
+def _renew_lease(tmp_dir, worker_nr, lease_s, finished):
+    """
+    Renew the lease of the claim of the worker until `finished` is set.
+    Runs in a thread of the worker, such that the lease is also renewed
+    during long simulations, and expires if the worker is killed.
+    """
+    db = generation_db_factory(tmp_dir)
+    while not finished.wait(lease_s / 3):
+        db.renew(worker_nr, lease_s)
+
+
+def work_on_generations(tmp_dir, max_runtime_s, lease_s, worker_nr):
+    """
+    Worker loop of the :class:`SGEEvalParallelSampler`, executed as one
+    task of the SGE array job.
+
+    Claims batches of evaluations of the current generation from the
+    generation db in `tmp_dir`, and reports the accepted samples, until the
+    master stops the run, or `max_runtime_s` is exceeded. The claims are
+    leased for `lease_s` seconds and renewed while the worker is alive.
+
+    Returns
+    -------
+
+    n_sim: int
+        The number of simulations performed by this worker.
+    """
+    start_time = time.time()
+    db = generation_db_factory(tmp_dir)
+    n_sim = 0
+    t_loaded = None
+    poll_interval = MIN_POLL_INTERVAL
+    finished = threading.Event()
+    threading.Thread(
+        target=_renew_lease, args=(tmp_dir, worker_nr, lease_s, finished),
+        daemon=True).start()
+
+    try:
+        while time.time() - start_time < max_runtime_s:
+            current = db.current()
+            max_id = None
+            if current is not None:
+                t, batch_size = current
+                max_id = db.claim(t, batch_size, worker_nr, lease_s)
+            if max_id is None:
+                # nothing to do right now
+                if db.stopped():
+                    break
+                time.sleep(poll_interval)
+                poll_interval = min(poll_interval * 1.5, MAX_POLL_INTERVAL)
+                continue
+            poll_interval = MIN_POLL_INTERVAL
+
+            if t != t_loaded:
+                simulate_one, sample_factory = pickle.loads(db.load(t))
+                sample = sample_factory()
+                t_loaded = t
+
+            accepted_samples = []
+            for n_batched in range(batch_size):
+                new_sim = simulate_one()
+                sample.append(new_sim)
+                n_sim += 1
+                if new_sim.accepted:
+                    # the ids were claimed before the simulations started
+                    accepted_samples.append(
+                        (max_id - n_batched, cloudpickle.dumps(sample)))
+                    sample = sample_factory()
+
+            if not db.report(t, worker_nr, batch_size, accepted_samples):
+                # the lease expired and the ids were re-issued
+                logger.warning(f"Worker {worker_nr} reported too late, "
+                               f"its batch of generation {t} is discarded.")
+                sample = sample_factory()
+    finally:
+        finished.set()
+
+    return n_sim
+
+
+def _collect_workers(workers, exited):
+    """
+    Wait for the worker tasks, and collect their return values.
+    """
+    for result in workers:
+        exited.append(result)
+
+
+def _stop_workers(db, thread, tmp_dir, timeout):
+    """
+    Signal the workers to stop, wait for them, and clean up.
+    """
+    db.stop()
+    thread.join(timeout)
+    if thread.is_alive():
+        # some tasks are still queued. keep the stop signal for them.
+        logger.warning(f"Not all SGE worker tasks finished within "
+                       f"{timeout}s. They stop once they start.")
+        return
+    db.clean_up()
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+class SGEEvalParallelSampler(Sampler):
+    """
+    Evaluation parallel sampler on an SGE cluster, with long-lived workers.
+
+    In contrast to the :class:`pyabc.sampler.MappingSampler` with an
+    :class:`pyabc.sge.SGE` mapper, only one array job of `n_workers` tasks
+    is submitted per run, on the first generation, such that the queue
+    waiting time is paid only once. The tasks are executed via the usual
+    :class:`pyabc.sge.SGE` machinery and loop over the generations:
+    They pull batches of evaluations from a generation db, which uses the
+    configured SQLite or REDIS broker, and report the accepted particles
+    back as soon as they are found. As in the
+    :class:`pyabc.sampler.RedisEvalParallelSampler`, the evaluation ids are
+    claimed before the simulations start, and the accepted particles with
+    the smallest ids are used.
+
+    The claims are leased to the workers, which renew the leases while
+    they are alive. If a worker dies, e.g. as it is killed by the queueing
+    system, its claim expires after `lease_s` seconds and is re-issued to
+    the other workers, such that the same ids are evaluated. If the
+    generation is already closed, the claim is dropped from the number of
+    evaluations instead.
+
+    Call :meth:`stop` after the last run to end the worker tasks. This is
+    also done when the sampler is garbage collected, or the interpreter
+    exits.
+
+    Parameters
+    ----------
+
+    sge: pyabc.sge.SGE, optional
+        The configured SGE mapper to submit the worker tasks with.
+        Its ``chunk_size`` should be 1. The workers stop claiming
+        evaluations after 90% of its ``time_h``.
+        By default, an SGE mapper with default settings is used.
+
+    n_workers: int, optional (default = 10)
+        Number of worker tasks.
+
+    batch_size: int, optional (default = 1)
+        Number of model evaluations the workers perform before reporting
+        back. Increase this value if model evaluation times are short.
+
+    lease_s: float, optional (default = 60)
+        Time in seconds after which the claim of a worker which stopped
+        renewing its lease, i.e. which died, is re-issued.
+
+    Attributes
+    ----------
+
+    n_sim_workers_: list
+        The return values of the worker tasks which finished, i.e. their
+        numbers of simulations, or exceptions.
+    """
+
+    # time in seconds to wait for the workers to finish in stop()
+    STOP_TIMEOUT = 30
+
+    def __init__(self, sge: SGE = None, n_workers: int = 10,
+                 batch_size: int = 1, lease_s: float = 60):
+        super().__init__()
+        if sge is None:
+            sge = SGE(name="abc-eps")
+        self.sge = sge
+        self.n_workers = n_workers
+        self.batch_size = batch_size
+        self.lease_s = lease_s
+        self.n_sim_workers_ = []
+        self._db = None
+        self._finalizer = None
+        self._t = 0
+
+    def _start_workers(self):
+        tmp_dir = tempfile.mkdtemp(prefix="", suffix="_SGE_eps",
+                                   dir=self.sge.config["DIRECTORIES"]["TMP"])
+        self._db = generation_db_factory(tmp_dir)
+        self._db.create()
+        max_runtime_s = 0.9 * self.sge.time_h * 3600
+        workers = self.sge.imap_unordered(
+            partial(work_on_generations, tmp_dir, max_runtime_s,
+                    self.lease_s),
+            range(self.n_workers))
+        thread = threading.Thread(
+            target=_collect_workers, args=(workers, self.n_sim_workers_),
+            daemon=True)
+        thread.start()
+        self._finalizer = weakref.finalize(
+            self, _stop_workers, self._db, thread, tmp_dir,
+            self.STOP_TIMEOUT)
+        logger.info(f"Submitted {self.n_workers} SGE worker tasks.")
+
+    def stop(self):
+        """
+        Stop the worker tasks. Afterwards, the sampler cannot be used
+        anymore.
+        """
+        if self._finalizer is not None:
+            self._finalizer()
+
+    def sample_until_n_accepted(self, n, simulate_one, all_accepted=False):
+        if self._db is None:
+            self._start_workers()
+        elif not self._finalizer.alive:
+            raise RuntimeError("The sampler was already stopped.")
+        db = self._db
+        self._t += 1
+        t = self._t
+
+        db.start_generation(
+            t, cloudpickle.dumps((simulate_one, self.sample_factory)),
+            self.batch_size, n, all_accepted)
+
+        id_results = []
+        closed = False
+        poll_interval = MIN_POLL_INTERVAL
+        while True:
+            new_results = db.pop_results(t)
+            id_results.extend(new_results)
+            n_expired = db.expire_claims(t)
+            if n_expired:
+                logger.warning(f"{n_expired} claims of generation {t} "
+                               f"expired, as their workers died.")
+            n_acc, n_eval, n_done = db.progress(t)
+            if not closed and n_acc >= n:
+                # no further evaluations are claimed
+                db.close(t)
+                closed = True
+                continue
+            if closed and n_done >= n_eval:
+                # all claimed evaluations are reported, make sure all
+                # results are collected
+                id_results.extend(db.pop_results(t))
+                break
+            if len(self.n_sim_workers_) == self.n_workers:
+                errors = [res for res in self.n_sim_workers_
+                          if isinstance(res, Exception)]
+                raise RuntimeError(
+                    "All SGE worker tasks exited before the generation "
+                    "was complete.") from (errors[0] if errors else None)
+            if new_results:
+                poll_interval = MIN_POLL_INTERVAL
+            else:
+                time.sleep(poll_interval)
+                poll_interval = min(poll_interval * 1.5, MAX_POLL_INTERVAL)
+
+        self.nr_evaluations_ = n_eval
+
+        # avoid bias toward short running evaluations
+        id_results.sort(key=lambda x: x[0])
+
+        # create 1 to-be-returned sample from results
+        sample = self._create_empty_sample()
+        for _, result in id_results[:n]:
+            sample += pickle.loads(result)
+
+        return sample
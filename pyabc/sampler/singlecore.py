@@ -1,12 +1,32 @@
-from .base import Sampler
+from .base import Sampler, next_batch_size
 
 
 class SingleCoreSampler(Sampler):
     """
     Sample on a single core. No parallelization.
+
+    If the ``simulate_one`` function offers a ``simulate_batch`` function,
+    as for a :class:`pyabc.model.BatchModel`, the particles are simulated
+    in batches, sized by the acceptance rate observed so far. The
+    particles simulated after the n-th acceptance are discarded, such
+    that the sample is the same as in sequential simulation.
+
+    Parameters
+    ----------
+
+    max_batch_size: int, optional (default = 1000)
+        The maximum number of particles simulated in one batch.
     """
 
+    def __init__(self, max_batch_size: int = 1000):
+        super().__init__()
+        self.max_batch_size = max_batch_size
+
     def sample_until_n_accepted(self, n, simulate_one, all_accepted=False):
+        simulate_batch = getattr(simulate_one, "simulate_batch", None)
+        if simulate_batch is not None:
+            return self._sample_batches(n, simulate_batch)
+
         nr_simulations = 0
         sample = self._create_empty_sample()
 
@@ -20,3 +40,23 @@ class SingleCoreSampler(Sampler):
         self.nr_evaluations_ = nr_simulations
 
         return sample
+
+    def _sample_batches(self, n, simulate_batch):
+        nr_simulations = 0
+        nr_accepted = 0
+        sample = self._create_empty_sample()
+
+        while nr_accepted < n:
+            batch_size = next_batch_size(
+                n - nr_accepted, nr_simulations, nr_accepted,
+                self.max_batch_size)
+            for new_sim in simulate_batch(batch_size):
+                sample.append(new_sim)
+                nr_simulations += 1
+                if new_sim.accepted:
+                    nr_accepted += 1
+                    if nr_accepted == n:
+                        break
+        self.nr_evaluations_ = nr_simulations
+
+        return sample
@@ -15,9 +15,9 @@ two purposes:
 from .util import nr_cores_available
 from .execution_contexts import (DefaultContext,
                                  ProfilingContext, NamedPrinter)
-from .sge import SGE
+from .sge import SGE, JobResults
 from .util import sge_available
 
-__all__ = ["SGE", "sge_available", "nr_cores_available",
+__all__ = ["SGE", "JobResults", "sge_available", "nr_cores_available",
            "DefaultContext", "ProfilingContext",
            "NamedPrinter"]
@@ -17,6 +17,10 @@ PRIORITY=-500
 
 [REDIS]
 HOST=127.0.0.1
+
+[SQLITE]
+# journal mode of the job status db, WAL requires a local file system
+JOURNAL_MODE=DELETE
 """
 
 
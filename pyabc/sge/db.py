@@ -1,7 +1,9 @@
 import os
+import pickle
 import sqlite3
 import time
 import redis
+from contextlib import contextmanager
 
 from .config import get_config
 
@@ -10,65 +12,139 @@ def within_time(job_start_time, max_run_time_h):
     return time.time() - job_start_time < max_run_time_h * 1.1 * 3600
 
 
+def timeout_cutoff(max_run_time_h):
+    """
+    Jobs started before this time are timed out, see :func:`within_time`.
+    """
+    return time.time() - max_run_time_h * 1.1 * 3600
+
+
 class SQLiteJobDB:
+    """
+    Status of the tasks of an array job, in an SQLite database in
+    `tmp_dir`, with one row per task, indexed by the task id.
+
+    The journal mode is read from the ``[SQLITE] JOURNAL_MODE`` entry of
+    the configuration file. ``WAL`` lets the tasks write without blocking
+    the readers, but requires all processes to access the database file
+    from the same host, i.e. not via a network file system.
+    """
     SQLITE_DB_TIMEOUT = 2000
 
     def __init__(self, tmp_dir):
+        # the results of a job may be streamed in another thread
         self.connection = sqlite3.connect(os.path.join(tmp_dir, 'status.db'),
-                                          timeout=self.SQLITE_DB_TIMEOUT)
+                                          timeout=self.SQLITE_DB_TIMEOUT,
+                                          check_same_thread=False)
 
     def clean_up(self):
         pass
 
     def create(self, nr_jobs):
-        # create database for job information
+        # create database for job information, the journal mode is
+        # persistent
+        journal_mode = get_config()["SQLITE"]["JOURNAL_MODE"]
+        self.connection.execute(
+            "PRAGMA journal_mode={}".format(journal_mode))
         with self.connection:
             self.connection.execute(
                 "CREATE TABLE IF NOT EXISTS "
-                "status(ID INTEGER, status TEXT, time REAL)")
+                "status(ID INTEGER PRIMARY KEY, start_time REAL, "
+                "finish_time REAL)")
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO status(ID) VALUES(?)",
+                ((ID,) for ID in range(1, nr_jobs + 1)))
 
     def start(self, ID):
         with self.connection:
             self.connection.execute(
-                "INSERT INTO status VALUES(?,?,?)",
-                (ID, 'started', time.time()))
+                "INSERT OR IGNORE INTO status(ID) VALUES(?)", (ID,))
+            self.connection.execute(
+                "UPDATE status SET start_time = ? WHERE ID = ?",
+                (time.time(), ID))
 
     def finish(self, ID):
         with self.connection:
             self.connection.execute(
-                "INSERT INTO status VALUES(?,?,?)",
-                (ID, 'finished', time.time()))
+                "INSERT OR IGNORE INTO status(ID) VALUES(?)", (ID,))
+            self.connection.execute(
+                "UPDATE status SET finish_time = ? WHERE ID = ?",
+                (time.time(), ID))
 
     def wait_for_job(self, ID, max_run_time_h):
         """
         Return true if we should still wait for the job.
         Return false otherwise
         """
-        with self.connection:
-            results = self.connection.execute(
-                "SELECT status, time from status WHERE ID="
-                + str(ID)).fetchall()
-            nr_rows = len(results)
+        row = self.connection.execute(
+            "SELECT start_time, finish_time FROM status WHERE ID = ?",
+            (ID,)).fetchone()
 
-        if nr_rows == 0:  # job not jet started
+        if row is None or row[0] is None:  # job not jet started
             return True
-        if nr_rows == 1:  # job already started
-            job_start_time = results[0][1]
-            # job took to long
-            if not within_time(job_start_time, max_run_time_h):
-                print('Job ' + str(ID) + ' timed out.')
-                return False  # job took to long
-            else:  # still time left
-                return True
-        if nr_rows == 2:  # job finished
+        if row[1] is not None:  # job finished
             return False
-        # something not catched here
-        raise Exception('Something went wrong. nr_rows={}'.format(nr_rows))
+        # job took to long
+        if not within_time(row[0], max_run_time_h):
+            print('Job ' + str(ID) + ' timed out.')
+            return False
+        # still time left
+        return True
+
+    def status_counts(self, max_run_time_h):
+        """
+        Count the tasks by status, in a single query.
+
+        Returns
+        -------
+
+        counts: dict
+            The numbers of "started" (but not finished), "finished", and
+            "timed_out" tasks, where the latter are the started ones which
+            exceeded the run time.
+        """
+        started, finished, timed_out = self.connection.execute(
+            "SELECT COUNT(start_time) - COUNT(finish_time), "
+            "COUNT(finish_time), "
+            "COUNT(CASE WHEN finish_time IS NULL AND start_time < ? "
+            "THEN 1 END) FROM status",
+            (timeout_cutoff(max_run_time_h),)).fetchone()
+        return {"started": started, "finished": finished,
+                "timed_out": timed_out}
+
+    def done_jobs(self, max_run_time_h):
+        """
+        Ids of the tasks which need not be waited for anymore, as they
+        finished or timed out.
+        """
+        return {ID for ID, in self.connection.execute(
+            "SELECT ID FROM status WHERE finish_time IS NOT NULL "
+            "OR start_time < ?", (timeout_cutoff(max_run_time_h),))}
 
 
 class RedisJobDB:
-    FINISHED_STATE = "finished"
-    STARTED_STATE = "started"
+    """
+    Status of the tasks of an array job on the REDIS server.
+
+    The ids of all tasks are kept in the list named after `tmp_dir`, and
+    the ids of the started and finished tasks in sorted sets, scored by
+    start and finish time, such that the status of all tasks is queried
+    in a single round trip. The names of all jobs are kept in a set, see
+    :meth:`job_names`.
+
+    Parameters
+    ----------
+
+    tmp_dir: str
+        The temporary directory of the job, named after the job.
+
+    connection: redis.Redis, optional
+        The connection to the REDIS server, with decoded responses. By
+        default, a connection to the configured host is opened.
+    """
+
+    # the set of the names of all jobs
+    JOBS = "pyabc:sge:jobs"
 
     @staticmethod
     def server_online(cls):
@@ -79,54 +155,528 @@ class RedisJobDB:
         else:
             return True
 
-    def __init__(self, tmp_dir):
+    def __init__(self, tmp_dir, connection: redis.Redis = None):
         config = get_config()
         self.HOST = config["REDIS"]["HOST"]
         self.job_name = os.path.basename(tmp_dir)
-        self.connection = redis.Redis(host=self.HOST, decode_responses=True)
+        if connection is None:
+            connection = redis.Redis(host=self.HOST, decode_responses=True)
+        self.connection = connection
+
+    @classmethod
+    def job_names(cls, connection: redis.Redis):
+        """
+        The names of all jobs on the server of `connection`.
+        """
+        return connection.smembers(cls.JOBS)
 
-    def key(self, ID):
-        return self.job_name + ":" + str(ID)
+    def key(self, name):
+        return self.job_name + ":" + name
 
     def clean_up(self):
-        IDs = map(int, self.connection.lrange(self.job_name, 0, -1))
         pipeline = self.connection.pipeline()
-        for ID in IDs:
-            pipeline.delete(self.key(ID))
-        pipeline.delete(self.job_name)
+        pipeline.delete(self.job_name, self.key("started"),
+                        self.key("finished"))
+        pipeline.srem(self.JOBS, self.job_name)
         pipeline.execute()
 
     def create(self, nr_jobs):
         pipeline = self.connection.pipeline()
-        for ID in range(1, nr_jobs+1):
-            pipeline.rpush(self.job_name, ID)
+        pipeline.rpush(self.job_name, *range(1, nr_jobs + 1))
+        pipeline.sadd(self.JOBS, self.job_name)
         pipeline.execute()
 
     def start(self, ID):
-        self.connection.hmset(self.key(ID), {"status": self.STARTED_STATE,
-                                             "time": time.time()})
+        self.connection.zadd(self.key("started"), {ID: time.time()})
 
     def finish(self, ID):
-        self.connection.hmset(self.key(ID), {"status": self.FINISHED_STATE,
-                                             "time": time.time()})
+        pipeline = self.connection.pipeline()
+        pipeline.zrem(self.key("started"), ID)
+        pipeline.zadd(self.key("finished"), {ID: time.time()})
+        pipeline.execute()
 
     def wait_for_job(self, ID, max_run_time_h):
-        values = self.connection.hgetall(self.key(ID))
-        if len(values) == 0:  # not yet set, job not yet started
+        pipeline = self.connection.pipeline()
+        pipeline.zscore(self.key("started"), ID)
+        pipeline.zscore(self.key("finished"), ID)
+        start_time, finish_time = pipeline.execute()
+
+        if finish_time is not None:
+            return False
+        if start_time is None:  # not yet started
             return True
+        return within_time(start_time, max_run_time_h)
 
-        status = values["status"]
-        time_stamp = float(values["time"])
+    def status_counts(self, max_run_time_h):
+        """
+        As :meth:`SQLiteJobDB.status_counts`.
+        """
+        pipeline = self.connection.pipeline()
+        pipeline.zcard(self.key("started"))
+        pipeline.zcard(self.key("finished"))
+        pipeline.zcount(self.key("started"), "-inf",
+                        "({}".format(timeout_cutoff(max_run_time_h)))
+        started, finished, timed_out = pipeline.execute()
+        return {"started": started, "finished": finished,
+                "timed_out": timed_out}
 
-        if status == self.FINISHED_STATE:
-            return False
+    def done_jobs(self, max_run_time_h):
+        """
+        As :meth:`SQLiteJobDB.done_jobs`.
+        """
+        pipeline = self.connection.pipeline()
+        pipeline.zrange(self.key("finished"), 0, -1)
+        pipeline.zrangebyscore(self.key("started"), "-inf",
+                               "({}".format(timeout_cutoff(max_run_time_h)))
+        finished, timed_out = pipeline.execute()
+        return set(map(int, finished + timed_out))
 
-        if status == self.STARTED_STATE:
-            if within_time(time_stamp, max_run_time_h):
-                return True
-            return False
+    def pending_jobs(self):
+        """
+        Ids of the tasks which neither started nor finished.
+        """
+        pipeline = self.connection.pipeline()
+        pipeline.lrange(self.job_name, 0, -1)
+        pipeline.zrange(self.key("started"), 0, -1)
+        pipeline.zrange(self.key("finished"), 0, -1)
+        submitted, started, finished = pipeline.execute()
+        return set(map(int, submitted)) - set(map(int, started + finished))
 
-        raise Exception('Something went wrong.')
+
+class SQLiteGenerationDB:
+    """
+    The generations of an evaluation parallel ABC run, shared by the
+    master and long-lived workers via an SQLite database in `tmp_dir`.
+
+    Each generation holds the pickled simulate function and the counters
+    of claimed, accepted and reported evaluations. The evaluation ids are
+    claimed atomically before the simulations start.
+
+    Each claim is leased to its worker, which renews the lease while it
+    is alive. Claims with expired leases, e.g. of workers killed by the
+    queueing system, are re-issued to other workers while the generation
+    is open, such that their ids are still evaluated, and are removed from
+    the claimed evaluations afterwards. A report of an expired claim is
+    discarded.
+    """
+    SQLITE_DB_TIMEOUT = 2000
+
+    def __init__(self, tmp_dir):
+        self.connection = sqlite3.connect(
+            os.path.join(tmp_dir, 'generations.db'),
+            timeout=self.SQLITE_DB_TIMEOUT, isolation_level=None,
+            check_same_thread=False)
+
+    @contextmanager
+    def _transaction(self):
+        # lock the database for writing right away, such that concurrent
+        # claims are serialized
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self.connection.execute("ROLLBACK")
+            raise
+        self.connection.execute("COMMIT")
+
+    def clean_up(self):
+        pass
+
+    def create(self):
+        with self._transaction():
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS "
+                "generation(t INTEGER PRIMARY KEY, ssa BLOB, "
+                "batch_size INTEGER, n_req INTEGER, all_accepted INTEGER, "
+                "n_eval INTEGER, n_acc INTEGER, n_done INTEGER, "
+                "closed INTEGER)")
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS "
+                "result(t INTEGER, id INTEGER, sample BLOB)")
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS "
+                "claim(worker INTEGER PRIMARY KEY, t INTEGER, "
+                "max_id INTEGER, batch_size INTEGER, expires REAL)")
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS "
+                "reissue(t INTEGER, max_id INTEGER)")
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS control(stop INTEGER)")
+            self.connection.execute("DELETE FROM control")
+            self.connection.execute("INSERT INTO control VALUES(0)")
+
+    def start_generation(self, t, ssa, batch_size, n_req, all_accepted):
+        with self._transaction():
+            # previous generations are not needed anymore
+            self.connection.execute(
+                "DELETE FROM generation WHERE t < ?", (t,))
+            self.connection.execute("DELETE FROM result WHERE t < ?", (t,))
+            self.connection.execute("DELETE FROM claim WHERE t < ?", (t,))
+            self.connection.execute("DELETE FROM reissue WHERE t < ?", (t,))
+            self.connection.execute(
+                "INSERT INTO generation VALUES(?,?,?,?,?,0,0,0,0)",
+                (t, ssa, batch_size, n_req, int(all_accepted)))
+
+    def current(self):
+        """
+        Number and batch size of the open generation, or None.
+        """
+        return self.connection.execute(
+            "SELECT t, batch_size FROM generation WHERE closed = 0 "
+            "ORDER BY t DESC LIMIT 1").fetchone()
+
+    def load(self, t):
+        return self.connection.execute(
+            "SELECT ssa FROM generation WHERE t = ?", (t,)).fetchone()[0]
+
+    def claim(self, t, batch_size, worker, lease_s):
+        """
+        Claim `batch_size` evaluation ids for `worker`, if generation `t` is
+        still open and requires evaluations, or has re-issued ids.
+        The claim is leased for `lease_s` seconds.
+
+        Returns
+        -------
+
+        max_id: int or None
+            The largest claimed id, or None if nothing was claimed.
+        """
+        with self._transaction():
+            row = self.connection.execute(
+                "SELECT rowid, max_id FROM reissue WHERE t = ? AND EXISTS "
+                "(SELECT 1 FROM generation WHERE t = ? AND closed = 0) "
+                "ORDER BY max_id LIMIT 1", (t, t)).fetchone()
+            if row is not None:
+                rowid, max_id = row
+                self.connection.execute(
+                    "DELETE FROM reissue WHERE rowid = ?", (rowid,))
+            else:
+                row = self.connection.execute(
+                    "SELECT n_eval FROM generation WHERE t = ? "
+                    "AND closed = 0 AND CASE WHEN all_accepted THEN n_eval "
+                    "ELSE n_acc END < n_req", (t,)).fetchone()
+                if row is None:
+                    return None
+                self.connection.execute(
+                    "UPDATE generation SET n_eval = n_eval + ? WHERE t = ?",
+                    (batch_size, t))
+                max_id = row[0] + batch_size
+            self.connection.execute(
+                "INSERT OR REPLACE INTO claim VALUES(?,?,?,?,?)",
+                (worker, t, max_id, batch_size, time.time() + lease_s))
+        return max_id
+
+    def renew(self, worker, lease_s):
+        """
+        Extend the lease of the claim of `worker` to `lease_s` seconds
+        from now, unless it already expired.
+        """
+        now = time.time()
+        self.connection.execute(
+            "UPDATE claim SET expires = ? WHERE worker = ? AND expires >= ?",
+            (now + lease_s, worker, now))
+
+    def report(self, t, worker, n_evaluated, id_samples):
+        """
+        Report the finished batch of `n_evaluated` evaluations claimed by
+        `worker`, with a list of tuples of id and pickled sample for the
+        accepted ones.
+
+        Returns
+        -------
+
+        reported: bool
+            False if the claim expired, in which case the report is
+            discarded.
+        """
+        with self._transaction():
+            deleted = self.connection.execute(
+                "DELETE FROM claim WHERE worker = ? AND t = ?",
+                (worker, t)).rowcount
+            if not deleted:
+                return False
+            self.connection.executemany(
+                "INSERT INTO result VALUES(?,?,?)",
+                [(t, id_, sample) for id_, sample in id_samples])
+            self.connection.execute(
+                "UPDATE generation SET n_acc = n_acc + ?, "
+                "n_done = n_done + ? WHERE t = ?",
+                (len(id_samples), n_evaluated, t))
+        return True
+
+    def expire_claims(self, t):
+        """
+        Remove the claims with expired leases. Those of generation `t` are
+        re-issued if it is open, and otherwise subtracted from its claimed
+        evaluations.
+
+        Returns
+        -------
+
+        n_expired: int
+            The number of expired claims.
+        """
+        now = time.time()
+        # avoid locking the database if nothing expired, the usual case
+        if self.connection.execute(
+                "SELECT 1 FROM claim WHERE expires < ?",
+                (now,)).fetchone() is None:
+            return 0
+        with self._transaction():
+            expired = self.connection.execute(
+                "SELECT t, max_id, batch_size FROM claim WHERE expires < ?",
+                (now,)).fetchall()
+            self.connection.execute(
+                "DELETE FROM claim WHERE expires < ?", (now,))
+            closed, = self.connection.execute(
+                "SELECT closed FROM generation WHERE t = ?",
+                (t,)).fetchone()
+            for t_claim, max_id, batch_size in expired:
+                if t_claim != t:
+                    continue
+                if closed:
+                    self.connection.execute(
+                        "UPDATE generation SET n_eval = n_eval - ? "
+                        "WHERE t = ?", (batch_size, t))
+                else:
+                    self.connection.execute(
+                        "INSERT INTO reissue VALUES(?,?)", (t, max_id))
+        return len(expired)
+
+    def progress(self, t):
+        """
+        Numbers of accepted, claimed and reported evaluations.
+        """
+        return self.connection.execute(
+            "SELECT n_acc, n_eval, n_done FROM generation WHERE t = ?",
+            (t,)).fetchone()
+
+    def close(self, t):
+        """
+        Close generation `t`, such that no further evaluations are claimed.
+        Re-issued ids which were not claimed again are removed from the
+        claimed evaluations.
+        """
+        with self._transaction():
+            self.connection.execute(
+                "UPDATE generation SET closed = 1, n_eval = n_eval - "
+                "batch_size * (SELECT COUNT(*) FROM reissue WHERE t = ?) "
+                "WHERE t = ?", (t, t))
+            self.connection.execute("DELETE FROM reissue WHERE t = ?", (t,))
+
+    def pop_results(self, t):
+        """
+        Remove and return the reported tuples of id and pickled sample.
+        """
+        with self._transaction():
+            results = self.connection.execute(
+                "SELECT rowid, id, sample FROM result WHERE t = ?",
+                (t,)).fetchall()
+            if results:
+                self.connection.execute(
+                    "DELETE FROM result WHERE t = ? AND rowid <= ?",
+                    (t, max(res[0] for res in results)))
+        return [(id_, sample) for _, id_, sample in results]
+
+    def stop(self):
+        with self._transaction():
+            self.connection.execute("UPDATE generation SET closed = 1")
+            self.connection.execute("UPDATE control SET stop = 1")
+
+    def stopped(self):
+        row = self.connection.execute("SELECT stop FROM control").fetchone()
+        # a missing row means that the run was already cleaned up
+        return row is None or bool(row[0])
+
+
+class RedisGenerationDB:
+    """
+    As :class:`SQLiteGenerationDB`, but via the REDIS server, with keys
+    prefixed by the name of `tmp_dir`.
+    """
+
+    def __init__(self, tmp_dir):
+        config = get_config()
+        self.HOST = config["REDIS"]["HOST"]
+        self.job_name = os.path.basename(tmp_dir)
+        self.connection = redis.Redis(host=self.HOST)
+
+    def key(self, *names):
+        return ":".join([self.job_name] + [str(name) for name in names])
+
+    def _generation_keys(self, t):
+        return [self.key(t, name) for name in
+                ("ssa", "batch_size", "n_req", "all_accepted", "n_eval",
+                 "n_acc", "n_done", "results", "reissued")]
+
+    def clean_up(self):
+        pipeline = self.connection.pipeline()
+        for key in self.connection.keys(self.key("*")):
+            pipeline.delete(key)
+        pipeline.execute()
+
+    def create(self):
+        self.connection.set(self.key("stop"), 0)
+
+    def start_generation(self, t, ssa, batch_size, n_req, all_accepted):
+        pipeline = self.connection.pipeline()
+        for key in self._generation_keys(t - 1):
+            pipeline.delete(key)
+        (pipeline.set(self.key(t, "ssa"), ssa)
+         .set(self.key(t, "batch_size"), batch_size)
+         .set(self.key(t, "n_req"), n_req)
+         .set(self.key(t, "all_accepted"), int(all_accepted))
+         .set(self.key(t, "n_eval"), 0)
+         .set(self.key(t, "n_acc"), 0)
+         .set(self.key(t, "n_done"), 0)
+         .set(self.key("current"), t))
+        pipeline.execute()
+
+    def current(self):
+        t = self.connection.get(self.key("current"))
+        if t is None:
+            return None
+        batch_size = self.connection.get(self.key(int(t), "batch_size"))
+        if batch_size is None:
+            return None
+        return int(t), int(batch_size)
+
+    def load(self, t):
+        return self.connection.get(self.key(t, "ssa"))
+
+    def claim(self, t, batch_size, worker, lease_s):
+        current = self.key("current")
+        n_acc, n_eval = self.key(t, "n_acc"), self.key(t, "n_eval")
+        reissued = self.key(t, "reissued")
+        claimed = []
+
+        def claim(pipe):
+            del claimed[:]
+            current_t, n_req, all_accepted, n_acc_, n_eval_ = pipe.mget(
+                current, self.key(t, "n_req"), self.key(t, "all_accepted"),
+                n_acc, n_eval)
+            if current_t is None or int(current_t) != t:
+                return
+            max_ids = pipe.lrange(reissued, 0, 0)
+            if max_ids:
+                pipe.multi()
+                pipe.lpop(reissued)
+                max_id = int(max_ids[0])
+            else:
+                n_done = int(n_eval_) if int(all_accepted) else int(n_acc_)
+                if n_done >= int(n_req):
+                    return
+                pipe.multi()
+                pipe.incrby(n_eval, batch_size)
+                max_id = int(n_eval_) + batch_size
+            pipe.set(self.key("claim", worker),
+                     "{}:{}:{}".format(t, max_id, batch_size))
+            pipe.sadd(self.key("claimants"), worker)
+            pipe.set(self.key("lease", worker), 1, px=int(lease_s * 1000))
+            claimed.append(max_id)
+
+        self.connection.transaction(claim, current, n_acc, n_eval, reissued)
+        return claimed[0] if claimed else None
+
+    def renew(self, worker, lease_s):
+        # an expired lease is not revived
+        self.connection.pexpire(self.key("lease", worker),
+                                int(lease_s * 1000))
+
+    def report(self, t, worker, n_evaluated, id_samples):
+        claim_key = self.key("claim", worker)
+        reported = []
+
+        def report(pipe):
+            del reported[:]
+            claim = pipe.get(claim_key)
+            if claim is None or int(claim.split(b":")[0]) != t:
+                return
+            pipe.multi()
+            pipe.delete(claim_key, self.key("lease", worker))
+            pipe.srem(self.key("claimants"), worker)
+            if id_samples:
+                pipe.rpush(self.key(t, "results"),
+                           *(pickle.dumps(id_sample)
+                             for id_sample in id_samples))
+            pipe.incrby(self.key(t, "n_acc"), len(id_samples))
+            pipe.incrby(self.key(t, "n_done"), n_evaluated)
+            reported.append(True)
+
+        self.connection.transaction(report, claim_key)
+        return bool(reported)
+
+    def expire_claims(self, t):
+        current = self.key("current")
+        n_expired = 0
+        for worker in self.connection.smembers(self.key("claimants")):
+            worker = int(worker)
+            claim_key = self.key("claim", worker)
+            lease_key = self.key("lease", worker)
+            expired = []
+
+            def expire(pipe):
+                del expired[:]
+                claim, lease, current_t = pipe.mget(
+                    claim_key, lease_key, current)
+                if lease is not None:
+                    return
+                pipe.multi()
+                pipe.srem(self.key("claimants"), worker)
+                if claim is None:
+                    return
+                pipe.delete(claim_key)
+                expired.append(worker)
+                t_claim, max_id, batch_size = map(int, claim.split(b":"))
+                if t_claim != t:
+                    return
+                if current_t is not None and int(current_t) == t:
+                    pipe.rpush(self.key(t, "reissued"), max_id)
+                else:
+                    pipe.decrby(self.key(t, "n_eval"), batch_size)
+
+            self.connection.transaction(
+                expire, claim_key, lease_key, current)
+            n_expired += len(expired)
+        return n_expired
+
+    def progress(self, t):
+        return tuple(int(value) for value in self.connection.mget(
+            self.key(t, "n_acc"), self.key(t, "n_eval"),
+            self.key(t, "n_done")))
+
+    def close(self, t):
+        current = self.key("current")
+        reissued = self.key(t, "reissued")
+
+        def close(pipe):
+            current_t = pipe.get(current)
+            n_reissued = pipe.llen(reissued)
+            batch_size = pipe.get(self.key(t, "batch_size"))
+            pipe.multi()
+            if current_t is not None and int(current_t) == t:
+                pipe.delete(current, reissued)
+                if n_reissued:
+                    pipe.decrby(self.key(t, "n_eval"),
+                                n_reissued * int(batch_size))
+
+        self.connection.transaction(close, current, reissued)
+
+    def pop_results(self, t):
+        pipeline = self.connection.pipeline()
+        pipeline.lrange(self.key(t, "results"), 0, -1)
+        pipeline.delete(self.key(t, "results"))
+        return [pickle.loads(dump) for dump in pipeline.execute()[0]]
+
+    def stop(self):
+        pipeline = self.connection.pipeline()
+        pipeline.delete(self.key("current"))
+        pipeline.set(self.key("stop"), 1)
+        pipeline.execute()
+
+    def stopped(self):
+        stop = self.connection.get(self.key("stop"))
+        return stop is None or bool(int(stop))
 
 
 def job_db_factory(tmp_path):
@@ -142,3 +692,18 @@ def job_db_factory(tmp_path):
     if config["BROKER"]["TYPE"] == "SQLITE":
         return SQLiteJobDB(tmp_path)
     raise Exception("Unknown broker: {}".format(config["BROKER"]["TYPE"]))
+
+
+def generation_db_factory(tmp_path):
+    """
+
+    Returns
+    -------
+    SQLite or redis generation db depending on the configured broker
+    """
+    config = get_config()
+    if config["BROKER"]["TYPE"] == "REDIS":
+        return RedisGenerationDB(tmp_path)
+    if config["BROKER"]["TYPE"] == "SQLITE":
+        return SQLiteGenerationDB(tmp_path)
+    raise Exception("Unknown broker: {}".format(config["BROKER"]["TYPE"]))
@@ -45,7 +45,9 @@ for element in array:
     finally:
         results_array.append(single_result)
 
-# store result
-with open(os.path.join(tmp_path, 'results',
-                       job_nr + '.result'), 'wb') as my_file:
+# store result, and move it atomically into place, such that the master
+# never reads incomplete files
+result_file = os.path.join(tmp_path, 'results', job_nr + '.result')
+with open(result_file + '.tmp', 'wb') as my_file:
     cloudpickle.dump(results_array, my_file)
+os.replace(result_file + '.tmp', result_file)
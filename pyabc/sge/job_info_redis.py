@@ -4,33 +4,25 @@ Show info about the redis job queue
 import argparse
 from redis import Redis
 
+from .config import get_config
+from .db import RedisJobDB
+
 
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--show-list", action="store_true")
     args = parser.parse_args()
 
-    r = Redis(decode_responses=True)
-
-    def default_dict(job):
-        job_set = set(map(int, r.lrange(job, 0, -1)))
-        nr_jobs_total = len(job_set)
-        return {"started": 0, "finished": 0, "jobs": job_set,
-                "nr_jobs_total": nr_jobs_total}
+    r = Redis(host=get_config()["REDIS"]["HOST"], decode_responses=True)
 
     results = {}
-    for key in r.keys():
-        if ":" in key:
-            job, nr_str = key.split(":")
-            nr = int(nr_str)
-            status = r.hget(key, "status")
-            if job not in results:
-                results[job] = default_dict(job)
-            results[job][status] += 1
-            results[job]["jobs"].remove(nr)
-        else:
-            if key not in results:
-                results[key] = default_dict(key)
+    for job in RedisJobDB.job_names(r):
+        job_db = RedisJobDB(job, connection=r)
+        counts = job_db.status_counts(max_run_time_h=float("inf"))
+        results[job] = {"started": counts["started"],
+                        "finished": counts["finished"],
+                        "nr_jobs_total": r.llen(job),
+                        "jobs": job_db.pending_jobs()}
 
     FMT = "{:<20}{:<10}{:<10}{:<10}{:<10}"
     print(FMT.format("Job", "started", "finished", "total", "submitted"))
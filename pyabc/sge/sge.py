@@ -1,11 +1,13 @@
 import inspect
 import os
 import pickle
+import re
 import shutil
 import subprocess
 import tempfile
 import time
 import sys
+import weakref
 import cloudpickle
 from .config import get_config
 from .execution_contexts import DefaultContext
@@ -18,6 +20,74 @@ class SGESignatureMismatchException(Exception):
     pass
 
 
+def _clean_up_job(job, keep_output_directory):
+    """
+    Delete the remaining tasks of the job via ``qdel``, and its temporary
+    folder. Only the first call has an effect.
+    """
+    if job is None or job["cleaned_up"]:
+        return
+    job["cleaned_up"] = True
+    tmp_dir, pending = job["tmp_dir"], job["pending"]
+    if pending and job["job_id"] is not None:
+        # the results were not exhausted, delete the remaining tasks
+        try:
+            subprocess.run(['qdel', job["job_id"]],
+                           stdout=subprocess.PIPE,
+                           stderr=subprocess.PIPE)
+        except FileNotFoundError:
+            pass
+
+    # delete the temporary folder if there was no problem
+    # and execution context does not need it
+    if keep_output_directory:
+        pass
+    elif job["had_exception"]:
+        tmp_dir = tmp_dir[:-1] if tmp_dir[-1] == '/' else tmp_dir
+        os.rename(tmp_dir, tmp_dir + '_with_exception')
+    else:
+        shutil.rmtree(tmp_dir, ignore_errors=bool(pending))
+        job["job_db"].clean_up()
+
+
+class JobResults:
+    """
+    Iterator over the results of a submitted array job, as returned by
+    :meth:`SGE.imap` and :meth:`SGE.imap_unordered`.
+
+    Once the results are exhausted, the temporary folder of the job is
+    deleted. Call :meth:`close`, or use the iterator as a context manager,
+    to delete the remaining tasks and the temporary folder before. This is
+    also done when the iterator is garbage collected, at the latest when
+    the interpreter exits.
+    """
+
+    def __init__(self, results, job, keep_output_directory):
+        self._results = results
+        # must not reference the iterator itself
+        self._finalizer = weakref.finalize(
+            self, _clean_up_job, job, keep_output_directory)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._results)
+
+    def close(self):
+        """
+        Delete the remaining tasks via ``qdel``, and the temporary folder.
+        """
+        self._results.close()
+        self._finalizer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
 class SGE:
     """Map a function to be executed on an SGE cluster environment
     Reads a config file (if it exists) in you home directory
@@ -47,6 +117,11 @@ class SGE:
         [REDIS]
         HOST=127.0.0.1
 
+        [SQLITE]
+        # journal mode of the job status db, WAL requires a local
+        # file system
+        JOURNAL_MODE=DELETE
+
 
     Parameters
     ----------
@@ -127,6 +202,11 @@ class SGE:
         The configured sge mapper.
     """
 
+    # bounds in seconds of the adaptive interval in which the results
+    # are polled
+    MIN_POLL_INTERVAL = .05
+    MAX_POLL_INTERVAL = 5
+
     def __init__(self, tmp_directory: str = None, memory: str = '3G',
                  time_h: int = 100,
                  python_executable_path: str = None,
@@ -245,9 +325,75 @@ class SGE:
             List of results of function application.
             This list can also contain ``Exception`` objects.
         """
+        return list(self.imap(function, array))
+
+    def imap(self, function, array):
+        """
+        Like :meth:`map`, but return an iterator which yields the results
+        in order, as soon as they are available.
+
+        The job is submitted immediately. Closing the iterator before it is
+        exhausted deletes the remaining tasks via ``qdel``, and the temporary
+        files, see :class:`JobResults`.
+
+        Parameters
+        ----------
+
+        function: Callable
+
+        array: iterable
+
+        Returns
+        -------
+
+        result_iterator: JobResults
+            Iterator over the results of function application.
+            The results can also be ``Exception`` objects.
+        """
+        job = self._submit(function, array)
+
+        def ordered():
+            buffer = {}
+            next_task_nr = 1
+            for task_nr, results in self._stream(job):
+                buffer[task_nr] = results
+                while next_task_nr in buffer:
+                    yield from buffer.pop(next_task_nr)
+                    next_task_nr += 1
+
+        return JobResults(ordered(), job,
+                          self.execution_context.keep_output_directory)
+
+    def imap_unordered(self, function, array):
+        """
+        Like :meth:`imap`, but yield the results in the order in which the
+        tasks finish.
+        """
+        job = self._submit(function, array)
+
+        def unordered():
+            for _, results in self._stream(job):
+                yield from results
+
+        return JobResults(unordered(), job,
+                          self.execution_context.keep_output_directory)
+
+    def _submit(self, function, array):
+        """
+        Store function and array in a temporary folder and submit the
+        array job.
+
+        Returns
+        -------
+
+        job: dict
+            Information on the submitted job, or None if the array is empty.
+        """
         array = list(array)
 
         self._validate_function_arguments(function, array)
+        if len(array) == 0:
+            return None
         tmp_dir = tempfile.mkdtemp(prefix="", suffix='_SGE_job',
                                    dir=self.config["DIRECTORIES"]["TMP"])
 
@@ -268,14 +414,15 @@ class SGE:
             cloudpickle.dump(self.execution_context, my_file)
 
         # store the array
+        chunk_sizes = {}
         for task_nr, start_index in enumerate(range(0, len(array),
                                                     self.chunk_size)):
+            chunk = list(array[start_index:start_index + self.chunk_size])
+            chunk_sizes[task_nr + 1] = len(chunk)
             with open(os.path.join(jobs_dir,
                                    str(task_nr + 1) + '.job'),
                       'wb') as my_file:
-                cloudpickle.dump(
-                    list(array[start_index:start_index + self.chunk_size]),
-                    my_file)
+                cloudpickle.dump(chunk, my_file)
 
         nr_tasks = task_nr + 1
 
@@ -286,54 +433,90 @@ class SGE:
 
         # crate job jd
         job_db = job_db_factory(tmp_dir)
-        job_db.create(len(array))
+        job_db.create(nr_tasks)
 
         # start the job with qsub
-        subprocess.run(['qsub', os.path.join(tmp_dir, 'job.sh')],
-                       stdout=subprocess.PIPE)
-
-        # wait for the tasks to be finished
-        finished = False
-        while not finished:
-            time.sleep(5)
-            for k in range(nr_tasks)[::-1]:  # check from last to first job
-                # +1 offset for k b/c SGE array jobs start at 1, not at 0
-                if job_db.wait_for_job(k + 1, self.time_h):
-                    break
-            else:
-                finished = True
-        # from here on all tasks are finished
-
-        # sleep to make sure files are entirely written
-        time.sleep(5)
-
-        # make the results array
-        results = []
-        had_exception = False
-        for task_nr in range(nr_tasks):
-            try:
-                my_file = open(
-                    os.path.join(tmp_dir, 'results', str(task_nr + 1)
-                                 + '.result'), 'rb')
-                single_result = pickle.load(my_file)
-                results += single_result
-                my_file.close()
-            except Exception as e:
-                results.append(Exception('Could not load temporary '
-                                         'result file:' + str(e)))
-                had_exception = True
-
-        # delete the temporary folder if there was no problem
-        # and execution context does not need it
-        if self.execution_context.keep_output_directory:
-            pass
-        elif had_exception:
-            tmp_dir = tmp_dir[:-1] if tmp_dir[-1] == '/' else tmp_dir
-            os.rename(tmp_dir, tmp_dir + '_with_exception')
-        else:
-            shutil.rmtree(tmp_dir)
-            job_db.clean_up()
-        return results
+        qsub = subprocess.run(['qsub', os.path.join(tmp_dir, 'job.sh')],
+                              stdout=subprocess.PIPE)
+        job_id = re.search(rb"\d+", qsub.stdout or b"")
+
+        return {"tmp_dir": tmp_dir, "chunk_sizes": chunk_sizes,
+                "job_db": job_db,
+                "job_id": job_id.group().decode() if job_id else None,
+                # the tasks whose results were not yet yielded
+                "pending": set(chunk_sizes),
+                "had_exception": False,
+                "cleaned_up": False}
+
+    def _stream(self, job):
+        """
+        Yield tuples of task number and list of results, as the tasks
+        finish.
+
+        The workers move their result files atomically into place, so a
+        result file is complete as soon as it exists. The polling interval
+        grows from `MIN_POLL_INTERVAL` to `MAX_POLL_INTERVAL` as long as no
+        task finishes.
+        """
+        if job is None:
+            return
+        job_db = job["job_db"]
+        results_dir = os.path.join(job["tmp_dir"], 'results')
+        pending = job["pending"]
+        poll_interval = self.MIN_POLL_INTERVAL
+
+        try:
+            while pending:
+                # the job db is only needed to detect failed tasks, so
+                # only query it if there is no progress otherwise.
+                # it has to be queried before listing the result files,
+                # as a task writes its result before it is finished.
+                # the ids are only fetched if more tasks are done than
+                # have been handled, which holds eventually for any
+                # failed task.
+                not_running = set()
+                if poll_interval > self.MIN_POLL_INTERVAL:
+                    counts = job_db.status_counts(self.time_h)
+                    if counts["finished"] + counts["timed_out"] \
+                            > len(job["chunk_sizes"]) - len(pending):
+                        not_running = job_db.done_jobs(self.time_h) \
+                            & pending
+
+                finished = pending & {
+                    int(name[:-len('.result')])
+                    for name in os.listdir(results_dir)
+                    if name.endswith('.result')}
+                failed = not_running - finished
+
+                for task_nr in sorted(finished):
+                    pending.remove(task_nr)
+                    try:
+                        with open(os.path.join(
+                                results_dir, str(task_nr) + '.result'),
+                                'rb') as my_file:
+                            results = pickle.load(my_file)
+                    except Exception as e:
+                        results = [Exception('Could not load temporary '
+                                             'result file:' + str(e))] \
+                            * job["chunk_sizes"][task_nr]
+                        job["had_exception"] = True
+                    yield task_nr, results
+
+                for task_nr in sorted(failed):
+                    pending.remove(task_nr)
+                    job["had_exception"] = True
+                    yield task_nr, [Exception(
+                        'Task {} finished or timed out without result file.'
+                        .format(task_nr))] * job["chunk_sizes"][task_nr]
+
+                if finished or failed:
+                    poll_interval = self.MIN_POLL_INTERVAL
+                elif pending:
+                    time.sleep(poll_interval)
+                    poll_interval = min(poll_interval * 1.5,
+                                        self.MAX_POLL_INTERVAL)
+        finally:
+            _clean_up_job(job, self.execution_context.keep_output_directory)
 
     def _render_batch_file(self, nr_tasks, tmp_dir):
         # create the file to be submitted to SGE via qsub
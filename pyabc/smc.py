@@ -9,6 +9,8 @@ implement a Strategy pattern.)
 
 import datetime
 import logging
+import os
+import time
 from typing import List, Callable, TypeVar
 import numpy as np
 import scipy as sp
@@ -18,7 +20,7 @@ from typing import Union
 
 from .distance import PNormDistance, to_distance
 from .epsilon import Epsilon, MedianEpsilon
-from .model import Model
+from .model import Model, BatchModel, IncrementalModel
 from .population import Particle
 from .transition import Transition, MultivariateNormalTransition
 from .random_variables import RV, ModelPerturbationKernel, Distribution
@@ -28,7 +30,13 @@ from .pyabc_rand_choice import fast_random_choice
 from .model import SimpleModel
 from .populationstrategy import ConstantPopulationSize
 from .platform_factory import DefaultSampler
-from .acceptor import accept_use_current_time, SimpleFunctionAcceptor
+from .sampler import Sample
+from .acceptor import (accept_use_current_time, SimpleFunctionAcceptor,
+                       Acceptor)
+from .profiling import profiled, dump_stats
+from .timing import (measure, PROPOSAL, SIMULATION, DISTANCE, WEIGHT,
+                     INITIALIZATION, FIT_TRANSITIONS, ADAPT_POPULATION_SIZE,
+                     SAMPLING, STORAGE, UPDATE_DISTANCE, UPDATE_EPSILON)
 
 
 logger = logging.getLogger("ABC")
@@ -40,6 +48,35 @@ def identity(x):
     return x
 
 
+class _TimedAcceptor(Acceptor):
+    """
+    Add the time spent in `acceptor` to the distance time of `timing`.
+    """
+
+    def __init__(self, acceptor: Acceptor, timing: dict):
+        super().__init__()
+        self.acceptor = acceptor
+        self.timing = timing
+
+    def __call__(self, *args, **kwargs):
+        with measure(self.timing, DISTANCE):
+            return self.acceptor(*args, **kwargs)
+
+    def accept_batch(self, *args, **kwargs):
+        with measure(self.timing, DISTANCE):
+            return self.acceptor.accept_batch(*args, **kwargs)
+
+
+def _group_by_model(ms: List[int]) -> dict:
+    """
+    The indices of the entries of `ms` per model.
+    """
+    indices = {}
+    for i, m in enumerate(ms):
+        indices.setdefault(m, []).append(i)
+    return indices
+
+
 class ABCSMC:
     """
     Approximate Bayesian Computation - Sequential Monte Carlo (ABCSMC).
@@ -388,10 +425,11 @@ class ABCSMC:
         def get_initial_weighted_distances():
             population = self._get_initial_population(t)
 
-            def distance_to_ground_truth(x, par):
-                return self.distance_function(x, self.x_0, t, par)
+            def distances_to_ground_truth(xs, pars):
+                return self.distance_function.distances(
+                    xs, self.x_0, t, pars)
 
-            population.update_distances(distance_to_ground_truth)
+            population.update_distances_batch(distances_to_ground_truth)
             weighted_distances = population.get_weighted_distances()
             return weighted_distances
 
@@ -442,33 +480,62 @@ class ABCSMC:
 
         # simulation function, simplifying some parts compared to later
 
-        def simulate_one():
-            # sample model
-            m = int(model_prior.rvs())
-            # sample parameter
-            theta = parameter_priors[m].rvs()
-            # simulate summary statistics
-            model_result = models[m].summary_statistics(
-                t, theta, summary_statistics)
-            # sampled from prior, so all have uniform weight
-            weight = 1.0
-            # remember sum stat as accepted
-            accepted_sum_stats = [model_result.sum_stats]
-            # distance will be computed after initialization of the
-            # distance function
-            accepted_distances = [np.inf]
-            # all are happy and accepted
-            accepted = True
-
+        def create_particle(m, theta, model_result, timing):
             return Particle(
                 m=m,
                 parameter=theta,
-                weight=weight,
-                accepted_sum_stats=accepted_sum_stats,
-                accepted_distances=accepted_distances,
+                # sampled from prior, so all have uniform weight
+                weight=1.0,
+                # remember sum stat as accepted
+                accepted_sum_stats=[model_result.sum_stats],
+                # distance will be computed after initialization of the
+                # distance function
+                accepted_distances=[np.inf],
                 rejected_sum_stats=[],
                 rejected_distances=[],
-                accepted=accepted)
+                # all are happy and accepted
+                accepted=True,
+                timing=timing)
+
+        def simulate_one():
+            timing = {}
+            with measure(timing, PROPOSAL):
+                # sample model
+                m = int(model_prior.rvs())
+                # sample parameter
+                theta = parameter_priors[m].rvs()
+            # simulate summary statistics
+            with measure(timing, SIMULATION):
+                model_result = models[m].summary_statistics(
+                    t, theta, summary_statistics)
+            return create_particle(m, theta, model_result, timing)
+
+        def simulate_batch(n):
+            timing = {}
+            with measure(timing, PROPOSAL):
+                ms = [int(model_prior.rvs()) for _ in range(n)]
+                thetas = [parameter_priors[m].rvs() for m in ms]
+            model_results = [None] * n
+            with measure(timing, SIMULATION):
+                for m, indices in _group_by_model(ms).items():
+                    if isinstance(models[m], BatchModel):
+                        results = models[m].summary_statistics_batch(
+                            t, [thetas[i] for i in indices],
+                            summary_statistics)
+                    else:
+                        results = [models[m].summary_statistics(
+                            t, thetas[i], summary_statistics)
+                            for i in indices]
+                    for i, result in zip(indices, results):
+                        model_results[i] = result
+            return [create_particle(m, theta, model_result,
+                                    {key: duration / n
+                                     for key, duration in timing.items()})
+                    for m, theta, model_result
+                    in zip(ms, thetas, model_results)]
+
+        if any(isinstance(model, BatchModel) for model in models):
+            simulate_one.simulate_batch = simulate_batch
 
         return simulate_one
 
@@ -537,12 +604,14 @@ class ABCSMC:
 
         # simulation function
         def simulate_one():
+            start = time.perf_counter()
             parameter = ABCSMC._generate_valid_proposal(
                 t, m, p,
                 model_prior,
                 parameter_priors,
                 model_perturbation_kernel,
                 transitions)
+            proposal_time = time.perf_counter() - start
             particle = ABCSMC._evaluate_proposal(
                 *parameter,
                 t,
@@ -558,8 +627,41 @@ class ABCSMC:
                 parameter_priors,
                 model_perturbation_kernel,
                 transitions)
+            particle.timing[PROPOSAL] = proposal_time
             return particle
 
+        # batch simulation function, for samplers supporting it
+        def simulate_batch(n):
+            start = time.perf_counter()
+            parameters = [ABCSMC._generate_valid_proposal(
+                t, m, p,
+                model_prior,
+                parameter_priors,
+                model_perturbation_kernel,
+                transitions) for _ in range(n)]
+            proposal_time = time.perf_counter() - start
+            particles = ABCSMC._evaluate_proposals(
+                parameters,
+                t,
+                model_probabilities,
+                nr_samples_per_parameter,
+                models,
+                summary_statistics,
+                distance_function,
+                eps,
+                acceptor,
+                x_0,
+                model_prior,
+                parameter_priors,
+                model_perturbation_kernel,
+                transitions)
+            for particle in particles:
+                particle.timing[PROPOSAL] = proposal_time / n
+            return particles
+
+        if any(isinstance(model, BatchModel) for model in models):
+            simulate_one.simulate_batch = simulate_batch
+
         return simulate_one
 
     @staticmethod
@@ -635,20 +737,142 @@ class ABCSMC:
 
         # from here, theta_ss is valid according to the prior
 
-        accepted_sum_stats = []
-        accepted_distances = []
-        rejected_sum_stats = []
-        rejected_distances = []
+        # the time spent in the acceptor is the distance time, the
+        # remaining time of the model the simulation time
+        timing = {DISTANCE: 0.}
+        timed_acceptor = _TimedAcceptor(acceptor, timing)
 
-        for _ in range(nr_samples_per_parameter):
-            model_result = models[m_ss].accept(
+        start = time.perf_counter()
+        model_results = [
+            models[m_ss].accept(
                 t,
                 theta_ss,
                 summary_statistics,
                 distance_function,
                 eps,
-                acceptor,
+                timed_acceptor,
                 x_0)
+            for _ in range(nr_samples_per_parameter)]
+
+        timing[SIMULATION] = time.perf_counter() - start - timing[DISTANCE]
+
+        return ABCSMC._create_particle(
+            m_ss, theta_ss,
+            model_results,
+            timing,
+            t,
+            model_probabilities,
+            nr_samples_per_parameter,
+            model_prior,
+            parameter_priors,
+            model_perturbation_kernel,
+            transitions)
+
+    @staticmethod
+    def _evaluate_proposals(
+            parameters,
+            t,
+            model_probabilities,
+            nr_samples_per_parameter,
+            models,
+            summary_statistics,
+            distance_function,
+            eps,
+            acceptor,
+            x_0,
+            model_prior,
+            parameter_priors,
+            model_perturbation_kernel,
+            transitions) -> List[Particle]:
+        """
+        As _evaluate_proposal, for a list of (m_ss, theta_ss) proposals.
+        The proposals of each :class:`pyabc.model.BatchModel` are evaluated
+        in one batch, and the durations of a batch are split evenly between
+        its particles.
+        """
+        particles = [None] * len(parameters)
+        for m_ss, indices in _group_by_model(
+                [m_ss for m_ss, _ in parameters]).items():
+            if not isinstance(models[m_ss], BatchModel):
+                for i in indices:
+                    particles[i] = ABCSMC._evaluate_proposal(
+                        *parameters[i],
+                        t,
+                        model_probabilities,
+                        nr_samples_per_parameter,
+                        models,
+                        summary_statistics,
+                        distance_function,
+                        eps,
+                        acceptor,
+                        x_0,
+                        model_prior,
+                        parameter_priors,
+                        model_perturbation_kernel,
+                        transitions)
+                continue
+
+            # each parameter is evaluated nr_samples_per_parameter times
+            thetas = [parameters[i][1] for i in indices
+                      for _ in range(nr_samples_per_parameter)]
+            timing = {DISTANCE: 0.}
+            start = time.perf_counter()
+            model_results = models[m_ss].accept_batch(
+                t,
+                thetas,
+                summary_statistics,
+                distance_function,
+                eps,
+                _TimedAcceptor(acceptor, timing),
+                x_0)
+            timing[SIMULATION] = \
+                time.perf_counter() - start - timing[DISTANCE]
+
+            for j, i in enumerate(indices):
+                particles[i] = ABCSMC._create_particle(
+                    m_ss, parameters[i][1],
+                    model_results[j * nr_samples_per_parameter:
+                                  (j + 1) * nr_samples_per_parameter],
+                    {key: duration / len(indices)
+                     for key, duration in timing.items()},
+                    t,
+                    model_probabilities,
+                    nr_samples_per_parameter,
+                    model_prior,
+                    parameter_priors,
+                    model_perturbation_kernel,
+                    transitions)
+        return particles
+
+    @staticmethod
+    def _create_particle(
+            m_ss, theta_ss,
+            model_results,
+            timing,
+            t,
+            model_probabilities,
+            nr_samples_per_parameter,
+            model_prior,
+            parameter_priors,
+            model_perturbation_kernel,
+            transitions) -> Particle:
+        """
+        Create the particle from the model results for the parameter
+        theta_ss, and compute its weight if accepted.
+        """
+        accepted_sum_stats = []
+        accepted_distances = []
+        rejected_sum_stats = []
+        rejected_distances = []
+        n_truncated = 0
+        n_cache_hits = 0
+        n_cache_misses = 0
+
+        for model_result in model_results:
+            n_truncated += model_result.truncated
+            if model_result.cache_hit is not None:
+                n_cache_hits += model_result.cache_hit
+                n_cache_misses += not model_result.cache_hit
             if model_result.accepted:
                 accepted_sum_stats.append(model_result.sum_stats)
                 accepted_distances.append(model_result.distance)
@@ -659,13 +883,15 @@ class ABCSMC:
         accepted = len(accepted_sum_stats) > 0
 
         if accepted:
-            weight = ABCSMC._calc_proposal_weight(
-                accepted_distances, m_ss, theta_ss, t, model_probabilities,
-                model_prior,
-                parameter_priors,
-                nr_samples_per_parameter,
-                model_perturbation_kernel,
-                transitions)
+            with measure(timing, WEIGHT):
+                weight = ABCSMC._calc_proposal_weight(
+                    accepted_distances, m_ss, theta_ss, t,
+                    model_probabilities,
+                    model_prior,
+                    parameter_priors,
+                    nr_samples_per_parameter,
+                    model_perturbation_kernel,
+                    transitions)
         else:
             weight = 0
 
@@ -677,7 +903,11 @@ class ABCSMC:
             accepted_distances=accepted_distances,
             rejected_sum_stats=rejected_sum_stats,
             rejected_distances=rejected_distances,
-            accepted=accepted)
+            accepted=accepted,
+            timing=timing,
+            n_truncated=n_truncated,
+            n_cache_hits=n_cache_hits,
+            n_cache_misses=n_cache_misses)
 
     @staticmethod
     def _calc_proposal_weight(
@@ -721,6 +951,7 @@ class ABCSMC:
             minimum_epsilon: float = 0.,
             max_nr_populations: int = np.inf,
             min_acceptance_rate: float = 0.,
+            profile: Union[bool, str] = False,
             **kwargs) -> History:
         """
         Run the ABCSMC model selection until either of the stopping
@@ -739,6 +970,15 @@ class ABCSMC:
             Minimal allowed acceptance rate. Sampling stops if a population
             has a lower rate.
 
+        profile: bool or str, optional (default = False)
+            Whether to profile the model evaluations, on whichever workers
+            they are executed, see :mod:`pyabc.profiling`. The statistics
+            are merged per generation and written to
+            ``<directory>/t_<t>.pstats``. If a string is passed, it is used
+            as directory. Otherwise, the directory is
+            ``<db file without extension>_profiles/<history id>``, next to
+            the SQLite database file.
+
 
         Population after population is sampled and particles which are close
         enough to the observed data are accepted and added to the next
@@ -772,8 +1012,15 @@ class ABCSMC:
         self.max_nr_populations = max_nr_populations
         self.min_acceptance_rate = min_acceptance_rate
 
+        if profile is True:
+            profile = self._profile_directory()
+
+        # wall times of the phases on the master
+        timing = {}
+
         # sample from prior to calibrate distance, epsilon, and acceptor
-        self._initialize_dist_eps_acc(self.history.max_t + 1)
+        with measure(timing, INITIALIZATION):
+            self._initialize_dist_eps_acc(self.history.max_t + 1)
 
         t0 = self.history.max_t + 1
         self.history.start_time = datetime.datetime.now()
@@ -782,6 +1029,7 @@ class ABCSMC:
 
         # configure sampler by whoever wants to
         self.distance_function.configure_sampler(self.sampler)
+        self._configure_truncation()
 
         # run loop over time points
         t_max = t0 + max_nr_populations
@@ -792,17 +1040,26 @@ class ABCSMC:
             logger.info('t:' + str(t) + ' eps:' + str(current_eps))
 
             # do some adaptations
-            self._fit_transitions(t)
-            self._adapt_population_size(t)
+            with measure(timing, FIT_TRANSITIONS):
+                self._fit_transitions(t)
+            with measure(timing, ADAPT_POPULATION_SIZE):
+                self._adapt_population_size(t)
 
             # create simulate function
             simulate_one = self._create_simulate_function(t)
+            if profile:
+                simulate_one = profiled(simulate_one)
 
             logger.debug('now submitting population ' + str(t))
 
             # perform the sampling
-            sample = self.sampler.sample_until_n_accepted(
-                self.population_strategy.nr_particles, simulate_one)
+            with measure(timing, SAMPLING):
+                sample = self.sampler.sample_until_n_accepted(
+                    self.population_strategy.nr_particles, simulate_one)
+
+            if sample.n_truncated:
+                logger.debug(f"{sample.n_truncated} simulations of "
+                             f"population {t} were truncated")
 
             # retrieve accepted population
             population = sample.get_accepted_population()
@@ -811,28 +1068,48 @@ class ABCSMC:
             logger.debug('population ' + str(t) + ' done')
             nr_evaluations = self.sampler.nr_evaluations_
             model_names = [model.name for model in self.models]
-            self.history.append_population(
-                t, current_eps, population, nr_evaluations,
-                model_names)
+            with measure(timing, STORAGE):
+                self.history.append_population(
+                    t, current_eps, population, nr_evaluations,
+                    model_names)
             logger.debug(
                 '\ntotal nr simulations up to t =' + str(t) + ' is '
                 + str(self.history.total_nr_simulations))
+            self._log_cache_hit_rate(t, sample)
 
             # prepare next iteration
 
             # update distance function
-            df_updated = self.distance_function.update(
-                t + 1, sample.all_sum_stats)
+            with measure(timing, UPDATE_DISTANCE):
+                if sample.sum_stats_accumulator is not None:
+                    # the summary statistics were accumulated on the fly
+                    sum_stats = sample.sum_stats_accumulator
+                else:
+                    sum_stats = sample.all_sum_stats
+                df_updated = self.distance_function.update(t + 1, sum_stats)
+
+                # compute distances with the new distance measure
+                if df_updated:
+                    def distances_to_ground_truth(xs, pars):
+                        return self.distance_function.distances(
+                            xs, self.x_0, t + 1, pars)
+
+                    population.update_distances_batch(
+                        distances_to_ground_truth)
 
-            # compute distances with the new distance measure
-            if df_updated:
-                def distance_to_ground_truth(x, par):
-                    return self.distance_function(x, self.x_0, t + 1, par)
+            # update epsilon
+            with measure(timing, UPDATE_EPSILON):
+                self.eps.update(t + 1, population.get_weighted_distances())
 
-                population.update_distances(distance_to_ground_truth)
+            # store the timings of the evaluations, summed over the
+            # workers, and of the master
+            timing.update(sample.timing)
+            self.history.store_timings(t, timing)
+            timing = {}
 
-            # update epsilon
-            self.eps.update(t + 1, population.get_weighted_distances())
+            if profile:
+                file = dump_stats(sample.profile, profile, t)
+                logger.debug(f"Profile of population {t} written to {file}")
 
             # check early termination conditions
             acceptance_rate = \
@@ -851,6 +1128,56 @@ class ABCSMC:
         # return used history object
         return self.history
 
+    def _configure_truncation(self):
+        """
+        Disable the truncation of the simulations of incremental models if
+        the sampler records, or accumulates, the summary statistics of all
+        simulations, e.g. for an adaptive distance. Otherwise, those would
+        only comprise the complete simulations, i.e. a censored sample
+        biased toward the observed data, see
+        :class:`pyabc.model.IncrementalModel`.
+        """
+        sample_factory = self.sampler.sample_factory
+        if not (sample_factory.record_rejected
+                or sample_factory.accumulate_sum_stats):
+            return
+        for model in self.models:
+            if isinstance(model, IncrementalModel) and model.truncate:
+                logger.warning(
+                    f"The summary statistics of all simulations are "
+                    f"required, e.g. by an adaptive distance. Truncation "
+                    f"of the simulations of model {model.name} is "
+                    f"disabled.")
+                model.truncate = False
+
+    @staticmethod
+    def _log_cache_hit_rate(t: int, sample: Sample):
+        """
+        Log the cache hit rate of the memoized models in generation `t`,
+        see :class:`pyabc.model.MemoizedModel`. The hits and misses are
+        counted where the simulations ran, and sent back with the sample,
+        such that this works for all samplers.
+        """
+        n_lookups = sample.n_cache_hits + sample.n_cache_misses
+        if n_lookups > 0:
+            logger.info(f"Model cache in population {t}: "
+                        f"{sample.n_cache_hits} hits, hit rate "
+                        f"{sample.n_cache_hits / n_lookups:.3f}")
+
+    def _profile_directory(self) -> str:
+        """
+        The default directory of the profiles, next to the database file.
+        """
+        db = self.history.db_identifier
+        if not db.startswith("sqlite:///"):
+            raise ValueError(
+                "Profiles are stored next to the database file by default, "
+                "which requires a SQLite database file. Pass a directory "
+                "as profile instead.")
+        return os.path.join(
+            os.path.splitext(self.history.db_file())[0] + "_profiles",
+            str(self.history.id))
+
     def _adapt_population_size(self, t):
         """
         Adapt population size based on the employed population strategy.
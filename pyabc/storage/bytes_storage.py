@@ -1,4 +1,7 @@
-from .numpy_bytes_storage import np_from_bytes, np_to_bytes
+from .numpy_bytes_storage import (
+    np_from_bytes, np_to_bytes, array_from_bytes, array_to_bytes,
+    ARRAY_MAGIC)
+import numpy as np
 from .dataframe_bytes_storage import df_to_bytes, df_from_bytes
 import pandas as pd
 
@@ -20,10 +23,15 @@ def to_bytes(object_):
     object_ = r_to_py(object_)
     if isinstance(object_, pd.DataFrame):
         return df_to_bytes(object_)
+    if isinstance(object_, np.ndarray) and object_.ndim > 0 \
+            and object_.dtype.kind in "biufc":
+        return array_to_bytes(object_)
     return np_to_bytes(object_)
 
 
 def from_bytes(bytes_):
+    if bytes_[:len(ARRAY_MAGIC)] == ARRAY_MAGIC:
+        return array_from_bytes(bytes_)
     if bytes_[:6] == b"\x93NUMPY":
         return np_from_bytes(bytes_)
     return df_from_bytes(bytes_)
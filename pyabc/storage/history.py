@@ -11,7 +11,7 @@ from functools import wraps
 import logging
 
 from .db_model import (ABCSMC, Population, Model, Particle,
-                       Parameter, Sample, SummaryStatistic, Base)
+                       Parameter, Sample, SummaryStatistic, Timing, Base)
 from ..population import Particle as PyParticle, Population as PyPopulation
 from ..parameters import Parameter as PyParameter
 
@@ -658,6 +658,57 @@ class History:
                                     nr_simulations, store, model_probabilities,
                                     model_names)
 
+    @with_session
+    @internal_docstring_warning
+    def store_timings(self, t: int, timing: dict):
+        """
+        Store the durations of the phases of population `t`.
+
+        Parameters
+        ----------
+
+        t: int
+            Population number.
+
+        timing: dict
+            Durations in seconds by phase, see :mod:`pyabc.timing`.
+        """
+        population = (self._session.query(Population)
+                      .join(ABCSMC)
+                      .filter(ABCSMC.id == self.id)
+                      .filter(Population.t == t)
+                      .one())
+
+        for name, value in timing.items():
+            population.timings.append(Timing(name=name, value=float(value)))
+
+        self._session.commit()
+
+    @with_session
+    def get_timings(self) -> pd.DataFrame:
+        """
+        Get the durations of the phases of all populations, as recorded by
+        the :class:`pyabc.ABCSMC` class, see :mod:`pyabc.timing`.
+
+        Returns
+        -------
+
+        timings: pd.DataFrame
+            A DataFrame with the population numbers as index and the
+            phases as columns, holding the durations in seconds. The
+            evaluation phases are summed over all evaluations and workers,
+            the others are wall times on the master.
+        """
+        query = (self._session.query(Population.t, Timing.name, Timing.value)
+                 .join(ABCSMC)
+                 .join(Timing)
+                 .filter(ABCSMC.id == self.id))
+        df = pd.read_sql_query(query.statement, self._engine)
+        timings = df.pivot_table(index="t", columns="name", values="value",
+                                 aggfunc="sum")
+        timings.columns.name = None
+        return timings
+
     @with_session
     def get_model_probabilities(self, t: Union[int, None] = None) \
             -> pd.DataFrame:
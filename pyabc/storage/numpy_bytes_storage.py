@@ -1,4 +1,5 @@
 from io import BytesIO
+import struct
 import numpy as np
 
 
@@ -57,3 +58,54 @@ def np_from_bytes(arr_bytes):
             except (TypeError, ValueError):
                 pass
     return arr
+
+
+# identifies the contiguous format of numeric arrays, with a format version
+ARRAY_MAGIC = b"\x93PYABC\x01"
+
+
+def array_to_bytes(arr):
+    """
+    Serialize a numeric numpy array to bytes, as its contiguous data
+    buffer after a minimal header of dtype and shape.
+    This is considerably faster to write and read than the
+    :func:`np_to_bytes` format, in particular for many small arrays,
+    e.g. time series summary statistics.
+
+    Parameters
+    ----------
+    arr: a numpy array of a numeric dtype
+    """
+    arr = np.ascontiguousarray(arr)
+    if arr.dtype.kind not in "biufc":
+        raise TypeError("Only numeric arrays can be stored contiguously.")
+    dtype = arr.dtype.str.encode("ascii")
+    header = struct.pack(f"<B{len(dtype)}sB{arr.ndim}q",
+                         len(dtype), dtype, arr.ndim, *arr.shape)
+    return ARRAY_MAGIC + header + arr.tobytes()
+
+
+def array_from_bytes(arr_bytes):
+    """
+    Load a numpy array from bytes as written by :func:`array_to_bytes`.
+
+    Parameters
+    ----------
+    arr_bytes: bytes as written by array_to_bytes
+
+    Returns
+    -------
+    arr: the deserialized array, with its original dtype and shape
+    """
+    ix = len(ARRAY_MAGIC)
+    len_dtype = arr_bytes[ix]
+    ix += 1
+    dtype = np.dtype(arr_bytes[ix:ix + len_dtype].decode("ascii"))
+    ix += len_dtype
+    ndim = arr_bytes[ix]
+    ix += 1
+    shape = struct.unpack_from(f"<{ndim}q", arr_bytes, ix)
+    ix += 8 * ndim
+    # copy, as the buffer is read-only
+    return np.frombuffer(arr_bytes, dtype=dtype, offset=ix) \
+        .reshape(shape).copy()
@@ -0,0 +1,56 @@
+"""
+Timing
+======
+
+Lightweight measurement of the time spent in the phases of an ABC-SMC run.
+
+The phases of each evaluation, i.e. proposal, simulation, distance and
+weight computation, are timed wherever the evaluation is executed, and
+summed over all evaluations and workers via the
+:class:`pyabc.sampler.Sample`. The other phases are timed on the master,
+as wall time. The timings are stored per population in the
+:class:`pyabc.storage.History`, see
+:meth:`pyabc.storage.History.get_timings`.
+"""
+
+import time
+from contextlib import contextmanager
+
+
+# phases of an evaluation, summed over all evaluations
+PROPOSAL = "proposal"
+SIMULATION = "simulation"
+DISTANCE = "distance"
+WEIGHT = "weight"
+EVALUATION_PHASES = [PROPOSAL, SIMULATION, DISTANCE, WEIGHT]
+
+# phases on the master, as wall time
+INITIALIZATION = "initialization"
+FIT_TRANSITIONS = "fit_transitions"
+ADAPT_POPULATION_SIZE = "adapt_population_size"
+SAMPLING = "sampling"
+STORAGE = "storage"
+UPDATE_DISTANCE = "update_distance"
+UPDATE_EPSILON = "update_epsilon"
+MASTER_PHASES = [INITIALIZATION, FIT_TRANSITIONS, ADAPT_POPULATION_SIZE,
+                 SAMPLING, STORAGE, UPDATE_DISTANCE, UPDATE_EPSILON]
+
+
+def add_timings(timing: dict, other: dict):
+    """
+    Add the durations of `other` to `timing`, in place.
+    """
+    for name, duration in other.items():
+        timing[name] = timing.get(name, 0.) + duration
+
+
+@contextmanager
+def measure(timing: dict, name: str):
+    """
+    Add the time spent in the context to the duration `name` of `timing`.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timing[name] = timing.get(name, 0.) + time.perf_counter() - start
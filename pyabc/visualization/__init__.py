@@ -27,6 +27,8 @@ from .model_probabilities import (
     plot_model_probabilities)
 from .effective_sample_size import (
     plot_effective_sample_sizes)
+from .timing import (
+    plot_timings)
 
 
 __all__ = [
@@ -44,4 +46,5 @@ __all__ = [
     "plot_confidence_intervals",
     "plot_model_probabilities",
     "plot_effective_sample_sizes",
+    "plot_timings",
 ]
@@ -0,0 +1,68 @@
+import matplotlib.pyplot as plt
+import numpy as np
+from matplotlib.ticker import MaxNLocator
+
+from ..storage import History
+from ..timing import EVALUATION_PHASES, MASTER_PHASES
+
+
+def plot_timings(
+        history: History,
+        title: str = "Timings",
+        size: tuple = None):
+    """
+    Plot the time spent in the phases of each population, see
+    :mod:`pyabc.timing`.
+
+    The left plot shows the wall times on the master, the right one the
+    times of the evaluation phases, summed over all evaluations and workers.
+
+    Parameters
+    ----------
+
+    history: History
+        The history to plot from. The history id must be set correctly.
+    title: str, optional (default = "Timings")
+        Title for the plot.
+    size: tuple of float, optional
+        The size of the plot in inches.
+
+    Returns
+    -------
+
+    arr_ax: Array of the axes of the generated plots.
+    """
+    timings = history.get_timings()
+
+    # create figure
+    fig, arr_ax = plt.subplots(1, 2, sharex=True)
+
+    for ax, phases, ylabel in [
+            (arr_ax[0], MASTER_PHASES, "Wall time [s]"),
+            (arr_ax[1], EVALUATION_PHASES, "Summed time [s]")]:
+        # phases not in the standard lists are shown as well
+        phases = [phase for phase in phases if phase in timings.columns]
+        if ax is arr_ax[0]:
+            phases += [phase for phase in timings.columns
+                       if phase not in EVALUATION_PHASES + MASTER_PHASES]
+        bottom = np.zeros(len(timings))
+        for phase in phases:
+            values = timings[phase].fillna(0).values
+            ax.bar(x=timings.index, height=values, bottom=bottom,
+                   label=phase)
+            bottom += values
+        ax.set_xlabel("Population index")
+        ax.set_ylabel(ylabel)
+        ax.legend()
+        # enforce integer ticks
+        ax.xaxis.set_major_locator(MaxNLocator(integer=True))
+
+    arr_ax[0].set_title("Master")
+    arr_ax[1].set_title("Evaluations")
+    fig.suptitle(title)
+    # set size
+    if size is not None:
+        fig.set_size_inches(size)
+    fig.tight_layout(rect=(0, 0, 1, 0.95))
+
+    return arr_ax
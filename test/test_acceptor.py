@@ -0,0 +1,96 @@
+import pickle
+
+import numpy as np
+
+from pyabc import (ABCSMC, RV, Distribution, PNormDistance,
+                   AdaptivePNormDistance, ListEpsilon,
+                   CompleteHistoryAcceptor, accept_use_complete_history)
+from pyabc.sampler import SingleCoreSampler
+
+
+def test_complete_history_acceptor():
+    """
+    Test that the vectorized acceptor takes the same decisions as checking
+    the history one by one.
+    """
+    np.random.seed(0)
+    x_0 = {'s1': 0., 's2': np.zeros(3), 's3': 1.}
+    eps = ListEpsilon([4, 3, 2.5, 2, 1.8])
+    sum_stats = [{'s1': np.random.randn(), 's2': np.random.randn(3),
+                  's3': np.random.randn()} for _ in range(300)]
+    for p in [1, 2, 3, np.inf]:
+        distance = PNormDistance(p=p, w={
+            t: {'s1': np.random.rand(), 's2': np.random.rand(3),
+                's3': np.random.rand()}
+            for t in range(4)})
+        distance.initialize(0, lambda: [], x_0)
+        acceptor = CompleteHistoryAcceptor()
+        for t in range(5):
+            for x in sum_stats:
+                d, accept = acceptor(t, distance, eps, x, x_0, None)
+                d_expected, accept_expected = accept_use_complete_history(
+                    t, distance, eps, x, x_0, None)
+                assert d == d_expected
+                assert accept == accept_expected
+
+    # summary statistics not fitting the layout are checked one by one
+    x = {'s1': 0.1, 's3': 1.}
+    assert acceptor(4, distance, eps, x, x_0, None) \
+        == accept_use_complete_history(4, distance, eps, x, x_0, None)
+
+    # the cached criteria are not shipped
+    assert acceptor._criteria is not None
+    assert pickle.loads(pickle.dumps(acceptor))._criteria is None
+
+
+def test_complete_history_acceptor_zero_weights():
+    """
+    Test that terms with zero weight are dropped from the history, as in
+    the distance, also for infinite residuals.
+    """
+    x_0 = {'s1': 0., 's2': 0.}
+    x = {'s1': np.inf, 's2': 0.1}
+    eps = ListEpsilon([1, 1, 1])
+    for p in [1, 2, np.inf]:
+        distance = PNormDistance(p=p, w={
+            t: {'s1': 0., 's2': 1.} for t in range(3)})
+        distance.initialize(0, lambda: [], x_0)
+        acceptor = CompleteHistoryAcceptor()
+        d, accept = acceptor(2, distance, eps, x, x_0, None)
+        assert np.isclose(d, 0.1)
+        assert accept
+
+
+def test_complete_history_acceptor_overridden_distance():
+    """
+    Test that the history is checked via the distance itself, if a
+    subclass overrides its evaluation.
+    """
+    class ScaledDistance(PNormDistance):
+        def __call__(self, x, x_0, t, par=None):
+            return 10 * super().__call__(x, x_0, t, par)
+
+    x_0 = {'s1': 0., 's2': 0.}
+    x = {'s1': 0.1, 's2': 0.1}
+    eps = ListEpsilon([1, 3, 3])
+    distance = ScaledDistance(p=1)
+    distance.initialize(0, lambda: [], x_0)
+    acceptor = CompleteHistoryAcceptor()
+    assert acceptor(2, distance, eps, x, x_0, None) \
+        == accept_use_complete_history(2, distance, eps, x, x_0, None) \
+        == (2., False)
+    assert distance.previous_criteria(2, eps) is None
+
+
+def test_complete_history_acceptor_run(db_path):
+    def model(p):
+        return {'s0': p['x'] + np.random.randn(),
+                's1': 10 * np.random.randn()}
+
+    abc = ABCSMC(model, Distribution(x=RV('norm', 0, 1)),
+                 AdaptivePNormDistance(), 20,
+                 sampler=SingleCoreSampler(),
+                 acceptor=CompleteHistoryAcceptor())
+    abc.new(db_path, {'s0': 1, 's1': 0})
+    history = abc.run(max_nr_populations=3)
+    assert history.n_populations == 3
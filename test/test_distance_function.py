@@ -1,10 +1,19 @@
+import json
+import numpy as np
+import pytest
 import scipy as sp
 from pyabc import (PercentileDistance,
+                   ZScoreDistance,
+                   PCADistance,
                    MinMaxDistance,
                    PNormDistance,
-                   AdaptivePNormDistance)
+                   AdaptivePNormDistance,
+                   AdaptivePCADistance)
 
 
+from pyabc.sampler import SingleCoreSampler
+from pyabc.distance.streaming import SumStatsAccumulator, streaming_scale
+from pyabc.distance.layout import SumStatLayout
 from pyabc.distance import (
     median_absolute_deviation,
     mean_absolute_deviation,
@@ -112,3 +121,289 @@ def test_adaptivepnormdistance():
             max_weight_ratio=20)
         dist_f.initialize(0, abc.sample_from_prior, x_0=x_0)
         dist_f(abc.sample_from_prior()[0], abc.sample_from_prior()[1], t=0)
+
+
+def test_adaptivepnormdistance_max_nr_recorded():
+    """
+    Test that the bound on the recorded summary statistics is passed on to
+    the sampler.
+    """
+    sampler = SingleCoreSampler()
+    AdaptivePNormDistance(max_nr_recorded=100).configure_sampler(sampler)
+    sample = sampler.sample_factory()
+    assert sample.record_rejected and sample.max_nr_recorded == 100
+
+    sampler = SingleCoreSampler()
+    AdaptivePNormDistance().configure_sampler(sampler)
+    assert sampler.sample_factory.max_nr_recorded is None
+
+
+def test_streaming_scales():
+    """
+    Test that the streaming scales equal the scales of all data for few
+    samples, and approximate them for many, after merging.
+    """
+    scale_functions = [
+        median_absolute_deviation,
+        mean_absolute_deviation,
+        standard_deviation,
+        bias,
+        root_mean_square_deviation,
+        median_absolute_deviation_to_observation,
+        mean_absolute_deviation_to_observation,
+        combined_median_absolute_deviation,
+        combined_mean_absolute_deviation,
+        standard_deviation_to_observation
+    ]
+    np.random.seed(0)
+    for n, rtol in [(50, 1e-10), (20000, 2e-2)]:
+        data = np.random.standard_cauchy(n)
+        accumulators = [SumStatsAccumulator() for _ in range(3)]
+        for i, x in enumerate(data):
+            accumulators[i % 3].update({'s1': x, 's2': np.ones(2)})
+        accumulator = accumulators[0]
+        for other in accumulators[1:]:
+            accumulator.merge(other)
+        assert accumulator['s1'].n == n
+        # arrays are accumulated per entry
+        assert accumulator['s2'].n == n
+        assert np.allclose(accumulator['s2'].std, 0)
+        for scale_function in scale_functions:
+            assert np.isclose(
+                streaming_scale(scale_function, accumulator['s1'], 0.5),
+                scale_function(data=data, x_0=0.5), rtol=rtol)
+
+
+def test_adaptivepnormdistance_streaming():
+    """
+    Test that the streaming distance configures the sampler to accumulate,
+    and computes the same weights.
+    """
+    sampler = SingleCoreSampler()
+    dist_f = AdaptivePNormDistance(streaming=True)
+    dist_f.configure_sampler(sampler)
+    sample = sampler.sample_factory()
+    assert not sample.record_rejected
+    assert sample.sum_stats_accumulator is not None
+
+    sum_stats = [{'s1': x, 's2': 2 * x ** 2} for x in np.linspace(0, 1, 10)]
+    x_0 = {'s1': 0, 's2': 0}
+    dist_f.initialize(0, lambda: sum_stats, x_0=x_0)
+    for sum_stat in sum_stats:
+        sample.sum_stats_accumulator.update(sum_stat)
+    dist_f.update(1, sample.sum_stats_accumulator)
+    for key in x_0:
+        assert np.isclose(dist_f.w[0][key], dist_f.w[1][key])
+
+    with pytest.raises(ValueError):
+        AdaptivePNormDistance(streaming=True, scale_function=lambda **_: 1)
+
+
+def test_compiled_distances():
+    """
+    Test that the compiled and batched evaluation equals the evaluation
+    entry by entry.
+    """
+    np.random.seed(0)
+    x_0 = {'s1': 0.5, 's2': -1, 's3': 2.}
+    sum_stats = [{key: np.random.randn() for key in x_0} for _ in range(30)]
+    pars = [{'p': 1}] * 30
+
+    def uncompiled(distance, x, t):
+        # evaluate without layout
+        layout, distance._layout = distance._layout, None
+        try:
+            return distance(x, x_0, t)
+        finally:
+            distance._layout = layout
+
+    for p in [1, 2, 3, np.inf]:
+        distance = PNormDistance(p=p, w={0: {'s1': 2, 's2': 0.5}})
+        distance.initialize(0, lambda: sum_stats, x_0)
+        batch = distance.distances(sum_stats, x_0, 0, pars)
+        for x, d in zip(sum_stats, batch):
+            assert np.isclose(distance(x, x_0, 0), uncompiled(distance, x, 0))
+            assert np.isclose(d, uncompiled(distance, x, 0))
+
+    distance = AdaptivePNormDistance()
+    distance.initialize(0, lambda: sum_stats, x_0)
+    distance.update(1, sum_stats[:10])
+    for t in [0, 1]:
+        batch = distance.distances(sum_stats, x_0, t)
+        for x, d in zip(sum_stats, batch):
+            assert np.isclose(d, uncompiled(distance, x, t))
+
+    for distance in [ZScoreDistance(), PCADistance(), MinMaxDistance(),
+                     PercentileDistance(measures_to_use=['s1', 's3'])]:
+        distance.initialize(0, lambda: sum_stats, x_0)
+        batch = distance.distances(sum_stats, x_0, 0)
+        for x, d in zip(sum_stats, batch):
+            assert np.isclose(d, distance(x, x_0, 0))
+
+
+def test_compiled_distances_overridden_call():
+    """
+    Test that the batched evaluation uses the distance of subclasses which
+    override its evaluation.
+    """
+    class ScaledPNormDistance(PNormDistance):
+        def __call__(self, x, x_0, t=None, par=None):
+            return 10 * super().__call__(x, x_0, t, par)
+
+    class ScaledZScoreDistance(ZScoreDistance):
+        def __call__(self, x, x_0, t=None, par=None):
+            return 10 * super().__call__(x, x_0, t, par)
+
+    x_0 = {'s1': 0.5, 's2': -1}
+    sum_stats = [{'s1': 1.5, 's2': 0.}, {'s1': 0.5, 's2': 1.}]
+    for distance in [ScaledPNormDistance(p=1), ScaledZScoreDistance()]:
+        distance.initialize(0, lambda: sum_stats, x_0)
+        batch = distance.distances(sum_stats, x_0, 0)
+        assert np.allclose(batch, [distance(x, x_0, 0) for x in sum_stats])
+    assert np.allclose(batch, [15., 10.])
+
+
+def test_adaptivepnormdistance_array_sum_stats():
+    """
+    Test that array-valued summary statistics get one weight per entry,
+    equal to the weights of the entries as scalar summary statistics,
+    also when streaming.
+    """
+    np.random.seed(0)
+    scales = np.linspace(.1, 5, 20)
+    sum_stats = [{'s1': np.random.randn(), 'ts': np.random.randn(20) * scales}
+                 for _ in range(200)]
+    x_0 = {'s1': 0., 'ts': np.zeros(20)}
+
+    def split(x):
+        split_x = {'s1': x['s1']}
+        split_x.update({f'ts{i}': val for i, val in enumerate(x['ts'])})
+        return split_x
+
+    for max_weight_ratio in [None, 5]:
+        dist_f = AdaptivePNormDistance(max_weight_ratio=max_weight_ratio)
+        dist_f.initialize(0, lambda: sum_stats, x_0)
+        split_dist_f = AdaptivePNormDistance(
+            max_weight_ratio=max_weight_ratio)
+        split_dist_f.initialize(
+            0, lambda: [split(x) for x in sum_stats], split(x_0))
+        assert dist_f.w[0]['ts'].shape == (20,)
+        assert np.allclose(dist_f.w[0]['ts'],
+                           [split_dist_f.w[0][f'ts{i}'] for i in range(20)])
+        for x in sum_stats[:5]:
+            assert np.isclose(dist_f(x, x_0, 0),
+                              split_dist_f(split(x), split(x_0), 0))
+
+    # streaming, for moment based scales
+    accumulator = SumStatsAccumulator()
+    for x in sum_stats:
+        accumulator.update(x)
+    dist_f = AdaptivePNormDistance(streaming=True)
+    dist_f.initialize(0, lambda: sum_stats, x_0)
+    dist_f.update(1, accumulator)
+    assert np.allclose(dist_f.w[0]['ts'], dist_f.w[1]['ts'])
+    dist_f = AdaptivePNormDistance(
+        streaming=True, scale_function=median_absolute_deviation)
+    dist_f.x_0 = x_0
+    with pytest.raises(ValueError):
+        dist_f.update(1, accumulator)
+
+    # per entry weights given explicitly
+    dist_f = PNormDistance(p=1, w={0: {'s1': 1, 'ts': np.arange(20)}})
+    x = {'s1': 1., 'ts': np.ones(20)}
+    assert np.isclose(dist_f(x, x_0, 0), 1 + np.arange(20).sum())
+    dist_f.initialize(0, lambda: [], x_0)
+    assert np.isclose(dist_f(x, x_0, 0), 1 + np.arange(20).sum())
+    assert json.loads(dist_f.to_json())['w']['0']['ts'] == list(range(20))
+
+
+def test_covariance_statistics():
+    """
+    Test that the accumulated covariance equals the sample covariance,
+    after merging accumulators with different orders of the statistics.
+    """
+    np.random.seed(0)
+    data = np.random.randn(250, 4).dot(np.random.randn(4, 4))
+    accumulators = [SumStatsAccumulator(covariance=True) for _ in range(2)]
+    for i, row in enumerate(data):
+        if i < 120:
+            accumulators[0].update({'s1': row[0], 's2': row[1:3],
+                                    's3': row[3], 'df': 'ignored'})
+        else:
+            accumulators[1].update({'s3': row[3], 's2': row[1:3],
+                                    's1': row[0]})
+    accumulators[0].merge(accumulators[1])
+    covariance = accumulators[0].covariance
+    assert covariance.n == 250
+    assert np.allclose(covariance.covariance(), np.cov(data.T, bias=True))
+
+    # in the order of another layout
+    layout = SumStatLayout({'s3': 0., 's1': 0.})
+    assert np.allclose(covariance.covariance(layout),
+                       np.cov(data[:, [3, 0]].T, bias=True))
+    with pytest.raises(ValueError):
+        covariance.covariance(SumStatLayout({'s4': 0.}))
+
+
+def test_adaptivepcadistance():
+    """
+    Test that the adaptive whitening is updated from recorded and
+    accumulated summary statistics alike, and ignores constant statistics.
+    """
+    np.random.seed(0)
+    mixing = np.random.randn(3, 3)
+
+    def sum_stats(n, scale):
+        data = scale * np.random.randn(n, 3).dot(mixing)
+        return [{'s1': row[0], 's2': row[1:], 'const': 1.} for row in data]
+
+    x_0 = {'s1': 0., 's2': np.zeros(2), 'const': 1.}
+    distance = AdaptivePCADistance()
+    distance.initialize(0, lambda: sum_stats(500, 1), x_0)
+    x = sum_stats(1, 1)[0]
+    assert np.isfinite(distance(x, x_0, 0))
+    assert np.isclose(distance(x, x_0, 0),
+                      distance.distances([x], x_0, 0)[0])
+
+    # the whitening adapts to the smaller scale
+    sum_stats_1 = sum_stats(500, .1)
+    d_0 = distance(x, x_0, 0)
+    assert distance.update(1, sum_stats_1)
+    assert distance(x, x_0, 1) > 5 * d_0
+    matrix = distance._whitening_transformation_matrix
+
+    accumulator = SumStatsAccumulator(covariance=True)
+    for sum_stat in sum_stats_1:
+        accumulator.update(sum_stat)
+    streaming_distance = AdaptivePCADistance(streaming=True)
+    streaming_distance.initialize(0, lambda: sum_stats(500, 1), x_0)
+    streaming_distance.update(1, accumulator)
+    assert np.allclose(streaming_distance._whitening_transformation_matrix,
+                       matrix)
+    assert np.isclose(streaming_distance(x, x_0, 1), distance(x, x_0, 1))
+
+    sampler = SingleCoreSampler()
+    streaming_distance.configure_sampler(sampler)
+    assert sampler.sample_factory().sum_stats_accumulator.covariance \
+        is not None
+
+    assert not AdaptivePCADistance(adaptive=False).update(1, sum_stats_1)
+
+
+def test_compiled_pnormdistance_arrays_and_missing():
+    """
+    Test the compiled evaluation with array-valued summary statistics, and
+    the fallback for summary statistics not fitting the layout.
+    """
+    x_0 = {'s1': 1., 's2': np.zeros((2, 2))}
+    distance = PNormDistance(p=2)
+    distance.initialize(0, lambda: [], x_0)
+    x = {'s1': 2., 's2': np.ones((2, 2))}
+    assert np.isclose(distance(x, x_0, 0), np.sqrt(5))
+    assert np.allclose(distance.distances([x, x_0], x_0, 0),
+                       [np.sqrt(5), 0])
+
+    # a missing statistic counts 0
+    distance = PNormDistance(p=1)
+    distance.initialize(0, lambda: [], {'s1': 1., 's2': 2.})
+    assert distance({'s1': 3.}, {'s1': 1., 's2': 2.}, 0) == 2
@@ -1,5 +1,6 @@
 import os
 from tempfile import gettempdir
+import numpy as np
 
 from pyabc.external import R
 import pyabc
@@ -27,3 +28,34 @@ def test_r():
     abc.new(db, r.observation("mySumStatData"))
     history = abc.run(minimum_epsilon=0.9, max_nr_populations=2)
     history.get_weighted_sum_stats_for_model(m=0, t=1)[1][0]["cars"].head()
+
+
+def test_r_batch():
+    """
+    Test that the batched R interface gives the same results, and runs
+    with a batch sampler.
+    """
+    r = R(r_file)
+    model = r.model_batch("myModelBatch", ["meanX", "meanY"])
+    distance = r.distance_batch("myDistanceBatch")
+    distance_per_call = r.distance("myDistance")
+
+    x_0 = {"x": 4., "y": 8.}
+    pars = [pyabc.Parameter(meanX=float(i), meanY=2. * i) for i in range(5)]
+    xs = [result.sum_stats for result in
+          model.summary_statistics_batch(0, pars, lambda x: x)]
+    assert sorted(xs[0].keys()) == ["x", "y"]
+    assert np.allclose(distance.distances(xs, x_0),
+                       [distance_per_call(
+                           {key: float(val) for key, val in x.items()}, x_0)
+                        for x in xs])
+    assert model.sample_batch(np.ones((3, 2)))["x"].shape == (3,)
+
+    prior = pyabc.Distribution(meanX=pyabc.RV("uniform", 0, 10),
+                               meanY=pyabc.RV("uniform", 0, 10))
+    abc = pyabc.ABCSMC(model, prior, distance, 100,
+                       sampler=pyabc.sampler.SingleCoreSampler())
+    db = "sqlite:///" + os.path.join(gettempdir(), "test_external.db")
+    abc.new(db, x_0)
+    history = abc.run(max_nr_populations=2)
+    assert history.n_populations == 2
@@ -0,0 +1,81 @@
+import os
+import sys
+import numpy as np
+import pytest
+
+from pyabc import ABCSMC, RV, Distribution, PNormDistance
+from pyabc.external import ExternalProcessModel
+from pyabc.sampler import SingleCoreSampler, MulticoreEvalParallelSampler
+
+
+SIMULATOR = """
+import os
+import struct
+import sys
+
+stdin, stdout = sys.stdin.buffer, sys.stdout.buffer
+while True:
+    header = stdin.read(4)
+    if len(header) < 4:
+        break
+    length, = struct.unpack("<I", header)
+    a, b = struct.unpack("<2d", stdin.read(length))
+    # the process id identifies the process
+    payload = struct.pack("<3d", a, b, os.getpid())
+    stdout.write(struct.pack("<I", len(payload)) + payload)
+    stdout.flush()
+"""
+
+
+@pytest.fixture
+def simulator(tmp_path):
+    file = os.path.join(str(tmp_path), "simulator.py")
+    with open(file, "w") as f:
+        f.write(SIMULATOR)
+    return [sys.executable, file]
+
+
+def test_external_process_model(simulator):
+    model = ExternalProcessModel(simulator, ["a", "b", "pid"])
+    # the parameters are passed in sorted order
+    sum_stats = model.sample({"b": 2., "a": 1.})
+    assert sum_stats["a"] == 1. and sum_stats["b"] == 2.
+
+    # the process is reused
+    pid = sum_stats["pid"]
+    assert model.sample({"a": 0., "b": 0.})["pid"] == pid
+
+    # the process is restarted after termination
+    model.close()
+    assert model.sample({"a": 0., "b": 0.})["pid"] != pid
+    model.close()
+
+    # unnamed summary statistics
+    model = ExternalProcessModel(simulator)
+    assert np.array_equal(model.sample({"a": 1., "b": 2.})["data"][:2],
+                          [1., 2.])
+    model.close()
+
+
+def test_external_process_model_failure():
+    model = ExternalProcessModel([sys.executable, "-c", "pass"])
+    with pytest.raises(RuntimeError):
+        model.sample({"a": 1.})
+
+
+@pytest.mark.parametrize("sampler", [
+    SingleCoreSampler(),
+    MulticoreEvalParallelSampler(n_procs=2)])
+def test_external_process_model_run(db_path, simulator, sampler):
+    model = ExternalProcessModel(simulator, ["a", "b", "pid"])
+    prior = Distribution(a=RV("uniform", 0, 1), b=RV("uniform", 0, 1))
+    distance = PNormDistance(w={0: {"a": 1, "b": 1, "pid": 0}})
+    abc = ABCSMC(model, prior, distance, 50, sampler=sampler)
+    abc.new(db_path, {"a": .5, "b": .5, "pid": 0})
+    history = abc.run(max_nr_populations=2)
+    assert history.n_populations == 2
+
+    # one external process per worker and generation at most
+    _, sum_stats = history.get_weighted_sum_stats(t=1)
+    assert len({x["pid"] for x in sum_stats}) <= 2
+    model.close()
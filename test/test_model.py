@@ -0,0 +1,294 @@
+import os
+import numpy as np
+import pytest
+
+from pyabc import (ABCSMC, RV, Distribution, PNormDistance,
+                   AdaptivePNormDistance, ConstantEpsilon, IncrementalModel,
+                   BatchModel, MemoizedModel, SimpleFunctionAcceptor,
+                   DiscreteRandomWalkTransition,
+                   accept_use_current_time)
+from pyabc.cache import LRUCache, SQLiteCache, parameter_key
+from pyabc.sampler import (SingleCoreSampler,
+                           MulticoreParticleParallelSampler,
+                           MulticoreEvalParallelSampler)
+
+
+class RandomWalk(IncrementalModel):
+    """
+    A random walk with drift, summarized per block of time steps.
+    """
+
+    def __init__(self):
+        super().__init__("random_walk")
+        self.n_chunks = 0
+
+    def sample_incremental(self, pars):
+        rng = np.random.RandomState(int(1000 * abs(pars["x"])))
+        y = 0.
+        for i in range(10):
+            self.n_chunks += 1
+            steps = pars["x"] + rng.randn(5)
+            yield {f"y{i}": y + np.cumsum(steps)}
+            y += steps.sum()
+
+
+def test_lower_bound():
+    """
+    Test that the lower bound over all chunks equals the distance.
+    """
+    np.random.seed(0)
+    x_0 = {'s1': 0., 's2': np.zeros(3), 's3': 1.}
+    x = {'s1': 1., 's2': np.random.randn(3), 's3': -1.}
+    for p in [1, 2, 3, np.inf]:
+        distance = PNormDistance(p=p, w={0: {'s1': 2, 's2': np.arange(3),
+                                             's3': .5}})
+        lower_bound = 0.
+        for key in x:
+            new_bound = distance.lower_bound({key: x[key]}, x_0, 0,
+                                             lower_bound)
+            assert new_bound >= lower_bound
+            lower_bound = new_bound
+        assert np.isclose(lower_bound, distance(x, x_0, 0))
+
+
+def test_lower_bound_overridden_distance():
+    """
+    Test that no lower bound is used if a subclass overrides the
+    evaluation of the distance.
+    """
+    class ScaledDistance(PNormDistance):
+        def __call__(self, x, x_0, t=None, par=None):
+            return 0.1 * super().__call__(x, x_0, t, par)
+
+    distance = ScaledDistance(w={0: {'s1': 1.}})
+    assert distance.lower_bound({'s1': 2.}, {'s1': 0.}, 0) is None
+
+
+def test_incremental_model():
+    """
+    Test that early rejected evaluations would have been rejected, and
+    are flagged as truncated.
+    """
+    model = RandomWalk()
+    x_0 = model.sample({"x": 0.})
+    distance = PNormDistance(p=2)
+    distance.initialize(0, lambda: [], x_0)
+    distance(x_0, x_0, 0)
+    eps = ConstantEpsilon(20)
+
+    n_truncated = 0
+    for x in np.linspace(-2, 2, 41):
+        pars = {"x": x}
+        result = model.accept(0, pars, None, distance, eps,
+                              accept_use_current_time, x_0)
+        d = distance(model.sample(pars), x_0, 0)
+        assert result.accepted == (d <= 20)
+        if result.truncated:
+            n_truncated += 1
+            assert not result.accepted
+            assert 20 < result.distance <= d
+            assert result.sum_stats == {}
+        else:
+            assert np.isclose(result.distance, d)
+    assert n_truncated > 0
+
+    # fewer chunks were simulated than in complete simulations
+    model.n_chunks = 0
+    for x in np.linspace(-2, 2, 41):
+        model.accept(0, {"x": x}, None, distance, eps,
+                     accept_use_current_time, x_0)
+    assert model.n_chunks < 41 * 10
+
+
+def record_samples(sampler):
+    """
+    Make the sampler record the samples it returns.
+    """
+    samples = []
+    sample_until_n_accepted = sampler.sample_until_n_accepted
+
+    def recorded(*args, **kwargs):
+        sample = sample_until_n_accepted(*args, **kwargs)
+        samples.append(sample)
+        return sample
+
+    sampler.sample_until_n_accepted = recorded
+    return samples
+
+
+def test_incremental_model_run(db_path):
+    model = RandomWalk()
+    sampler = SingleCoreSampler()
+    abc = ABCSMC(model, Distribution(x=RV("uniform", -2, 4)),
+                 PNormDistance(p=2), 20, sampler=sampler)
+    abc.new(db_path, model.sample({"x": .5}))
+    samples = record_samples(sampler)
+    history = abc.run(max_nr_populations=3)
+    assert history.n_populations == 3
+    assert model.truncate
+    assert sum(sample.n_truncated for sample in samples) > 0
+
+
+def test_incremental_model_run_adaptive(db_path):
+    """
+    Test that truncation is disabled for adaptive distances, which need
+    the summary statistics of all simulations.
+    """
+    model = RandomWalk()
+    sampler = SingleCoreSampler()
+    abc = ABCSMC(model, Distribution(x=RV("uniform", -2, 4)),
+                 AdaptivePNormDistance(), 20, sampler=sampler)
+    abc.new(db_path, model.sample({"x": .5}))
+    samples = record_samples(sampler)
+    history = abc.run(max_nr_populations=3)
+    assert history.n_populations == 3
+    assert not model.truncate
+    for sample in samples:
+        assert sample.n_truncated == 0
+        # the recorded summary statistics are complete
+        assert all(len(sum_stats) == 10
+                   for sum_stats in sample.all_sum_stats)
+
+
+class GaussianBatch(BatchModel):
+    """
+    Gaussian noise around the parameters, vectorized.
+    """
+
+    def __init__(self):
+        super().__init__("gaussian")
+        self.n_calls = 0
+
+    def sample_batch(self, pars):
+        self.n_calls += 1
+        # the columns are in the order of the sorted names, sigma and x
+        sigma, x = pars[:, 0], pars[:, 1]
+        return {"y": x + sigma * np.random.randn(len(pars)),
+                "z": np.tile(pars, (1, 2))}
+
+
+def test_batch_model():
+    """
+    Test that batch evaluations equal single evaluations.
+    """
+    model = GaussianBatch()
+    pars = [{"x": x, "sigma": 0.} for x in np.linspace(-1, 1, 5)]
+    x_0 = model.sample({"x": 0., "sigma": 0.})
+    assert x_0["y"] == 0.
+    assert np.array_equal(x_0["z"], np.zeros(4))
+
+    distance = PNormDistance(p=2)
+    distance.initialize(0, lambda: [], x_0)
+    results = model.accept_batch(
+        0, pars, lambda x: x, distance, ConstantEpsilon(1.),
+        SimpleFunctionAcceptor(), x_0)
+    assert model.n_calls == 2
+    for par, result in zip(pars, results):
+        sum_stats = model.sample(par)
+        assert result.sum_stats["y"] == par["x"]
+        assert np.isclose(result.distance, distance(sum_stats, x_0, 0))
+        assert result.accepted == (result.distance <= 1.)
+
+
+@pytest.mark.parametrize("sampler", [
+    SingleCoreSampler(max_batch_size=50),
+    MulticoreParticleParallelSampler(n_procs=2),
+    MulticoreEvalParallelSampler(n_procs=2)])
+def test_batch_model_run(db_path, sampler):
+    model = GaussianBatch()
+    prior = Distribution(x=RV("uniform", -1, 2),
+                         sigma=RV("uniform", 0.1, 0.5))
+    abc = ABCSMC(model, prior, PNormDistance(), 100, sampler=sampler)
+    abc.new(db_path, model.sample({"x": 0., "sigma": 0.}))
+    history = abc.run(max_nr_populations=3)
+    assert history.n_populations == 3
+    df, w = history.get_distribution(0, 2)
+    assert len(df) == 100
+    assert np.isclose(w.sum(), 1)
+    if isinstance(sampler, SingleCoreSampler):
+        # batches were simulated
+        assert model.n_calls < history.total_nr_simulations / 2
+
+
+def test_parameter_key():
+    assert parameter_key("m", {"a": 1, "b": 2.}) \
+        == parameter_key("m", {"b": np.float64(2), "a": np.int64(1)})
+    assert parameter_key("m", {"a": 1}) != parameter_key("m", {"a": 2})
+    assert parameter_key("m", {"a": 1}) != parameter_key("n", {"a": 1})
+
+
+def test_lru_cache():
+    cache = LRUCache(max_size=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    # b is least recently used
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert len(cache) == 2
+    assert (cache.hits, cache.misses) == (3, 1)
+    assert cache.hit_rate == .75
+
+
+def test_sqlite_cache(tmp_path):
+    file = os.path.join(str(tmp_path), "cache.db")
+    cache = SQLiteCache(file, max_size=2)
+    cache.put("a", {"y": np.arange(3)})
+    cache.put("b", {"y": 1.})
+    assert np.array_equal(cache.get("a")["y"], np.arange(3))
+    cache.put("c", {"y": 2.})
+    assert len(cache) == 2
+
+    # another process' view
+    other = SQLiteCache(file)
+    assert other.get("b") is None
+    assert other.get("c") == {"y": 2.}
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+def test_memoized_model(db_path):
+    n_calls = []
+
+    def model(pars):
+        n_calls.append(1)
+        return {"y": pars["x"] ** 2}
+
+    memoized = MemoizedModel(model)
+    prior = Distribution(x=RV("randint", -3, 4))
+    abc = ABCSMC(memoized, prior, PNormDistance(), 50,
+                 transitions=DiscreteRandomWalkTransition(),
+                 sampler=SingleCoreSampler())
+    abc.new(db_path, {"y": 1})
+    history = abc.run(max_nr_populations=3)
+
+    # only 7 distinct parameters
+    assert len(n_calls) <= 7
+    assert memoized.cache.hits + len(n_calls) \
+        >= history.total_nr_simulations
+    assert memoized.cache.hit_rate > .5
+
+
+def test_memoized_model_cache_hits_in_workers(db_path):
+    """
+    Test that the cache hits in worker processes are sent back with the
+    samples.
+    """
+    def model(pars):
+        return {"y": pars["x"] ** 2}
+
+    memoized = MemoizedModel(model)
+    sampler = MulticoreEvalParallelSampler(n_procs=2)
+    abc = ABCSMC(memoized, Distribution(x=RV("randint", -3, 4)),
+                 PNormDistance(), 50,
+                 transitions=DiscreteRandomWalkTransition(),
+                 sampler=sampler)
+    abc.new(db_path, {"y": 1})
+    samples = record_samples(sampler)
+    abc.run(max_nr_populations=3)
+
+    # the cache of the main process was not used
+    assert memoized.cache.hits + memoized.cache.misses == 0
+    assert sum(sample.n_cache_hits for sample in samples) > 0
+    assert all(sample.n_cache_misses > 0 for sample in samples)
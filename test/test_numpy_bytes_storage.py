@@ -1,6 +1,7 @@
 import pytest
 import numpy as np
 from pyabc.storage.numpy_bytes_storage import np_from_bytes, np_to_bytes
+from pyabc.storage.bytes_storage import from_bytes, to_bytes
 
 
 @pytest.fixture
@@ -12,3 +13,18 @@ def rand_arr():
 def test_storage(rand_arr):
     arr = np_from_bytes(np_to_bytes(rand_arr))
     assert (arr == rand_arr).all()
+
+
+def test_contiguous_storage():
+    for arr in [np.random.rand(3, 8), np.arange(5), np.ones(3, dtype=bool),
+                np.random.rand(1), np.asfortranarray(np.random.rand(2, 3)),
+                np.empty((2, 0))]:
+        restored = from_bytes(to_bytes(arr))
+        assert restored.dtype == arr.dtype
+        assert restored.shape == arr.shape
+        assert (restored == arr).all()
+        assert restored.flags.writeable
+
+    # the previous format can still be read
+    arr = np.random.rand(3, 8)
+    assert (from_bytes(np_to_bytes(arr)) == arr).all()
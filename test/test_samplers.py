@@ -1,22 +1,43 @@
 import multiprocessing
+import os
+import pstats
+import time
 import pytest
 import numpy as np
+import pandas as pd
 import scipy as sp
 import scipy.stats as st
 from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from multiprocessing.pool import ThreadPool
+from distributed import Client
 from pyabc import (ABCSMC, RV, Distribution,
                    MedianEpsilon,
                    PercentileDistance, SimpleModel,
                    ConstantPopulationSize,
-                   History)
+                   History, AdaptivePNormDistance,
+                   AdaptivePCADistance)
 from pyabc.sampler import (SingleCoreSampler,
                            MappingSampler,
                            MulticoreParticleParallelSampler,
                            DaskDistributedSampler,
                            ConcurrentFutureSampler,
                            MulticoreEvalParallelSampler,
-                           RedisEvalParallelSamplerServerStarter)
+                           RedisEvalParallelSampler,
+                           RedisEvalParallelSamplerServerStarter,
+                           AdaptiveBatchSize,
+                           Sample)
+from pyabc.sampler.redis_eps.cli import work, _manage
+from pyabc.sampler.redis_eps.telemetry import load_stats, aggregate
+from pyabc.sampler.redis_eps.cmd import (N_EVAL, N_LOST, CLAIMS, QUEUE,
+                                         idfy)
+from pyabc.sampler.redis_eps.lease import (
+    register_worker, claim_evaluations, parse_claim, report_evaluations,
+    reclaim_dead_workers, _heartbeat_key)
+from pyabc.sampler.redis_eps.encoding import SampleEncoder, SampleDecoder
+from pyabc.sampler.base import SampleFactory
 from pyabc.population import Particle
+from pyabc.timing import EVALUATION_PHASES, SAMPLING, STORAGE
+from pyabc.parameters import Parameter
 import logging
 
 
@@ -45,6 +66,15 @@ class GenericFutureWithProcessPoolBatch(ConcurrentFutureSampler):
                          batch_size=batch_size)
 
 
+class GenericFutureWithProcessPoolAdaptiveBatch(ConcurrentFutureSampler):
+    def __init__(self, map_=None):
+        cfuture_executor = ProcessPoolExecutor(max_workers=8)
+        client_max_jobs = 8
+        batch_size = AdaptiveBatchSize(target_job_time=0.1)
+        super().__init__(cfuture_executor, client_max_jobs,
+                         batch_size=batch_size)
+
+
 class GenericFutureWithThreadPool(ConcurrentFutureSampler):
     def __init__(self, map_=None):
         cfuture_executor = ThreadPoolExecutor(max_workers=8)
@@ -57,6 +87,24 @@ class MultiProcessingMappingSampler(MappingSampler):
         super().__init__(multi_proc_map)
 
 
+class ExecutorMappingSamplerOverprovisioned(MappingSampler):
+    def __init__(self, map_=None):
+        self.executor = ThreadPoolExecutor(max_workers=4)
+        super().__init__(self.executor.map, overprovision=1.5, batch_size=5)
+
+    def cleanup(self):
+        self.executor.shutdown()
+
+
+class ImapUnorderedMappingSamplerOverprovisioned(MappingSampler):
+    def __init__(self, map_=None):
+        self.pool = multiprocessing.Pool(4)
+        super().__init__(self.pool.imap_unordered, overprovision=1.2)
+
+    def cleanup(self):
+        self.pool.terminate()
+
+
 class DaskDistributedSamplerBatch(DaskDistributedSampler):
     def __init__(self, map_=None):
         batch_size = 20
@@ -73,17 +121,32 @@ def RedisEvalParallelSamplerServerStarterWrapper():
     return RedisEvalParallelSamplerServerStarter(batch_size=5)
 
 
+def RedisEvalParallelSamplerServerStarterPickleWrapper():
+    return RedisEvalParallelSamplerServerStarter(
+        batch_size=5, compact_encoding=False)
+
+
+def RedisEvalParallelSamplerServerStarterCompressWrapper():
+    return RedisEvalParallelSamplerServerStarter(
+        batch_size=5, compress=True)
+
+
 @pytest.fixture(params=[SingleCoreSampler,
                         RedisEvalParallelSamplerServerStarterWrapper,
+                        RedisEvalParallelSamplerServerStarterPickleWrapper,
+                        RedisEvalParallelSamplerServerStarterCompressWrapper,
                         MulticoreEvalParallelSampler,
                         MultiProcessingMappingSampler,
                         MulticoreParticleParallelSampler,
                         MappingSampler,
+                        ExecutorMappingSamplerOverprovisioned,
+                        ImapUnorderedMappingSamplerOverprovisioned,
                         DaskDistributedSampler,
                         DaskDistributedSamplerBatch,
                         GenericFutureWithThreadPool,
                         GenericFutureWithProcessPool,
-                        GenericFutureWithProcessPoolBatch
+                        GenericFutureWithProcessPoolBatch,
+                        GenericFutureWithProcessPoolAdaptiveBatch
                         ])
 def sampler(request):
     s = request.param()
@@ -176,6 +239,12 @@ def two_competing_gaussians_multiple_population(db_path, sampler, n_sim):
 
     assert abs(mp0 - p1_expected) + abs(mp1 - p2_expected) < sp.inf
 
+    # the evaluation phases are timed on the workers and transported back
+    timings = history.get_timings()
+    assert list(timings.index) == list(range(nr_populations))
+    for phase in EVALUATION_PHASES + [SAMPLING, STORAGE]:
+        assert (timings[phase] > 0).all()
+
     # check that sampler only did nr_particles samples in first round
     pops = history.get_all_populations()
     # since we had calibration (of epsilon), check that was saved
@@ -183,6 +252,8 @@ def two_competing_gaussians_multiple_population(db_path, sampler, n_sim):
     assert pre_evals >= pop_size.nr_particles
     # our samplers should not have overhead in calibration, except batching
     batch_size = sampler.batch_size if hasattr(sampler, 'batch_size') else 1
+    if isinstance(batch_size, AdaptiveBatchSize):
+        batch_size = batch_size.max_batch_size
     max_expected = pop_size.nr_particles + batch_size - 1
     if pre_evals > max_expected:
         # Violations have been observed occasionally for the redis server
@@ -196,6 +267,25 @@ def two_competing_gaussians_multiple_population(db_path, sampler, n_sim):
             f"the population size of {pop_size.nr_particles}.")
 
 
+def test_profile(db_path, sampler, tmp_path):
+    def model(p):
+        return {"y": p["x"] + np.random.randn()}
+
+    abc = ABCSMC(model, Distribution(x=RV("norm", 0, 1)),
+                 PercentileDistance(measures_to_use=["y"]), 20,
+                 sampler=sampler)
+    abc.new(db_path, {"y": 1})
+    abc.run(max_nr_populations=2, profile=str(tmp_path))
+
+    # the evaluations are profiled on the workers and merged per population
+    assert sorted(os.listdir(tmp_path)) == ["t_0.pstats", "t_1.pstats"]
+    for t in range(2):
+        stats = pstats.Stats(str(tmp_path / f"t_{t}.pstats")).stats
+        n_calls = [cc for (_, _, name), (cc, *_) in stats.items()
+                   if name == "model"]
+        assert n_calls[0] >= 20
+
+
 def test_in_memory(redis_starter_sampler):
     db_path = "sqlite://"
     two_competing_gaussians_multiple_population(db_path,
@@ -225,3 +315,520 @@ def test_redis_multiprocess():
     sample = sampler.sample_until_n_accepted(10, simulate_one)
     assert 10 == len(sample.get_accepted_population())
     sampler.cleanup()
+
+
+def test_redis_record_rejected():
+    """
+    Check that the compactly encoded samples contain all summary statistics
+    and restore parameters and summary statistics exactly.
+    """
+    sampler = RedisEvalParallelSamplerServerStarter(
+        batch_size=3, workers=1, processes_per_worker=1, compress=True)
+    sampler.sample_factory.record_rejected = True
+
+    def simulate_one():
+        accepted = bool(np.random.randint(2))
+        x = np.random.randn()
+        sum_stat = {"s0": x, "s1": np.array([x, 2 * x]), "s2": 3}
+        return Particle(0, Parameter({"x": x}), 0.1,
+                        [sum_stat] if accepted else [],
+                        [abs(x)] if accepted else [],
+                        [] if accepted else [sum_stat],
+                        [] if accepted else [abs(x)],
+                        accepted)
+
+    sample = sampler.sample_until_n_accepted(10, simulate_one)
+    sampler.cleanup()
+
+    population = sample.get_accepted_population()
+    assert len(population) == 10
+    for particle in population.get_list():
+        sum_stat = particle.accepted_sum_stats[0]
+        x = particle.parameter["x"]
+        assert sum_stat["s0"] == x
+        assert np.array_equal(sum_stat["s1"], [x, 2 * x])
+        assert sum_stat["s2"] == 3 and isinstance(sum_stat["s2"], np.int64)
+        assert particle.accepted_distances[0] == abs(x)
+    all_sum_stats = sample.all_sum_stats
+    assert len(all_sum_stats) >= 10
+    for sum_stat in all_sum_stats:
+        assert sum_stat["s1"][1] == 2 * sum_stat["s0"]
+
+
+class SchemaStore:
+    """
+    The part of a redis connection used to exchange encoding schemas.
+    """
+
+    def __init__(self):
+        self.hashes = {}
+
+    def hsetnx(self, name, key, value):
+        self.hashes.setdefault(name, {}).setdefault(key, value)
+
+    def hget(self, name, key):
+        return self.hashes[name][key]
+
+
+def test_encoding_round_trip():
+    """
+    Check that the compact encoding restores all values with their types,
+    packing only numpy arrays and numeric scalars.
+    """
+    store = SchemaStore()
+    encoder = SampleEncoder(store)
+    decoder = SampleDecoder(store, SampleFactory(record_rejected=True))
+
+    big = 2**62 + 1
+    sum_stats = [
+        {"df": pd.DataFrame({"a": [1, 2], "b": [.5, 1.5]},
+                            index=["x", "y"]),
+         "series": pd.Series([1., 2.], index=["u", "v"]),
+         "big": big, "arr": np.arange(3), "f": 1.5},
+        {"big": np.int64(big), "arr": np.array([big, 1]), "f": 1.5,
+         "flag": True},
+    ]
+
+    sample = SampleFactory(record_rejected=True)()
+    for i, sum_stat in enumerate(sum_stats):
+        for accepted in (True, False):
+            sample.append(Particle(
+                0, Parameter({"x": i, "y": .5}), 1.,
+                [sum_stat] if accepted else [],
+                [.1] if accepted else [],
+                [] if accepted else [sum_stat],
+                [] if accepted else [.2],
+                accepted))
+
+    id_, decoded = decoder.decode(encoder.encode(42, sample))
+    assert id_ == 42
+    assert len(decoded.all_sum_stats) == 4
+
+    for restored in decoded.all_sum_stats:
+        original = sum_stats[0] if "df" in restored else sum_stats[1]
+        assert restored.keys() == original.keys()
+        for key, value in original.items():
+            if isinstance(value, (pd.DataFrame, pd.Series)):
+                assert type(restored[key]) is type(value)
+                assert restored[key].equals(value)
+            else:
+                assert np.array_equal(restored[key], value)
+                assert np.asarray(restored[key]).dtype \
+                    == np.asarray(value).dtype
+        assert restored["big"] == big
+    for particle in decoded.get_accepted_population().get_list():
+        assert particle.parameter["x"] in (0, 1)
+
+
+def test_sample_bounded_recording():
+    """
+    Check that the bounded recording keeps a uniform subsample of all
+    summary statistics, and that merging keeps the smallest keys.
+    """
+    def particle(x):
+        accepted = x % 10 == 0
+        return Particle(0, {}, 1, [{"x": x}] if accepted else [],
+                        [0] if accepted else [],
+                        [] if accepted else [{"x": x}],
+                        [] if accepted else [1], accepted)
+
+    samples = [Sample(record_rejected=True, max_nr_recorded=50)
+               for _ in range(2)]
+    for x in range(1000):
+        samples[x // 500].append(particle(x))
+    for sample in samples:
+        assert sample.n_recorded == 500
+        assert len(sample.all_sum_stats) == 50
+        # only the accepted particles are kept
+        assert len(sample._particles) == sample.n_accepted == 50
+
+    merged = samples[0] + samples[1]
+    assert merged.n_recorded == 1000
+    assert merged.n_accepted == 100
+    keys = sorted(-entry[0] for sample in samples
+                  for entry in sample._reservoir)
+    assert sorted(-entry[0] for entry in merged._reservoir) == keys[:50]
+    assert len(merged.all_sum_stats) == 50
+    assert len({sum_stat["x"] for sum_stat in merged.all_sum_stats}) == 50
+
+
+def test_bounded_record_rejected(sampler):
+    sampler.sample_factory.record_rejected = True
+    sampler.sample_factory.max_nr_recorded = 15
+
+    def simulate_one():
+        accepted = np.random.rand() < .3
+        sum_stat = {"s0": np.random.randn()}
+        return Particle(0, Parameter({"x": 1.}), 0.1,
+                        [sum_stat] if accepted else [],
+                        [0.] if accepted else [],
+                        [] if accepted else [sum_stat],
+                        [] if accepted else [1.],
+                        accepted)
+
+    sample = sampler.sample_until_n_accepted(10, simulate_one)
+    assert sample.n_accepted == 10
+    assert 10 <= len(sample.all_sum_stats) <= 15
+    assert sample.n_recorded >= 10
+
+
+def test_streaming_scales(db_path, sampler):
+    def model(p):
+        return {"s0": p["x"] + np.random.randn(),
+                "s1": 10 * np.random.randn()}
+
+    distance = AdaptivePNormDistance(streaming=True)
+    abc = ABCSMC(model, Distribution(x=RV("norm", 0, 1)), distance, 20,
+                 sampler=sampler)
+    abc.new(db_path, {"s0": 1, "s1": 0})
+    abc.run(max_nr_populations=3)
+
+    # the accumulated statistics of all evaluations are used
+    assert sampler.sample_factory.accumulate_sum_stats
+    assert not sampler.sample_factory.record_rejected
+    assert set(distance.w) == {0, 1, 2, 3}
+    for t in range(1, 4):
+        assert distance.w[t]["s0"] > distance.w[t]["s1"]
+
+
+def test_streaming_pca(db_path, sampler):
+    def model(p):
+        noise = np.random.randn(3)
+        return {"s0": p["x"] + noise[0],
+                "s1": np.array([10 * noise[1], noise[1] + noise[2]])}
+
+    distance = AdaptivePCADistance(streaming=True)
+    abc = ABCSMC(model, Distribution(x=RV("norm", 0, 1)), distance, 20,
+                 sampler=sampler)
+    abc.new(db_path, {"s0": 1, "s1": np.zeros(2)})
+    abc.run(max_nr_populations=3)
+
+    # the covariance of all evaluations was accumulated by the workers
+    assert sampler.sample_factory.accumulate_covariance
+    assert not sampler.sample_factory.record_rejected
+    assert distance._whitening_transformation_matrix.shape == (3, 3)
+
+
+def test_redis_concurrent_analyses():
+    """
+    Check that one redis server and pool of workers can serve several
+    analyses at the same time.
+    """
+    sampler = RedisEvalParallelSamplerServerStarter(
+        batch_size=2, workers=2, processes_per_worker=1)
+    port = sampler.redis.connection_pool.connection_kwargs["port"]
+    other_sampler = RedisEvalParallelSampler(
+        port=port, batch_size=2, analysis_id="other", priority=2)
+
+    def simulate_one():
+        accepted = bool(np.random.randint(2))
+        return Particle(0, {}, 0.1, [], [], accepted=accepted)
+
+    try:
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            futures = [executor.submit(s.sample_until_n_accepted,
+                                       20, simulate_one)
+                       for s in [sampler, other_sampler]]
+            samples = [future.result(timeout=60) for future in futures]
+    finally:
+        sampler.cleanup()
+
+    for sample in samples:
+        assert len(sample.get_accepted_population()) == 20
+
+
+def test_redis_dead_worker():
+    """
+    Check that the master does not wait for a worker killed during a
+    population, but reclaims it once its lease expired.
+    """
+    sampler = RedisEvalParallelSamplerServerStarter(
+        batch_size=5, workers=1, processes_per_worker=1)
+    port = sampler.redis.connection_pool.connection_kwargs["port"]
+    doomed_worker = multiprocessing.Process(
+        target=work, args=(["--port", str(port), "--lease-time", "1"],),
+        daemon=False)
+    doomed_worker.start()
+
+    def simulate_one():
+        time.sleep(0.1)
+        accepted = bool(np.random.randint(2))
+        return Particle(0, {}, 0.1, [], [], accepted=accepted)
+
+    try:
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            future = executor.submit(
+                sampler.sample_until_n_accepted, 20, simulate_one)
+            # kill the second worker once it works on the population
+            start = time.time()
+            while sampler.redis.scard("workers") < 2 \
+                    and time.time() - start < 30:
+                time.sleep(0.05)
+            doomed_worker.kill()
+            sample = future.result(timeout=60)
+    finally:
+        doomed_worker.kill()
+        sampler.cleanup()
+
+    assert len(sample.get_accepted_population()) == 20
+
+
+def test_redis_reissue_claims():
+    """
+    Check that the claimed ids of a dead worker are re-issued, and that
+    claims are released after every batch.
+    """
+    sampler = RedisEvalParallelSamplerServerStarter(workers=0)
+    redis = sampler.redis
+    ana_id = "reissue"
+
+    def claim(worker_id):
+        pipeline = redis.pipeline()
+        claim_evaluations(pipeline, worker_id, ana_id, 3)
+        return parse_claim(pipeline.execute()[0])
+
+    try:
+        redis.set(idfy(N_EVAL, ana_id), 0)
+        for worker_id in ["alive", "dead"]:
+            register_worker(redis, worker_id, ana_id, lease_time=0.5)
+        assert claim("alive") == (3, 3)
+        assert claim("dead") == (6, 3)
+        # a batch without acceptances releases the claim as well
+        assert report_evaluations(redis, "alive", ana_id, [])
+        assert redis.hget(idfy(CLAIMS, ana_id), "alive") is None
+
+        time.sleep(1)
+        redis.set(_heartbeat_key("alive", ana_id), 1)
+        assert reclaim_dead_workers(redis, ana_id) == 1
+        assert int(redis.get(idfy(N_LOST, ana_id))) == 3
+        # the ids of the dead worker are claimed again, before new ones
+        assert claim("alive") == (6, 3)
+        assert claim("alive") == (9, 3)
+        # a late report of the dead worker is discarded
+        assert not report_evaluations(redis, "dead", ana_id, [b"late"])
+        assert redis.llen(idfy(QUEUE, ana_id)) == 0
+    finally:
+        sampler.cleanup()
+
+
+def test_redis_stats(capsys):
+    """
+    Check that the workers publish their throughput counters during a
+    population, and that they are aggregated.
+    """
+    sampler = RedisEvalParallelSamplerServerStarter(
+        batch_size=2, workers=2, processes_per_worker=1)
+    port = sampler.redis.connection_pool.connection_kwargs["port"]
+
+    def simulate_one():
+        time.sleep(0.05)
+        accepted = bool(np.random.randint(2))
+        return Particle(0, {}, 0.1, [], [], accepted=accepted)
+
+    try:
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            future = executor.submit(
+                sampler.sample_until_n_accepted, 400, simulate_one)
+            start = time.time()
+            while sampler.redis.hlen("stats") < 2 \
+                    and time.time() - start < 30:
+                time.sleep(0.05)
+            stats = load_stats(sampler.redis, "stats")
+            _manage("stats", port=port)
+            future.result(timeout=60)
+    finally:
+        sampler.cleanup()
+
+    assert len(stats) == 2
+    total = aggregate(list(stats.values()))
+    assert total["n_worker"] == 2
+    assert 0 <= total["acceptance_rate"] <= 1
+    assert total["sims_per_s"] > 0
+    out = capsys.readouterr().out
+    assert out.count("Worker=") == 2
+    assert "Total Workers=2" in out
+
+
+class CallbackOnlyFuture:
+    """
+    Future exposing no polling interface, to check that the
+    ConcurrentFutureSampler waits for completion callbacks.
+    """
+
+    def __init__(self, future):
+        self._future = future
+
+    def result(self):
+        return self._future.result()
+
+    def cancel(self):
+        return self._future.cancel()
+
+    def add_done_callback(self, fn):
+        self._future.add_done_callback(lambda _: fn(self))
+
+
+class CallbackOnlyExecutor:
+    def __init__(self, max_workers):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    def submit(self, fn, *args):
+        return CallbackOnlyFuture(self._executor.submit(fn, *args))
+
+
+def test_concurrent_future_sampler_waits_for_callbacks():
+    sampler = ConcurrentFutureSampler(
+        CallbackOnlyExecutor(max_workers=4), client_max_jobs=4,
+        batch_size=3)
+
+    def simulate_one():
+        accepted = bool(np.random.randint(2))
+        return Particle(0, {}, 0.1, [], [], accepted=accepted)
+
+    sample = sampler.sample_until_n_accepted(20, simulate_one)
+    assert len(sample.get_accepted_population()) == 20
+    assert sampler.nr_evaluations_ >= 20
+
+
+def test_dask_broadcast():
+    """
+    Check the dask sampler with simulate_one broadcast once per generation.
+    """
+    client = Client(processes=False, n_workers=2, threads_per_worker=1)
+    sampler = DaskDistributedSampler(client, batch_size=3, broadcast=True)
+    data = np.random.randn(10000)
+
+    def simulate_one():
+        accepted = bool(np.random.randint(2))
+        return Particle(0, {"x": data[0]}, 0.1, [], [], accepted=accepted)
+
+    try:
+        for _ in range(2):
+            sample = sampler.sample_until_n_accepted(20, simulate_one)
+            assert len(sample.get_accepted_population()) == 20
+            for particle in sample.get_accepted_population().get_list():
+                assert particle.parameter["x"] == data[0]
+    finally:
+        client.close()
+
+
+def test_adaptive_batch_size():
+    batch_size = AdaptiveBatchSize(target_job_time=1, max_batch_size=100)
+    batch_size.initialize()
+    assert batch_size(n_missing=100, n_running=0, n_jobs=4) == 1
+
+    # 10ms per simulation, acceptance rate 0.5
+    batch_size.update(n_evaluated=10, n_accepted=5, sim_time=0.1)
+    assert batch_size(n_missing=1000, n_running=0, n_jobs=4) == 100
+    # 200 evaluations required, distributed over the jobs
+    assert batch_size(n_missing=100, n_running=0, n_jobs=4) == 50
+    # enough evaluations running
+    assert batch_size(n_missing=10, n_running=40, n_jobs=4) == 1
+
+
+def test_adaptive_batch_size_wastes_less():
+    def simulate_one():
+        accepted = np.random.rand() < 0.2
+        return Particle(0, {}, 0.1, [], [], accepted=accepted)
+
+    wasted = {}
+    for name, batch_size in [("fixed", 50),
+                             ("adaptive", AdaptiveBatchSize())]:
+        sampler = ConcurrentFutureSampler(
+            ThreadPoolExecutor(max_workers=4), client_max_jobs=4,
+            batch_size=batch_size)
+        sampler.sample_until_n_accepted(100, simulate_one)
+        wasted[name] = sampler.nr_wasted_evaluations_
+        assert sampler.nr_submitted_evaluations_ \
+            == sampler.nr_evaluations_ + sampler.nr_wasted_evaluations_
+    assert wasted["adaptive"] < wasted["fixed"]
+
+
+def test_mapping_sampler_overprovisioned_uses_first_ids():
+    """
+    Check that in the overprovisioned mode the acceptances with the
+    smallest evaluation ids are used, and the surplus is counted.
+    """
+    counter = [0]
+
+    def simulate_one():
+        counter[0] += 1
+        # every third evaluation is accepted
+        return Particle(0, {}, 0.1, [], [], accepted=counter[0] % 3 == 0)
+
+    # the built in map is lazy and sequential, so no surplus is evaluated
+    sampler = MappingSampler(map, mapper_pickles=True,
+                             overprovision=1, batch_size=2)
+    sample = sampler.sample_until_n_accepted(4, simulate_one)
+    assert sample.n_accepted == 4
+    assert sampler.nr_evaluations_ == 12
+    assert sampler.nr_surplus_evaluations_ == 0
+
+    # an eager map evaluates all tasks
+    counter[0] = 0
+    sampler = MappingSampler(lambda f, x: list(map(f, x)),
+                             mapper_pickles=True,
+                             overprovision=2, batch_size=2)
+    sample = sampler.sample_until_n_accepted(4, simulate_one)
+    assert sample.n_accepted == 4
+    assert sampler.nr_evaluations_ == 12
+    assert sampler.nr_surplus_evaluations_ == counter[0] - 12 > 0
+
+
+def test_mapping_sampler_overprovisioned_records_used_evaluations():
+    """
+    Check that in the overprovisioned mode only the used evaluations are
+    recorded and accumulated, also if the recording is bounded.
+    """
+    counter = [0]
+
+    def simulate_one():
+        counter[0] += 1
+        accepted = counter[0] % 3 == 0
+        sum_stats = {"s": float(counter[0])}
+        if accepted:
+            return Particle(0, {}, 0.1, [sum_stats], [0.], accepted=True)
+        return Particle(0, {}, 0, [], [], [sum_stats], [1.],
+                        accepted=False)
+
+    sampler = MappingSampler(lambda f, x: list(map(f, x)),
+                             mapper_pickles=True,
+                             overprovision=2, batch_size=4)
+    sampler.sample_factory = SampleFactory(
+        record_rejected=True, max_nr_recorded=5, accumulate_sum_stats=True)
+    sample = sampler.sample_until_n_accepted(4, simulate_one)
+    assert sampler.nr_evaluations_ == 12
+    assert sampler.nr_surplus_evaluations_ > 0
+    assert sample.n_recorded == 12
+    assert all(sum_stats["s"] <= 12 for sum_stats in sample.all_sum_stats)
+    assert sample.sum_stats_accumulator["s"].n == 12
+
+
+def test_mapping_sampler_overprovisioned_pool_surplus():
+    """
+    Check that the remaining tasks of a multiprocessing pool, which cannot
+    be cancelled, are not awaited.
+    """
+    counter = [0]
+
+    def simulate_one():
+        counter[0] += 1
+        if counter[0] > 4:
+            # the surplus evaluations are slow
+            time.sleep(2)
+        return Particle(0, {}, 0.1, [], [], accepted=True)
+
+    # one worker, such that the tasks are evaluated in order
+    pool = ThreadPool(1)
+    try:
+        sampler = MappingSampler(pool.imap, mapper_pickles=True,
+                                 overprovision=3, batch_size=2)
+        start = time.time()
+        sample = sampler.sample_until_n_accepted(4, simulate_one)
+        assert time.time() - start < 2
+    finally:
+        pool.terminate()
+    assert sample.n_accepted == 4
+    assert sampler.nr_evaluations_ == 4
+    # only the received evaluations are counted
+    assert sampler.nr_surplus_evaluations_ == 0
@@ -1,4 +1,72 @@
+import gc
+import os
+import sys
+import time
+import numpy as np
+import pytest
+from pyabc import ABCSMC, Distribution, RV
+from pyabc.sampler import SGEEvalParallelSampler
 from pyabc.sge import SGE
+from pyabc.sge.db import SQLiteGenerationDB, SQLiteJobDB
+
+
+QSUB = """#!{python}
+# local stand-in for qsub, running the array tasks as subprocesses
+import os
+import re
+import subprocess
+import sys
+
+script = sys.argv[-1]
+with open({log!r}, "a") as f:
+    f.write(script + "\\n")
+with open(script) as f:
+    nr_tasks = int(re.search(r"^#\\$ -t 1-(\\d+)", f.read(), re.M).group(1))
+for task_id in range(1, nr_tasks + 1):
+    subprocess.Popen(
+        ["bash", script],
+        env=dict(os.environ, SGE_TASK_ID=str(task_id), NSLOTS="1"),
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+print('Your job-array 4242.1-{{}}:1 ("map") has been submitted'
+      .format(nr_tasks))
+"""
+
+QDEL = """#!/bin/bash
+echo "$@" >> {marker}
+"""
+
+
+@pytest.fixture
+def local_sge(tmp_path, monkeypatch):
+    """
+    Configure a SQLite job db and put qsub and qdel stand-ins on the path.
+    """
+    home = tmp_path / "home"
+    home.mkdir()
+    (home / ".parallel").write_text(
+        "[DIRECTORIES]\nTMP={}\n[BROKER]\nTYPE=SQLITE\n"
+        .format(tmp_path / "jobs"))
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    for name, script in [
+            ("qsub", QSUB.format(python=sys.executable,
+                                 log=str(tmp_path / "qsub"))),
+            ("qdel", QDEL.format(marker=tmp_path / "qdel"))]:
+        (bin_dir / name).write_text(script)
+        (bin_dir / name).chmod(0o755)
+    monkeypatch.setenv("HOME", str(home))
+    monkeypatch.setenv("PATH", str(bin_dir) + os.pathsep
+                       + os.environ["PATH"])
+    monkeypatch.setenv("PYTHONPATH", os.path.dirname(
+        os.path.dirname(os.path.abspath(__file__))))
+    yield tmp_path
+
+
+def double_or_fail(x):
+    if x < 0:
+        raise ValueError("negative")
+    time.sleep(0.5 * x)
+    return 2 * x
 
 
 def test_sge_setup():
@@ -8,3 +76,145 @@ def test_sge_setup():
     # on the test system first).
     sge = SGE(priority=-500, memory="1G", name="test", time_h=1)
     repr(sge)
+
+
+def test_sge_map(local_sge):
+    sge = SGE(priority=-500, memory="1G", name="test", time_h=1)
+    results = sge.map(double_or_fail, [3, 0, 1, -1])
+    assert results[:3] == [6, 0, 2]
+    assert isinstance(results[3], ValueError)
+
+
+def test_sge_imap_unordered(local_sge):
+    sge = SGE(priority=-500, memory="1G", name="test", time_h=1,
+              chunk_size=2)
+    results = list(sge.imap_unordered(double_or_fail, [8, 6, 0, 1]))
+    assert sorted(results) == [0, 2, 12, 16]
+    # the chunk with the short tasks finishes first
+    assert sorted(results[:2]) == [0, 2]
+
+
+def test_sge_imap_close_deletes_job(local_sge):
+    sge = SGE(priority=-500, memory="1G", name="test", time_h=1)
+    results = sge.imap(double_or_fail, [0, 20])
+    assert next(results) == 0
+    start = time.time()
+    results.close()
+    assert time.time() - start < 5
+    assert (local_sge / "qdel").read_text().strip() == "4242"
+
+
+def test_sge_imap_cleanup_without_iteration(local_sge):
+    sge = SGE(priority=-500, memory="1G", name="test", time_h=1)
+    with sge.imap_unordered(double_or_fail, [20]):
+        pass
+    assert (local_sge / "qdel").read_text().strip() == "4242"
+    assert len(os.listdir(local_sge / "jobs")) == 0
+
+    # also if the iterator is just dropped
+    results = sge.imap(double_or_fail, [20])
+    del results
+    gc.collect()
+    assert (local_sge / "qdel").read_text().split() == ["4242", "4242"]
+    assert len(os.listdir(local_sge / "jobs")) == 0
+
+
+def test_sge_eval_parallel_sampler(local_sge):
+    sge = SGE(priority=-500, memory="1G", name="test", time_h=1)
+    sampler = SGEEvalParallelSampler(sge=sge, n_workers=3, batch_size=2)
+
+    def model(p):
+        return {"y": p["p"] + 0.1 * np.random.randn()}
+
+    abc = ABCSMC(model, Distribution(p=RV("uniform", 0, 1)),
+                 lambda x, y: abs(x["y"] - y["y"]), population_size=20,
+                 sampler=sampler)
+    abc.new("sqlite:///" + str(local_sge / "abc.db"), {"y": 0.5})
+    try:
+        history = abc.run(minimum_epsilon=0, max_nr_populations=3)
+    finally:
+        sampler.stop()
+
+    assert history.n_populations == 3
+    df, w = history.get_distribution(m=0)
+    assert len(df) == 20
+    # all generations were computed by the same array job, which was
+    # cleaned up
+    assert len((local_sge / "qsub").read_text().splitlines()) == 1
+    assert len(os.listdir(local_sge / "jobs")) == 0
+    assert len(sampler.n_sim_workers_) == 3
+    assert sum(sampler.n_sim_workers_) >= history.total_nr_simulations
+
+
+def test_sge_eval_parallel_sampler_worker_killed(local_sge):
+    sge = SGE(priority=-500, memory="1G", name="test", time_h=1)
+    sampler = SGEEvalParallelSampler(sge=sge, n_workers=3, batch_size=4,
+                                     lease_s=1)
+    # the task of the killed worker never finishes
+    sampler.STOP_TIMEOUT = 1
+    marker = str(local_sge / "killed")
+
+    def model(p):
+        if "SGE_TASK_ID" in os.environ:
+            try:
+                os.close(os.open(marker, os.O_CREAT | os.O_EXCL))
+            except FileExistsError:
+                pass
+            else:
+                # kill the first worker in the middle of its batch
+                os._exit(1)
+        return {"y": p["p"] + 0.1 * np.random.randn()}
+
+    abc = ABCSMC(model, Distribution(p=RV("uniform", 0, 1)),
+                 lambda x, y: abs(x["y"] - y["y"]), population_size=20,
+                 sampler=sampler)
+    abc.new("sqlite:///" + str(local_sge / "abc.db"), {"y": 0.5})
+    try:
+        history = abc.run(minimum_epsilon=0, max_nr_populations=2)
+    finally:
+        sampler.stop()
+
+    assert os.path.exists(marker)
+    assert history.n_populations == 2
+    df, w = history.get_distribution(m=0)
+    assert len(df) == 20
+
+
+def test_sqlite_generation_db_reissues_expired_claims(local_sge):
+    db = SQLiteGenerationDB(str(local_sge))
+    db.create()
+    db.start_generation(1, b"", batch_size=2, n_req=3, all_accepted=False)
+    assert db.claim(1, 2, worker=1, lease_s=0) == 2
+    assert db.claim(1, 2, worker=2, lease_s=60) == 4
+    time.sleep(0.01)
+    # the claim of worker 1 expired and its ids are re-issued
+    assert db.expire_claims(1) == 1
+    assert db.claim(1, 2, worker=3, lease_s=60) == 2
+    assert not db.report(1, 1, 2, [(2, b"late")])
+    assert db.report(1, 3, 2, [(2, b"a")])
+    assert db.progress(1) == (1, 4, 2)
+    # after closing, expired claims are not evaluated anymore
+    db.close(1)
+    db.connection.execute("UPDATE claim SET expires = 0")
+    assert db.expire_claims(1) == 1
+    assert db.progress(1) == (1, 2, 2)
+    assert db.pop_results(1) == [(2, b"a")]
+
+
+def test_sqlite_job_db_status(local_sge):
+    job_db = SQLiteJobDB(str(local_sge))
+    job_db.create(4)
+    job_db.start(1)
+    job_db.start(2)
+    job_db.finish(2)
+    job_db.start(3)
+    # let task 3 time out
+    job_db.connection.execute(
+        "UPDATE status SET start_time = 0 WHERE ID = 3")
+    job_db.connection.commit()
+
+    assert job_db.status_counts(max_run_time_h=1) == {
+        "started": 2, "finished": 1, "timed_out": 1}
+    assert job_db.done_jobs(max_run_time_h=1) == {2, 3}
+    assert [job_db.wait_for_job(ID, 1) for ID in range(1, 5)] \
+        == [True, False, False, True]
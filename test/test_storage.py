@@ -246,6 +246,23 @@ def test_total_nr_samples(history: History):
     assert 4237 == history.total_nr_simulations
 
 
+def test_timings(history: History):
+    particle_list = [
+        Particle(m=0,
+                 parameter=Parameter({"a": 23, "b": 12}),
+                 weight=.2,
+                 accepted_sum_stats=[{"ss": .1}],
+                 accepted_distances=[.1])]
+    for t in range(2):
+        history.append_population(t, 42, Population(particle_list), 2, ["m1"])
+        history.store_timings(t, {"simulation": t + 1., "sampling": .5})
+
+    timings = history.get_timings()
+    assert list(timings.index) == [0, 1]
+    assert list(timings["simulation"]) == [1., 2.]
+    assert list(timings["sampling"]) == [.5, .5]
+
+
 def test_t_count(history: History):
     particle_list = [
         Particle(m=0,
@@ -59,6 +59,10 @@ def test_effective_sample_sizes():
         histories, labels, rotation=45)
 
 
+def test_timings():
+    pyabc.visualization.plot_timings(histories[0], size=(10, 4))
+
+
 def test_histograms():
     pyabc.visualization.plot_histogram_1d(histories[0], 'p0', bins=20)
     pyabc.visualization.plot_histogram_2d(histories[0], 'p0', 'p1')
@@ -0,0 +1,440 @@
+"""
+Performance benchmarks
+======================
+
+Runs reference problems through several samplers and records throughput
+and timing metrics as JSON, to be compared against a stored baseline.
+
+Usage::
+
+    python -m test_performance.benchmark run --output current.json
+    python -m test_performance.benchmark compare baseline.json current.json
+
+The R problems, comparing the per-call and the batched R interface,
+require rpy2 and are only run on request::
+
+    python -m test_performance.benchmark run --problems r_per_call r_batch
+
+Each problem and sampler configuration is run in a fresh subprocess, such
+that the peak memory is measured per configuration.
+
+The recorded metrics are
+
+* ``sims_per_s``: Simulations per second of sampling wall time, in the
+  populations after the calibration.
+* ``master_overhead_s``: Wall time of the run not spent in sampling, nor in
+  the initialization, i.e. transition fitting, population size adaptation,
+  storage, and distance and epsilon updates.
+* ``db_write_s``: Wall time of storing the populations.
+* ``db_read_s``: Wall time of reading all populations, weighted distances
+  and summary statistics back.
+* ``transition_fit_s``, ``transition_pdf_s``: Wall time of fitting the
+  transition to the last population, and of evaluating its density there.
+* ``peak_memory_mb``: Peak resident memory of the master process and of
+  its worker processes.
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import Pool
+
+import numpy as np
+
+import pyabc
+from pyabc.sampler import (SingleCoreSampler, MappingSampler,
+                           MulticoreEvalParallelSampler,
+                           MulticoreParticleParallelSampler,
+                           ConcurrentFutureSampler)
+from pyabc.timing import SAMPLING, INITIALIZATION, STORAGE
+
+
+# reference problems
+
+
+def gaussian():
+    """
+    Cheap one-dimensional Gaussian model.
+    """
+    def model(p):
+        return {"y": p["x"] + 0.5 * np.random.randn()}
+
+    prior = pyabc.Distribution(x=pyabc.RV("norm", 0, 1))
+    return model, prior, pyabc.PNormDistance(p=2), {"y": 1.}
+
+
+def model_selection():
+    """
+    Selection between three Gaussian models with different priors.
+    """
+    def model(p):
+        return {"y": p["x"] + 0.5 * np.random.randn()}
+
+    priors = [pyabc.Distribution(x=pyabc.RV("norm", mu, 0.5))
+              for mu in (0, 1, 2)]
+    return [model] * 3, priors, pyabc.PNormDistance(p=2), {"y": 1.}
+
+
+def high_dimensional(dim=20):
+    """
+    Model with a high-dimensional parameter.
+    """
+    keys = ["x{}".format(i) for i in range(dim)]
+
+    def model(p):
+        return {key: p[key] + 0.1 * np.random.randn() for key in keys}
+
+    prior = pyabc.Distribution(**{key: pyabc.RV("uniform", 0, 1)
+                                  for key in keys})
+    return model, prior, pyabc.PNormDistance(p=2), \
+        {key: 0.5 for key in keys}
+
+
+def array_sum_stats(size=1000):
+    """
+    Model with large array-valued summary statistics.
+    """
+    def model(p):
+        return {"y": p["x"] + np.random.randn(size)}
+
+    def distance(x, y):
+        return np.linalg.norm(x["y"] - y["y"]) / np.sqrt(size)
+
+    prior = pyabc.Distribution(x=pyabc.RV("norm", 0, 1))
+    return model, prior, distance, {"y": np.ones(size)}
+
+
+def heavy_tailed_runtime():
+    """
+    Cheap Gaussian model with Pareto distributed runtimes, capped at 50ms.
+    """
+    def model(p):
+        time.sleep(min(1e-3 * np.random.pareto(1.5), 0.05))
+        return {"y": p["x"] + 0.5 * np.random.randn()}
+
+    prior = pyabc.Distribution(x=pyabc.RV("norm", 0, 1))
+    return model, prior, pyabc.PNormDistance(p=2), {"y": 1.}
+
+
+R_FILE = os.path.join(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))), "doc", "examples", "myRModel.R")
+
+
+def r_per_call():
+    """
+    Cheap two-dimensional Gaussian model in R, with one call into R per
+    model and distance evaluation. Requires rpy2.
+    """
+    from pyabc.external import R
+    r = R(R_FILE)
+    prior = pyabc.Distribution(meanX=pyabc.RV("uniform", 0, 10),
+                               meanY=pyabc.RV("uniform", 0, 10))
+    return r.model("myModelSumStats"), prior, r.distance("myDistance"), \
+        {"x": 4., "y": 8.}
+
+
+def r_batch():
+    """
+    The model of :func:`r_per_call`, with one call into R per block of
+    model and distance evaluations. Requires rpy2.
+    """
+    from pyabc.external import R
+    r = R(R_FILE)
+    prior = pyabc.Distribution(meanX=pyabc.RV("uniform", 0, 10),
+                               meanY=pyabc.RV("uniform", 0, 10))
+    return r.model_batch("myModelBatch"), prior, \
+        r.distance_batch("myDistanceBatch"), {"x": 4., "y": 8.}
+
+
+PROBLEMS = {
+    "gaussian": gaussian,
+    "model_selection": model_selection,
+    "high_dimensional": high_dimensional,
+    "array_sum_stats": array_sum_stats,
+    "heavy_tailed_runtime": heavy_tailed_runtime,
+    "r_per_call": r_per_call,
+    "r_batch": r_batch,
+}
+
+# the problems run by default, not requiring optional dependencies
+DEFAULT_PROBLEMS = ["gaussian", "model_selection", "high_dimensional",
+                    "array_sum_stats", "heavy_tailed_runtime"]
+
+
+# sampler configurations, created from the number of processes
+
+
+def _pool_mapping_sampler(n_procs):
+    pool = Pool(n_procs)
+    sampler = MappingSampler(map_=pool.map)
+    return sampler, pool.terminate
+
+
+def _future_sampler(n_procs, batch_size=1):
+    executor = ProcessPoolExecutor(max_workers=n_procs)
+    sampler = ConcurrentFutureSampler(
+        executor, client_max_jobs=n_procs, batch_size=batch_size)
+    return sampler, executor.shutdown
+
+
+def _redis_sampler(n_procs):
+    sampler = pyabc.sampler.RedisEvalParallelSamplerServerStarter(
+        batch_size=5, workers=n_procs)
+    return sampler, sampler.cleanup
+
+
+SAMPLERS = {
+    "singlecore": lambda n_procs: (SingleCoreSampler(), None),
+    "multicore_eval": lambda n_procs: (
+        MulticoreEvalParallelSampler(n_procs=n_procs), None),
+    "multicore_particle": lambda n_procs: (
+        MulticoreParticleParallelSampler(n_procs=n_procs), None),
+    "mapping_pool": _pool_mapping_sampler,
+    "future": _future_sampler,
+    "future_batch": lambda n_procs: _future_sampler(n_procs, 10),
+    "redis": _redis_sampler,
+}
+
+DEFAULT_SAMPLERS = ["singlecore", "multicore_eval", "mapping_pool",
+                    "future_batch"]
+
+# whether lower or higher values are better
+LOWER_IS_BETTER = {
+    "sims_per_s": False,
+    "master_overhead_s": True,
+    "db_write_s": True,
+    "db_read_s": True,
+    "transition_fit_s": True,
+    "transition_pdf_s": True,
+    "peak_memory_mb": True,
+}
+
+
+def _peak_memory_mb():
+    # ru_maxrss is in kilobytes on linux, and in bytes on macos
+    unit = 1 if sys.platform == "darwin" else 1024
+    return sum(resource.getrusage(who).ru_maxrss
+               for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN)) \
+        * unit / 2**20
+
+
+def run_one(problem: str, sampler: str, n_procs: int = 2,
+            population_size: int = 200, n_populations: int = 4) -> dict:
+    """
+    Run one problem with one sampler configuration in this process.
+
+    Returns
+    -------
+
+    metrics: dict
+        The metrics, see the module documentation.
+    """
+    models, prior, distance, observation = PROBLEMS[problem]()
+    sampler_, cleanup = SAMPLERS[sampler](n_procs)
+    db_file = tempfile.mkstemp(suffix=".db")[1]
+    try:
+        abc = pyabc.ABCSMC(models, prior, distance, population_size,
+                           sampler=sampler_)
+        abc.new("sqlite:///" + db_file, observation)
+        start = time.perf_counter()
+        history = abc.run(minimum_epsilon=0,
+                          max_nr_populations=n_populations)
+        run_time = time.perf_counter() - start
+    finally:
+        if cleanup is not None:
+            cleanup()
+
+    timings = history.get_timings().sum()
+    populations = history.get_all_populations()
+    n_sim = populations[populations.t >= 0].samples.sum()
+
+    start = time.perf_counter()
+    for t in range(history.max_t + 1):
+        for m in history.alive_models(t):
+            history.get_distribution(m=m, t=t)
+        history.get_weighted_distances(t=t)
+        history.get_weighted_sum_stats(t=t)
+    db_read_time = time.perf_counter() - start
+
+    m = history.alive_models(history.max_t)[0]
+    df, w = history.get_distribution(m=m)
+    transition = pyabc.MultivariateNormalTransition()
+    start = time.perf_counter()
+    transition.fit(df, w)
+    transition_fit_time = time.perf_counter() - start
+    start = time.perf_counter()
+    transition.pdf(df)
+    transition_pdf_time = time.perf_counter() - start
+
+    n_populations = history.n_populations
+    os.remove(db_file)
+
+    return {
+        "problem": problem,
+        "sampler": sampler,
+        "n_procs": n_procs,
+        "population_size": population_size,
+        "n_populations": int(n_populations),
+        "n_sim": int(n_sim),
+        "run_s": run_time,
+        "sims_per_s": n_sim / timings[SAMPLING],
+        "master_overhead_s":
+            run_time - timings[SAMPLING] - timings[INITIALIZATION],
+        "db_write_s": timings[STORAGE],
+        "db_read_s": db_read_time,
+        "transition_fit_s": transition_fit_time,
+        "transition_pdf_s": transition_pdf_time,
+        "peak_memory_mb": _peak_memory_mb(),
+    }
+
+
+def run(problems, samplers, n_procs=2, population_size=200,
+        n_populations=4) -> dict:
+    """
+    Run all combinations of problems and samplers, each in a subprocess.
+
+    Returns
+    -------
+
+    benchmark: dict
+        Metadata and the list of results.
+    """
+    results = []
+    for problem in problems:
+        for sampler in samplers:
+            cmd = [sys.executable, "-m", "test_performance.benchmark",
+                   "run-one", problem, sampler,
+                   "--n-procs", str(n_procs),
+                   "--population-size", str(population_size),
+                   "--n-populations", str(n_populations)]
+            out = subprocess.run(cmd, stdout=subprocess.PIPE, check=True,
+                                 cwd=os.path.dirname(
+                                     os.path.dirname(__file__)) or ".")
+            result = json.loads(out.stdout.decode().splitlines()[-1])
+            print("{problem:<22}{sampler:<20}"
+                  "{sims_per_s:>12.1f} sims/s".format(**result),
+                  file=sys.stderr)
+            results.append(result)
+    return {
+        "meta": {
+            "pyabc": pyabc.__version__,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+
+
+def compare(baseline: dict, current: dict, tolerance: float = 0.2):
+    """
+    Compare the metrics of two benchmarks.
+
+    Parameters
+    ----------
+
+    baseline, current: dict
+        Benchmarks as returned by :func:`run`.
+    tolerance: float, optional (default = 0.2)
+        Relative deterioration of a metric tolerated.
+
+    Returns
+    -------
+
+    regressions: list
+        Tuples of problem, sampler, metric, baseline and current value of
+        the regressed metrics. Configurations missing in either benchmark
+        are skipped.
+    """
+    baseline_results = {(res["problem"], res["sampler"]): res
+                        for res in baseline["results"]}
+    regressions = []
+    for res in current["results"]:
+        key = (res["problem"], res["sampler"])
+        if key not in baseline_results:
+            continue
+        for metric, lower_is_better in LOWER_IS_BETTER.items():
+            old, new = baseline_results[key][metric], res[metric]
+            if lower_is_better:
+                regressed = new > old * (1 + tolerance)
+            else:
+                regressed = new < old * (1 - tolerance)
+            if regressed:
+                regressions.append((*key, metric, old, new))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="pyABC performance benchmarks.")
+    subparsers = parser.add_subparsers(dest="command")
+    subparsers.required = True
+
+    def add_size_arguments(p):
+        p.add_argument("--n-procs", type=int, default=2)
+        p.add_argument("--population-size", type=int, default=200)
+        p.add_argument("--n-populations", type=int, default=4)
+
+    p_run = subparsers.add_parser(
+        "run", help="Run the benchmarks and write the results as JSON.")
+    p_run.add_argument("--output", default="-",
+                       help="Output file, '-' for stdout.")
+    p_run.add_argument("--problems", nargs="+", default=DEFAULT_PROBLEMS,
+                       choices=list(PROBLEMS))
+    p_run.add_argument("--samplers", nargs="+", default=DEFAULT_SAMPLERS,
+                       choices=list(SAMPLERS))
+    add_size_arguments(p_run)
+
+    p_one = subparsers.add_parser(
+        "run-one", help="Run one configuration in this process.")
+    p_one.add_argument("problem", choices=list(PROBLEMS))
+    p_one.add_argument("sampler", choices=list(SAMPLERS))
+    add_size_arguments(p_one)
+
+    p_compare = subparsers.add_parser(
+        "compare", help="Compare against a baseline, exit with status 1 "
+                        "if any metric regressed.")
+    p_compare.add_argument("baseline")
+    p_compare.add_argument("current")
+    p_compare.add_argument("--tolerance", type=float, default=0.2)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "run-one":
+        print(json.dumps(run_one(args.problem, args.sampler, args.n_procs,
+                                 args.population_size, args.n_populations)))
+        return 0
+
+    if args.command == "run":
+        benchmark = run(args.problems, args.samplers, args.n_procs,
+                        args.population_size, args.n_populations)
+        dump = json.dumps(benchmark, indent=2)
+        if args.output == "-":
+            print(dump)
+        else:
+            with open(args.output, "w") as f:
+                f.write(dump)
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    regressions = compare(baseline, current, args.tolerance)
+    for problem, sampler, metric, old, new in regressions:
+        print("REGRESSION {} {} {}: {:.4g} -> {:.4g}"
+              .format(problem, sampler, metric, old, new))
+    if not regressions:
+        print("No regressions.")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
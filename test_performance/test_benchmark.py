@@ -0,0 +1,25 @@
+import copy
+
+from test_performance.benchmark import run_one, compare, LOWER_IS_BETTER
+
+
+def test_run_one():
+    result = run_one("gaussian", "singlecore", population_size=20,
+                     n_populations=2)
+    assert result["n_populations"] == 2
+    for metric in LOWER_IS_BETTER:
+        assert result[metric] >= 0
+
+
+def test_compare():
+    result = {"problem": "gaussian", "sampler": "singlecore",
+              **{metric: 1. for metric in LOWER_IS_BETTER}}
+    baseline = {"results": [result]}
+    current = copy.deepcopy(baseline)
+    assert compare(baseline, current) == []
+
+    current["results"][0]["sims_per_s"] = .5
+    current["results"][0]["db_write_s"] = 1.1
+    current["results"][0]["db_read_s"] = 2.
+    regressions = compare(baseline, current, tolerance=.2)
+    assert [reg[2] for reg in regressions] == ["sims_per_s", "db_read_s"]